@@ -1,10 +1,58 @@
-from fastapi import APIRouter, HTTPException, Query
+import hashlib, hmac, json, os, threading
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from ..loaders.registry import Registry
-from ..services import search_service, recommender_service, ratings_service, profile_service as prof
+from ..loaders.registry import LiveRegistry
+from ..services import search_service, recommender_service, ratings_service, result_cache, metrics, profile_service as prof
 
 router = APIRouter()
-REG = Registry()
+# Handlers take `reg = LIVE.current` once, so a hot reload never changes artifacts mid-request.
+LIVE = LiveRegistry()
+LIVE.on_swap(lambda old, new: result_cache.clear_all())
+LIVE.on_swap(lambda old, new: metrics.configure(new.cfg))
+metrics.configure(LIVE.current.cfg)
+ratings_service.store_for(LIVE.current)  # open the rating store at startup: fails fast on unmigrated ratings
+
+# ---- HTTP caching for catalog reads (immutable between feature builds) ----
+CACHE_CONTROL = "public, max-age=300"
+_BODIES: dict[str, bytes] = {}      # pre-serialised facets / drink details for one registry version
+_BODIES_VERSION = [None]
+_BODIES_LOCK = threading.Lock()
+
+def _etag(reg, key: str) -> str:
+    return f'"{reg.version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm: return False
+    tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+    return "*" in tags or etag in tags
+
+def _dumps(obj) -> bytes:
+    # same encoding as FastAPI's JSONResponse
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def cached_json(request: Request, reg, key: str, produce, keep=False) -> Response:
+    """
+    ETag keyed on the feature-build version + request key. A matching If-None-Match gets a 304
+    without calling `produce`; with keep=True the serialised body is held in memory for reuse.
+    """
+    etag = _etag(reg, key)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = None
+    if keep:
+        with _BODIES_LOCK:
+            if _BODIES_VERSION[0] != reg.version:
+                _BODIES.clear(); _BODIES_VERSION[0] = reg.version
+            body = _BODIES.get(key)
+    if body is None:
+        body = _dumps(produce())
+        if keep:
+            with _BODIES_LOCK:
+                if _BODIES_VERSION[0] == reg.version: _BODIES[key] = body
+    return Response(content=body, media_type="application/json", headers=headers)
 
 class RecsBody(BaseModel):
     likes: dict | None = None
@@ -13,6 +61,9 @@ class RecsBody(BaseModel):
     k: int | None = 48
     user_id: str | None = "local"
 
+class RecsBatchBody(BaseModel):
+    requests: list[RecsBody]
+
 class RatingBody(BaseModel):
     user_id: str | None = "local"
     drink_id: str
@@ -21,53 +72,115 @@ class RatingBody(BaseModel):
     ts: int | None = None
 
 @router.get("/drinks")
-def list_drinks(spirit: str|None=None, tag: str|None=None, season: str|None=None,
+def list_drinks(request: Request, spirit: str|None=None, tag: str|None=None, season: str|None=None,
                 page: int=1, page_size: int=24):
-    items = search_service.search(REG, q=None, spirit=spirit, tag=tag, season=season)
-    start = (page-1)*page_size
-    return {"items": items[start:start+page_size], "total": len(items), "page": page}
+    reg = LIVE.current
+    def produce():
+        items, total = search_service.search_page(reg, q=None, spirit=spirit, tag=tag, season=season,
+                                                  page=page, page_size=page_size)
+        return {"items": items, "total": total, "page": page}
+    return cached_json(request, reg, f"drinks|{spirit}|{tag}|{season}|{page}|{page_size}", produce)
 
 @router.get("/drinks/{drink_id}")
-def get_drink(drink_id: str):
-    d = REG.get(drink_id)
+def get_drink(request: Request, drink_id: str):
+    reg = LIVE.current
+    d = reg.get(drink_id)
     if not d: raise HTTPException(404, "Not found")
-    return d
+    return cached_json(request, reg, f"drink|{drink_id}", lambda: d, keep=True)
 
 @router.get("/search")
-def search(q: str = Query(""), spirit: str|None=None, tag: str|None=None, season: str|None=None,
-           page: int=1, page_size: int=24):
-    items = search_service.search(REG, q=q, spirit=spirit, tag=tag, season=season)
-    start = (page-1)*page_size
-    return {"items": items[start:start+page_size], "total": len(items), "page": page}
+@metrics.profiled
+def search(request: Request, q: str = Query(""), spirit: str|None=None, tag: str|None=None, season: str|None=None,
+           page: int=1, page_size: int=24, rank: str|None=Query(None, pattern="^(name|bm25)$")):
+    reg = LIVE.current
+    def produce():
+        items, total = search_service.search_page(reg, q=q, spirit=spirit, tag=tag, season=season,
+                                                  page=page, page_size=page_size, rank=rank)
+        return {"items": items, "total": total, "page": page}
+    return cached_json(request, reg, f"search|{q}|{spirit}|{tag}|{season}|{page}|{page_size}|{rank}", produce)
 
 @router.get("/similar/{drink_id}")
-def similar(drink_id: str, k: int=20):
-    if drink_id not in REG.index_by_id: raise HTTPException(404, "Unknown id")
-    ids = recommender_service.similar(REG, drink_id, k=k)
-    return {"items": [REG.get(i) for i in ids], "source": REG.get(drink_id)}
+@metrics.profiled
+def similar(request: Request, drink_id: str, k: int=Query(20, ge=1)):
+    reg = LIVE.current
+    if drink_id not in reg.index_by_id: raise HTTPException(404, "Unknown id")
+    def produce():
+        ids = recommender_service.similar(reg, drink_id, k=k)
+        return {"items": [reg.get(i) for i in ids], "source": reg.get(drink_id)}
+    return cached_json(request, reg, f"similar|{drink_id}|{k}", produce)
 
 @router.post("/recs")
+@metrics.profiled
 def recs(body: RecsBody):
+    reg = LIVE.current
     items = recommender_service.recommend(
-        REG, body.likes, body.dislikes, body.seed_ids, body.k or 48, user_id=body.user_id or "local"
+        reg, body.likes, body.dislikes, body.seed_ids, body.k or 48, user_id=body.user_id or "local"
     )
     return {"items": items}
 
+@router.post("/recs/batch")
+@metrics.profiled
+def recs_batch(body: RecsBatchBody):
+    reg = LIVE.current
+    queries = [{"likes": r.likes, "dislikes": r.dislikes, "seed_ids": r.seed_ids, "k": r.k or 48,
+                "user_id": r.user_id or "local"} for r in body.requests]
+    results = recommender_service.recommend_batch(reg, queries)
+    return {"results": [{"user_id": r.user_id or "local", "items": items}
+                        for r, items in zip(body.requests, results)]}
+
 @router.post("/ratings")
 def rate(body: RatingBody):
-    evt = ratings_service.append_rating(REG, body.user_id, body.drink_id, body.rating, body.tried, body.ts)
-    # Recompute taste vector immediately for instant personalization
-    summary = prof.rebuild_and_save_profile(REG, user_id=body.user_id or "local")
+    reg = LIVE.current
+    evt = ratings_service.append_rating(reg, body.user_id, body.drink_id, body.rating, body.tried, body.ts)
+    # Fold the rating into the cached taste vector for instant personalization
+    summary = prof.record_rating(reg, evt)
     return {"ok": True, "event": evt, "profile": summary}
 
 @router.get("/profile")
 def profile(user_id: str = "local"):
-    # ensure profile exists / is fresh
-    summary = prof.rebuild_and_save_profile(REG, user_id=user_id)
+    reg = LIVE.current
+    # served from the in-process cache (built from ratings on first access)
+    summary = prof.get_profile_summary(reg, user_id=user_id)
     return summary
 
 @router.get("/facets")
-def get_facets():
+def get_facets(request: Request):
     from ..services.search_service import facets
-    return facets(REG)
+    reg = LIVE.current
+    return cached_json(request, reg, "facets", lambda: facets(reg), keep=True)
+
+
+@router.get("/stats/cache")
+def cache_stats():
+    return {"caches": result_cache.stats_all()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text format: per-stage / per-route latency histograms and cache counters."""
+    return PlainTextResponse(metrics.render(result_cache.stats_all()),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ---- admin: $COCKTAIL_ADMIN_TOKEN in X-Admin-Token when set, otherwise local clients only ----
+ADMIN_TOKEN_ENV = "COCKTAIL_ADMIN_TOKEN"
+_LOCAL_CLIENTS = {"127.0.0.1", "::1", "localhost"}
+
+def require_admin(request: Request):
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    if token:
+        if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), token.encode()):
+            raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+        return
+    host = request.client.host if request.client else None
+    if host not in _LOCAL_CLIENTS:
+        raise HTTPException(status_code=403, detail=f"Admin endpoints are local-only; set {ADMIN_TOKEN_ENV} for remote access")
+
+@router.get("/admin/status", dependencies=[Depends(require_admin)])
+def admin_status():
+    return LIVE.status()
 
+@router.post("/admin/reload", dependencies=[Depends(require_admin)])
+def admin_reload(wait: bool = False):
+    """Load and validate a new snapshot in the background, then swap it in atomically."""
+    started = LIVE.reload(wait=wait)
+    return {"started": started, **LIVE.status()}
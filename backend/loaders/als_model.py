@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+import numpy as np
+
+class AlsModel:
+    """
+    Active ALS item factors (scripts/train_als.py), rows aligned to the registry's ids.
+
+    Users are not stored: a user's factor is solved on request from their ratings with the
+    same implicit-ALS step the trainer uses (one rank x rank solve against the cached YtY).
+    """
+    def __init__(self, path: Path, ids: list[str]):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.key = f"{self.path.as_posix()}@{self.meta.get('trained_at_utc', '')}"
+        factors = np.load(self.path / "item_factors.npy", mmap_mode="r")
+        norms = np.load(self.path / "item_norms.npy", mmap_mode="r")
+        row_of = json.loads((self.path / "item_id_map.json").read_text())
+        rows = np.asarray([row_of.get(did, -1) for did in ids], dtype=np.int64)
+        if rows.size and np.array_equal(rows, np.arange(len(ids))) and factors.shape[0] == len(ids):
+            self.factors, self.norms = factors, norms  # trained on this build: serve the mmap as-is
+        else:
+            # feature build changed since training: gather known rows, unknown drinks score 0
+            known = (rows >= 0) & (rows < factors.shape[0])
+            self.factors = np.zeros((len(ids), factors.shape[1]), dtype=np.float32)
+            self.factors[known] = factors[rows[known]]
+            self.norms = np.full(len(ids), 1e-8, dtype=np.float32)
+            self.norms[known] = norms[rows[known]]
+        self.rank = int(self.factors.shape[1])
+        self.alpha = float(self.meta.get("alpha", 40.0))
+        self.reg = float(self.meta.get("reg", 0.05))
+        self.like_threshold = float(self.meta.get("like_threshold", 3.0))
+        self.tried_bonus = float(self.meta.get("tried_bonus", 0.10))
+        Y = np.asarray(self.factors, dtype=np.float64)
+        self.YtY = Y.T @ Y
+        self.norms32 = np.maximum(np.asarray(self.norms, dtype=np.float32), np.float32(1e-8))
+
+    @classmethod
+    def load_active(cls, active_path: Path, ids: list[str]):
+        """None when no model has been trained (or the pointer is stale)."""
+        active_path = Path(active_path)
+        if not active_path.exists():
+            return None
+        path = Path(json.loads(active_path.read_text()).get("path", ""))
+        if not all((path / f).exists() for f in ("item_factors.npy", "item_norms.npy", "item_id_map.json", "meta.json")):
+            return None
+        return cls(path, ids)
+
+    def confidences(self, events):
+        """
+        (row, rating, tried) events, one per row (the latest rating, see _UserTaste.als_events)
+        -> {row: confidence}; same weighting as the trainer. A repeated row keeps the last event.
+        """
+        denom = max(1e-6, 5.0 - self.like_threshold)
+        out = {}
+        for row, rating, tried in events:
+            w = max(0.0, rating - self.like_threshold) / denom + (self.tried_bonus if tried else 0.0)
+            if w > 0:
+                out[row] = self.alpha * w
+            else:
+                out.pop(row, None)
+        return out
+
+    def user_factor(self, events):
+        """x_u = (YtY + Yu^T (Cu - I) Yu + reg*I)^-1 Yu^T Cu 1, or None without positives."""
+        conf = self.confidences(events)
+        if not conf:
+            return None
+        rows = np.fromiter(conf.keys(), dtype=np.int64, count=len(conf))
+        c = np.fromiter(conf.values(), dtype=np.float64, count=len(conf))
+        Yu = np.asarray(self.factors[rows], dtype=np.float64)
+        A = self.YtY + (Yu.T * (c - 1.0)) @ Yu + self.reg * np.eye(self.rank)
+        x = np.linalg.solve(A, Yu.T @ c)
+        return x if np.any(x) else None
+
+    def scores(self, X: np.ndarray) -> np.ndarray:
+        """
+        Cosine of every item against user factors X [r] or [B,r] (zero rows score 0) -> float32.
+        Scored in float32 against the mmap'd factors; a float64 X would upcast a copy of them per call.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        single = X.ndim == 1
+        X = np.atleast_2d(X)
+        X = (X / np.maximum(np.linalg.norm(X, axis=1), 1e-8)[:, None]).astype(np.float32)
+        S = (self.factors @ X.T) / self.norms32[:, None]
+        return S[:, 0] if single else S
@@ -1,48 +1,179 @@
 from pathlib import Path
-import json, numpy as np
+import hashlib, itertools, json, threading, time, numpy as np
+import scipy.sparse as sp
+from .search_index import PostingIndex, Bm25Index
+from .als_model import AlsModel
 from datetime import datetime, timezone
 
+_GENERATIONS = itertools.count(1)
+
+def load_catalog(path: Path) -> list[dict]:
+    """Curated catalog: a JSON array, or one record per line for .ndjson / .jsonl."""
+    if path.suffix.lower() in (".ndjson", ".jsonl"):
+        with path.open("r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return json.loads(path.read_text())
+
 class Registry:
     def __init__(self, config_path="config/app.json"):
+        self.config_path = Path(config_path)
+        self.generation = next(_GENERATIONS)  # increases with every (re)load in this process
         self.cfg = json.loads(Path(config_path).read_text())
         p = self.cfg["paths"]
         recs_cfg = self.cfg.get("recs", {})
 
         # curated catalog
-        self.catalog_list = json.loads(Path(p["catalog"]).read_text())
+        self.catalog_list = load_catalog(Path(p["catalog"]))
         self.catalog = {r["id"]: r for r in self.catalog_list}
 
         # features
-        self.vectors = np.array(json.loads(Path(p["vectors"]).read_text()), dtype=np.float32)
         self.id_map = json.loads(Path(p["id_map"]).read_text())
         self.ids = self.id_map["ids"]
         self.index_by_id = {did: i for i, did in enumerate(self.ids)}
         self.dim = self.id_map["dim"]
         self.blocks = self.id_map["block_sizes"]
+        self.vectors = self._load_vectors(p)
+        self.vectors_csr = self._load_csr(p)
+        self.neighbors_idx, self.neighbors_score = self._load_neighbors(p)
+        self.neighbors_k = 0 if self.neighbors_idx is None else int(self.neighbors_idx.shape[1])
+        self.density = self.vectors_csr.nnz / max(1, self.vectors_csr.shape[0] * self.vectors_csr.shape[1])
 
         # block offsets in concatenation order
-        self.offsets = {}
-        off = 0
-        for k in ["spirit","tags","season","taste","ingredients","brands"]:
-            self.offsets[k] = off
-            off += self.blocks[k]
+        self.offsets = self.id_map.get("offsets")
+        if not self.offsets:
+            self.offsets = {}
+            off = 0
+            for k in ["spirit","tags","season","taste","ingredients","brands"]:
+                self.offsets[k] = off
+                off += self.blocks[k]
 
         # search index
         self.search_index = json.loads(Path(p["search_index"]).read_text())
+        self.postings = PostingIndex(self.search_index, self.ids, self.catalog)
+        self.bm25 = self._load_bm25(Path(p["search_index"]).parent, self.cfg.get("search", {}).get("bm25", {}))
+
+        # active ALS model (models/als/active.json), None until one has been trained
+        self.als_active_path = Path(p.get("als_active", "models/als/active.json"))
+        self.als = AlsModel.load_active(self.als_active_path, self.ids)
+
+        # version of everything a cacheable response depends on: feature build + config + ALS model
+        build_id = self.id_map.get("build_id") or hashlib.sha1(
+            "|".join(f"{k}:{Path(v).stat().st_mtime_ns if Path(v).exists() else 0}" for k, v in sorted(p.items())).encode()
+        ).hexdigest()[:16]
+        self.build_id = build_id
+        self.version = hashlib.sha1((build_id + json.dumps(self.cfg, sort_keys=True) +
+                                     (self.als.key if self.als else "")).encode()).hexdigest()[:16]
 
         # storage paths
         self.ratings_path = Path(p["ratings"]); self.ratings_path.parent.mkdir(parents=True, exist_ok=True)
         self.profile_path = Path(p["profile"]); self.profile_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # storage backend: "jsonl" (ratings.jsonl + profiles.json, local dev),
+        # "sharded" (per-user-hash rating shards + offset index) or "sqlite" (WAL-mode DB for both)
+        store_cfg = self.cfg.get("storage", {})
+        self.ratings_backend = store_cfg.get("backend", "jsonl")
+        self.ratings_dir = Path(store_cfg.get("ratings_dir", "storage/ratings"))
+        self.ratings_shards = int(store_cfg.get("shards", 64))
+        self.sqlite_path = Path(store_cfg.get("sqlite_path", "storage/app.db"))
+
+        # result caches (recs / search): sizes and TTLs
+        self.cache_cfg = self.cfg.get("cache", {})
+
+        # in-process profile cache
+        prof_cfg = self.cfg.get("profiles", {})
+        self.profile_flush_delay = float(prof_cfg.get("flush_delay_s", 2.0))
+        self.profile_cache_size = int(prof_cfg.get("cache_size", 10000))
+
         # blend weights + diversity
         w = recs_cfg.get("weights", {})
         self.weight_content = float(w.get("content", 0.4))
         self.weight_taste   = float(w.get("taste",   0.6))
         self.weight_als     = float(w.get("als",     0.0))
         self.diversity_penalty = float(recs_cfg.get("diversity_penalty", 0.12))
+        self.diversity_key = recs_cfg.get("diversity_key", "primary_spirit")
 
-        # optional ALS pointer path
-        self.als_active_path = Path(p.get("als_active", "models/als/active.json"))
+        # matrix used for full-catalog scoring: CSR when rows are sparse enough, else dense
+        self.sparse_threshold = float(recs_cfg.get("sparse_density_threshold", 0.1))
+        self.score_matrix = self.vectors_csr if self.density < self.sparse_threshold else self.vectors
+
+        self.loaded_at = self.now_iso()
+
+    def _load_vectors(self, p):
+        """Prefer the float32 .npy (memory-mapped, shared page cache across workers);
+        fall back to parsing drink_vectors.json for older feature builds."""
+        npy = Path(p.get("vectors_npy") or Path(p["vectors"]).with_suffix(".npy"))
+        if npy.exists():
+            mat = np.load(npy, mmap_mode="r")
+            if mat.dtype == np.float32 and mat.shape == (len(self.ids), self.dim):
+                return mat
+        return np.array(json.loads(Path(p["vectors"]).read_text()), dtype=np.float32)
+
+    def _load_csr(self, p):
+        """CSR copy of the vectors for sparse scoring; derived from the dense rows if not built."""
+        path = Path(p.get("vectors_csr") or Path(p["vectors"]).with_name("drink_vectors_csr.npz"))
+        if path.exists():
+            mat = sp.load_npz(path).tocsr()
+            if mat.shape == (len(self.ids), self.dim):
+                return mat.astype(np.float32, copy=False)
+        return sp.csr_matrix(np.asarray(self.vectors, dtype=np.float32))
+
+    def _load_neighbors(self, p):
+        """Precomputed top-K neighbour table (int32 rows, float16 scores), memory-mapped if built."""
+        nb = self.id_map.get("neighbors") or {}
+        base = Path(p["id_map"]).parent
+        idx_path = base / nb.get("idx_file", "neighbors_idx.npy")
+        score_path = base / nb.get("score_file", "neighbors_score.npy")
+        if not (nb and idx_path.exists() and score_path.exists()):
+            return None, None
+        idx = np.load(idx_path, mmap_mode="r")
+        scores = np.load(score_path, mmap_mode="r")
+        if idx.shape[0] != len(self.ids) or scores.shape != idx.shape:
+            return None, None
+        return idx, scores
+
+    def _load_bm25(self, base: Path, bm_cfg: dict):
+        """Optional BM25F ranking index (search_bm25.npz from build_features.py)."""
+        meta = self.search_index.get("bm25")
+        if not meta or not (base / meta["file"]).exists():
+            return None
+        with np.load(base / meta["file"]) as arrays:
+            return Bm25Index(arrays, self.postings.vocab, self.postings.rank_of_row, meta["fields"],
+                             k1=float(bm_cfg.get("k1", 1.2)), b=float(bm_cfg.get("b", 0.75)),
+                             field_weights=bm_cfg.get("field_weights"))
+
+    def artifact_paths(self) -> list[Path]:
+        """Files whose change should trigger a hot reload."""
+        p = self.cfg["paths"]
+        base = Path(p["id_map"]).parent
+        out = [self.config_path, Path(p["catalog"]), Path(p["id_map"]), Path(p["search_index"]),
+               self.als_active_path]
+        for key in ("vectors_npy", "vectors_csr"):
+            if p.get(key): out.append(Path(p[key]))
+        nb = self.id_map.get("neighbors") or {}
+        out += [base / nb[k] for k in ("idx_file", "score_file") if k in nb]
+        if self.search_index.get("bm25"):
+            out.append(base / self.search_index["bm25"]["file"])
+        if self.als:
+            out += [self.als.path / "item_factors.npy", self.als.path / "meta.json"]
+        return out
+
+    def validate(self):
+        """Consistency checks run before a freshly loaded snapshot is swapped in."""
+        n = len(self.ids)
+        if len(self.index_by_id) != n:
+            raise ValueError("duplicate ids in id_map")
+        if self.vectors.shape != (n, self.dim) or self.vectors_csr.shape != (n, self.dim):
+            raise ValueError(f"vectors shape {self.vectors.shape} does not match ids/dim ({n}, {self.dim})")
+        if sum(self.blocks.values()) != self.dim:
+            raise ValueError("block sizes do not add up to dim")
+        if self.neighbors_idx is not None and (self.neighbors_idx.shape[0] != n or
+                                              (self.neighbors_k and int(self.neighbors_idx.max()) >= n)):
+            raise ValueError("neighbour table does not match the catalog")
+        if self.als is not None and not np.all(np.isfinite(self.als.YtY)):
+            raise ValueError(f"ALS factors in {self.als.path} contain non-finite values")
+        missing = [i for i in self.ids if i not in self.catalog]
+        if missing:
+            raise ValueError(f"{len(missing)} feature ids missing from the catalog (e.g. {missing[0]})")
 
     def now_iso(self):  # small helper
         return datetime.now(timezone.utc).isoformat()
@@ -53,3 +184,89 @@ class Registry:
     def row(self, drink_id: str):
         ix = self.index_by_id.get(drink_id)
         return None if ix is None else self.vectors[ix]
+
+
+class LiveRegistry:
+    """
+    Holds the current Registry snapshot and swaps it atomically on reload.
+
+    Request handlers read `live.current` once and use that snapshot throughout, so in-flight
+    requests finish on the old artifacts while a new snapshot is loaded and validated in a
+    background thread. Reloads are triggered via `reload()` (admin endpoint) or by a watcher
+    thread polling artifact mtimes.
+    """
+    def __init__(self, config_path="config/app.json"):
+        self.config_path = Path(config_path)
+        self.current = Registry(config_path)
+        self.last_error = None
+        self.reloads = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._loading = False
+        self._mtimes = self._stat()
+        reload_cfg = self.current.cfg.get("reload", {})
+        if reload_cfg.get("watch", False):
+            self.watch(float(reload_cfg.get("interval_s", 5.0)))
+
+    def on_swap(self, fn):
+        """Register fn(old, new), called after each successful swap."""
+        self._listeners.append(fn)
+
+    def _stat(self):
+        out = {}
+        for path in self.current.artifact_paths():
+            try:
+                st = path.stat()
+                out[str(path)] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                out[str(path)] = None
+        return out
+
+    def _load(self):
+        try:
+            new = Registry(self.config_path)
+            new.validate()
+        except Exception as e:  # keep serving the old snapshot
+            self.last_error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                self._loading = False
+            return
+        old, self.current = self.current, new
+        self.last_error = None
+        self.reloads += 1
+        self._mtimes = self._stat()
+        with self._lock:
+            self._loading = False
+        for fn in self._listeners:
+            try:
+                fn(old, new)
+            except Exception:
+                pass
+
+    def reload(self, wait=False):
+        """Start loading a new snapshot in the background; returns False if one is in progress."""
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+        t = threading.Thread(target=self._load, name="registry-reload", daemon=True)
+        t.start()
+        if wait:
+            t.join()
+        return True
+
+    def watch(self, interval_s=5.0):
+        def loop():
+            while True:
+                time.sleep(interval_s)
+                if self._stat() != self._mtimes and not self._loading:
+                    self.reload()
+        threading.Thread(target=loop, name="registry-watch", daemon=True).start()
+
+    def status(self):
+        reg = self.current
+        return {
+            "version": reg.version, "build_id": reg.build_id, "generation": reg.generation,
+            "loaded_at": reg.loaded_at, "items": len(reg.ids), "reloads": self.reloads,
+            "loading": self._loading, "last_error": self.last_error,
+        }
@@ -0,0 +1,256 @@
+from bisect import bisect_left
+import numpy as np
+
+PREFIX_MIN_LEN = 2       # shorter partial words are too ambiguous to expand
+PREFIX_MAX_EXPANSIONS = 200
+FUZZY_MIN_LEN = 4        # only correct typos in reasonably long words
+
+def _deletes1(tok: str) -> set[str]:
+    return {tok[:i] + tok[i+1:] for i in range(len(tok))}
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Optimal-string-alignment distance <= 1: equal, or one insert/delete/substitute/adjacent swap."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if i == len(a):
+        return True                                    # equal, or b has one extra trailing char
+    if len(a) < len(b):
+        return a[i:] == b[i+1:]                        # one inserted character
+    if a[i+1:] == b[i+1:]:
+        return True                                    # one substituted character
+    return i + 1 < len(a) and a[i] == b[i+1] and a[i+1] == b[i] and a[i+2:] == b[i+2:]  # adjacent swap
+
+class PostingIndex:
+    """
+    search_index.json compiled once into sorted int32 posting arrays.
+
+    Postings hold *name ranks* (position of the drink in case-insensitive name order) instead of
+    ids, so any intersection comes out already sorted by name and a page is a plain slice.
+    """
+    def __init__(self, search_index: dict, ids: list[str], catalog: dict):
+        self.ids = ids
+        index_by_id = {did: i for i, did in enumerate(ids)}
+        names = [((catalog.get(did) or {}).get("name") or "").lower() for did in ids]
+        order = sorted(range(len(ids)), key=lambda i: (names[i], ids[i]))
+        self.row_of_rank = np.asarray(order, dtype=np.int32)               # rank -> row
+        self.rank_of_row = np.empty(len(ids), dtype=np.int32)             # row  -> rank
+        self.rank_of_row[self.row_of_rank] = np.arange(len(ids), dtype=np.int32)
+        self.id_of_rank = [ids[i] for i in order]
+        self.all = np.arange(len(ids), dtype=np.int32)
+
+        def compile_postings(d: dict) -> dict[str, np.ndarray]:
+            out = {}
+            for key, members in d.items():
+                rows = [index_by_id[m] for m in members if m in index_by_id]
+                out[key] = np.sort(self.rank_of_row[np.asarray(rows, dtype=np.int64)]) if rows \
+                    else np.empty(0, dtype=np.int32)
+            return out
+
+        self.tokens    = compile_postings(search_index.get("tok2ids", {}))
+        self.by_spirit = compile_postings(search_index.get("by_spirit", {}))
+        self.by_tag    = compile_postings(search_index.get("by_tag", {}))
+        self.by_season = compile_postings(search_index.get("by_season", {}))
+        # sorted vocabulary (prefix ranges via bisect) + deletion-neighbourhood index (typos)
+        self.vocab = search_index.get("tokens") or sorted(self.tokens)
+        deletes = search_index.get("deletes")
+        if deletes is None:
+            deletes = {}
+            for i, tok in enumerate(self.vocab):
+                if len(tok) < 3: continue
+                for d in _deletes1(tok):
+                    deletes.setdefault(d, []).append(i)
+        self.deletes = deletes
+
+        self.facet_counts = {
+            "spirits": {k: int(len(v)) for k, v in self.by_spirit.items()},
+            "tags":    {k: int(len(v)) for k, v in self.by_tag.items()},
+            "seasons": {k: int(len(v)) for k, v in self.by_season.items()},
+        }
+
+    def prefix_tokens(self, prefix: str) -> list[str]:
+        """Vocabulary tokens starting with prefix (bisect range over the sorted vocab)."""
+        if len(prefix) < PREFIX_MIN_LEN:
+            return []
+        lo = bisect_left(self.vocab, prefix)
+        hi = bisect_left(self.vocab, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        return self.vocab[lo:min(hi, lo + PREFIX_MAX_EXPANSIONS)]
+
+    def fuzzy_tokens(self, tok: str) -> list[str]:
+        """
+        Vocabulary tokens within one edit (insert/delete/substitute/adjacent swap) of tok.
+        Shared deletions only propose candidates: "abeqy" and "abbey" both reduce to "abey" yet
+        are two edits apart, so each candidate is checked with a bounded OSA comparison.
+        """
+        if len(tok) < FUZZY_MIN_LEN:
+            return []
+        variants = _deletes1(tok)
+        found = set(self.deletes.get(tok, ()))           # tok lacks one character
+        for d in variants:
+            found.update(self.deletes.get(d, ()))        # one substituted / swapped character
+        out = {w for w in (self.vocab[i] for i in found) if _within_one_edit(tok, w)}
+        out.update(d for d in variants if d in self.tokens)  # tok has one extra character
+        return sorted(out)
+
+    def expand(self, tok: str) -> list[str]:
+        """Vocabulary tokens a query token stands for: itself, else prefix, else typo matches."""
+        if tok in self.tokens:
+            return [tok]
+        return self.prefix_tokens(tok) or self.fuzzy_tokens(tok)
+
+    def resolve(self, tok: str) -> np.ndarray:
+        """
+        Postings for one query token: the exact token if indexed, else the union over tokens it
+        prefixes (as-you-type), else the union over tokens one typo away.
+        """
+        expanded = self.expand(tok)
+        if not expanded:
+            return np.empty(0, dtype=np.int32)
+        if len(expanded) == 1:
+            return self.tokens[expanded[0]]
+        return np.unique(np.concatenate([self.tokens[t] for t in expanded]))
+
+    @staticmethod
+    def intersect(lists: list[np.ndarray]) -> np.ndarray:
+        """Vectorised intersection of sorted unique rank arrays, smallest first."""
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        lists = sorted(lists, key=len)
+        out = lists[0]
+        for arr in lists[1:]:
+            if not len(out): break
+            out = np.intersect1d(out, arr, assume_unique=True)
+        return out
+
+    @staticmethod
+    def intersect_count(lists: list[np.ndarray]) -> int:
+        """len(intersect(lists)) without building it: the smallest list is probed into the
+        others with searchsorted, O(s log L) instead of sorting the concatenations."""
+        if not lists:
+            return 0
+        lists = sorted(lists, key=len)
+        q = lists[0]
+        ok = np.ones(len(q), dtype=bool)
+        for arr in lists[1:]:
+            if not ok.any(): break
+            pos = np.searchsorted(arr, q)
+            inside = pos < len(arr)
+            ok &= inside
+            ok[inside] &= arr[pos[inside]] == q[inside]
+        return int(ok.sum())
+
+
+class Bm25Index:
+    """
+    BM25F impacts over the same vocabulary, laid out for top-N retrieval.
+
+    Per term, postings are kept twice: by name rank (for membership / random access with
+    searchsorted) and by descending impact (for sorted access). `top()` runs a threshold
+    algorithm over the impact-ordered lists and stops once no unseen drink can enter the top N,
+    so common tokens ("juice", "vodka") only have their head read.
+    """
+    CHUNK = 64
+
+    def __init__(self, arrays, vocab: list[str], rank_of_row: np.ndarray, fields: list[str],
+                 k1=1.2, b=0.75, field_weights: dict | None = None):
+        self.vocab_ix = {t: i for i, t in enumerate(vocab)}
+        term_ptr = np.asarray(arrays["term_ptr"], dtype=np.int64)
+        post_row = np.asarray(arrays["post_row"], dtype=np.int64)
+        tf = np.asarray(arrays["tf"], dtype=np.float32)
+        doc_len = np.asarray(arrays["doc_len"], dtype=np.float32)
+        n_docs = doc_len.shape[0]
+        fw = np.asarray([float((field_weights or {}).get(f, 1.0)) for f in fields], dtype=np.float32)
+
+        # BM25F: length-normalised tf per field, weighted and summed, then saturated; times idf
+        avg_len = np.maximum(doc_len.mean(axis=0), 1e-6)
+        norm = 1.0 - b + b * doc_len[post_row] / avg_len              # [nnz, F]
+        wtf = (tf / norm) @ fw                                         # [nnz]
+        df = np.diff(term_ptr).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        term_of = np.repeat(np.arange(len(df)), np.diff(term_ptr))
+        impact = (idf[term_of] * wtf * (k1 + 1.0) / (wtf + k1)).astype(np.float32)
+
+        ranks = rank_of_row[post_row].astype(np.int32)
+        by_rank = np.lexsort((ranks, term_of))                        # term, then name rank
+        self.ptr = term_ptr
+        self.doc_ranks, self.doc_imp = ranks[by_rank], impact[by_rank]
+        by_imp = np.lexsort((ranks, -impact, term_of))                # term, impact desc, name rank
+        self.imp_ranks, self.imp_vals = ranks[by_imp], impact[by_imp]
+
+    def term_lists(self, terms: list[str]):
+        """(impact-ordered ranks, impacts, rank-ordered ranks, impacts) for a token group.
+        A group of several terms (prefix / typo expansion) scores a drink by its best term."""
+        ids = [self.vocab_ix[t] for t in terms if t in self.vocab_ix]
+        if len(ids) == 1:
+            s, e = self.ptr[ids[0]], self.ptr[ids[0] + 1]
+            return self.imp_ranks[s:e], self.imp_vals[s:e], self.doc_ranks[s:e], self.doc_imp[s:e]
+        if not ids:
+            empty = np.empty(0, dtype=np.int32)
+            return empty, empty.astype(np.float32), empty, empty.astype(np.float32)
+        r = np.concatenate([self.doc_ranks[self.ptr[i]:self.ptr[i + 1]] for i in ids])
+        v = np.concatenate([self.doc_imp[self.ptr[i]:self.ptr[i + 1]] for i in ids])
+        o = np.lexsort((-v, r))
+        r, v = r[o], v[o]
+        keep = np.ones(len(r), dtype=bool); keep[1:] = r[1:] != r[:-1]   # best impact per drink
+        r, v = r[keep], v[keep]
+        o = np.lexsort((r, -v))
+        return r[o], v[o], r, v
+
+    def top(self, groups: list[tuple], filters: list[np.ndarray], n: int):
+        """
+        Name ranks of the best n drinks matching every group and filter, by summed impact
+        (ties by name). groups: output of term_lists; filters: sorted rank arrays.
+        """
+        if not groups or n <= 0:
+            return np.empty(0, dtype=np.int32)
+
+        def contains(sorted_arr, q):
+            pos = np.searchsorted(sorted_arr, q)
+            ok = pos < len(sorted_arr)
+            ok[ok] = sorted_arr[pos[ok]] == q[ok]
+            return ok, pos
+
+        seen = set()
+        cand_r, cand_s = [], []
+        depth = 0
+        while True:
+            fresh = []
+            for imp_r, _, _, _ in groups:
+                chunk = imp_r[depth:depth + self.CHUNK]
+                fresh.extend(int(x) for x in chunk if int(x) not in seen)
+            depth += self.CHUNK
+            if fresh:
+                q = np.unique(np.asarray(fresh, dtype=np.int32))
+                seen.update(q.tolist())
+                ok = np.ones(len(q), dtype=bool)
+                score = np.zeros(len(q), dtype=np.float32)
+                for _, _, doc_r, doc_v in groups:
+                    hit, pos = contains(doc_r, q)
+                    ok &= hit
+                    score[hit] += doc_v[pos[hit]]
+                for f in filters:
+                    ok &= contains(f, q)[0]
+                cand_r.append(q[ok]); cand_s.append(score[ok])
+
+            # any group exhausted → every drink in the intersection has been seen
+            if any(depth >= len(g[0]) for g in groups):
+                break
+            # best possible score of an unseen drink: sum of each list's impact at the cursor.
+            # A single list is read in (impact desc, name) order, so an unseen drink that ties the
+            # n-th score sorts after it and cannot displace it; flat-impact tokens stop at depth n.
+            threshold = sum(float(g[1][depth - 1]) for g in groups)
+            have_s = np.concatenate(cand_s) if cand_s else np.empty(0, dtype=np.float32)
+            if len(have_s) >= n:
+                nth = -np.partition(-have_s, n - 1)[n - 1]
+                if nth > threshold or (nth == threshold and len(groups) == 1):
+                    break
+
+        if not cand_r:
+            return np.empty(0, dtype=np.int32)
+        r = np.concatenate(cand_r); s = np.concatenate(cand_s)
+        o = np.lexsort((r, -s))[:n]
+        return r[o]
@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import router
+from .services import metrics
 
 app = FastAPI(title="Cocktail Recommender API")
 
@@ -16,13 +18,31 @@ app.add_middleware(
     allow_credentials=False,  # only True if you use cookies/sessions
 )
 
+# per-route latency histograms + Server-Timing header (no-op unless "metrics.enabled")
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    token = metrics.begin_request()
+    if token is None:
+        return await call_next(request)
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.end_request(token, request.method, "error", 500, time.perf_counter() - t0)
+        raise
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    timing = metrics.end_request(token, request.method, route, response.status_code, time.perf_counter() - t0)
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
 
 @app.get("/")
 def root():
     return {
         "ok": True,
         "message": "Cocktail Recommender API",
-        "endpoints": ["/drinks", "/search", "/similar/{id}", "/recs", "/ratings", "/docs"]
+        "endpoints": ["/drinks", "/search", "/similar/{id}", "/recs", "/recs/batch", "/ratings", "/metrics", "/docs"]
     }
 
 app.include_router(router)
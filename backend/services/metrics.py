@@ -0,0 +1,159 @@
+import bisect, contextvars, cProfile, functools, itertools, threading, time
+from contextlib import nullcontext
+from pathlib import Path
+
+# Histogram buckets (seconds) shared by every stage and route.
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_ENABLED = False
+_SERVER_TIMING = False
+_PROFILE_EVERY = 0
+_PROFILE_DIR = Path("storage/cprofile")
+_PROFILE_COUNTER = itertools.count(1)
+_NOOP = nullcontext()
+
+# stage -> seconds for the request being served (None outside a request)
+_REQUEST: contextvars.ContextVar = contextvars.ContextVar("metrics_request", default=None)
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(itertools.accumulate(self.counts)), self.sum, self.count
+
+_STAGES: dict[str, Histogram] = {}
+_ROUTES: dict[tuple, Histogram] = {}
+_LOCK = threading.Lock()
+
+def _hist(table, key) -> Histogram:
+    h = table.get(key)
+    if h is None:
+        with _LOCK:
+            h = table.setdefault(key, Histogram())
+    return h
+
+def configure(cfg: dict):
+    """Apply the "metrics" config section (called at startup and after each registry reload)."""
+    global _ENABLED, _SERVER_TIMING, _PROFILE_EVERY, _PROFILE_DIR
+    m = cfg.get("metrics", {})
+    _ENABLED = bool(m.get("enabled", False))
+    _SERVER_TIMING = _ENABLED and bool(m.get("server_timing", False))
+    _PROFILE_EVERY = int(m.get("profile_every", 0)) if _ENABLED else 0
+    _PROFILE_DIR = Path(m.get("profile_dir", "storage/cprofile"))
+
+def enabled() -> bool:
+    return _ENABLED
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        _hist(_STAGES, self.name).observe(dt)
+        req = _REQUEST.get()
+        if req is not None:
+            req[self.name] = req.get(self.name, 0.0) + dt
+        return False
+
+def span(name: str):
+    """`with span("recs.score"):` times a stage; a shared no-op when metrics are disabled."""
+    return _Span(name) if _ENABLED else _NOOP
+
+# ---- request scope (used by the HTTP middleware) ----
+
+def begin_request():
+    return _REQUEST.set({}) if _ENABLED else None
+
+def end_request(token, method: str, route: str, status: int, seconds: float) -> str | None:
+    """Record the request; returns the Server-Timing header value if enabled."""
+    if token is None:
+        return None
+    stages = _REQUEST.get() or {}
+    _REQUEST.reset(token)
+    _hist(_ROUTES, (method, route, str(status))).observe(seconds)
+    if not _SERVER_TIMING:
+        return None
+    parts = [f"{name};dur={dt * 1000:.3f}" for name, dt in stages.items()]
+    parts.append(f"total;dur={seconds * 1000:.3f}")
+    return ", ".join(parts)
+
+# ---- sampled cProfile ----
+
+def profiled(fn):
+    """Run 1 in `profile_every` calls of a handler under cProfile, dumping a .prof per sample."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _PROFILE_EVERY or next(_PROFILE_COUNTER) % _PROFILE_EVERY:
+            return fn(*args, **kwargs)
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            _PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            prof.dump_stats(_PROFILE_DIR / f"{fn.__name__}-{time.time_ns()}.prof")
+    return wrapper
+
+# ---- Prometheus text exposition ----
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines(name, table, label_names):
+    out = []
+    for key, h in sorted(table.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        labels = ",".join(f'{n}="{_label(v)}"' for n, v in zip(label_names, key))
+        cum, total, count = h.snapshot()
+        for le, c in zip((*BUCKETS, "+Inf"), cum):
+            out.append(f'{name}_bucket{{{labels},le="{le}"}} {c}')
+        out.append(f"{name}_sum{{{labels}}} {total:.9f}")
+        out.append(f"{name}_count{{{labels}}} {count}")
+    return out
+
+def render(cache_stats: dict | None = None) -> str:
+    lines = [
+        "# HELP cocktail_stage_seconds Time spent in instrumented service stages.",
+        "# TYPE cocktail_stage_seconds histogram",
+        *_histogram_lines("cocktail_stage_seconds", dict(_STAGES), ("stage",)),
+        "# HELP cocktail_http_request_seconds HTTP request latency by route.",
+        "# TYPE cocktail_http_request_seconds histogram",
+        *_histogram_lines("cocktail_http_request_seconds", dict(_ROUTES), ("method", "route", "status")),
+    ]
+    if cache_stats:
+        for metric, field in (("hits", "hits"), ("misses", "misses"), ("evictions", "evictions")):
+            lines.append(f"# TYPE cocktail_cache_{metric}_total counter")
+            for name, st in sorted(cache_stats.items()):
+                lines.append(f'cocktail_cache_{metric}_total{{cache="{_label(name)}"}} {st.get(field, 0)}')
+        lines.append("# TYPE cocktail_cache_entries gauge")
+        for name, st in sorted(cache_stats.items()):
+            lines.append(f'cocktail_cache_entries{{cache="{_label(name)}"}} {st.get("entries", 0)}')
+    return "\n".join(lines) + "\n"
+
+def reset():
+    with _LOCK:
+        _STAGES.clear()
+        _ROUTES.clear()
@@ -1,6 +1,15 @@
-import json, os
+import atexit, itertools, json, os, threading, time
+from collections import OrderedDict
 from pathlib import Path
 import numpy as np
+from . import ratings_service, result_cache
+from .sqlite_store import SqliteProfileStore, db_for
+from .metrics import span
+
+_TASTE_VERSIONS = itertools.count(1)  # process-wide, so versions never repeat across evictions
+
+LIKE_THRESHOLD = 4.0
+DISLIKE_THRESHOLD = 2.0
 
 def _zero(dim): return np.zeros((dim,), dtype=np.float32)
 
@@ -20,7 +29,7 @@ def load_all_ratings(ratings_path: Path, user_id: str = "local"):
                 continue
     return out
 
-def compute_taste_vector(reg, ratings: list, like_threshold=4.0, dislike_threshold=2.0):
+def compute_taste_vector(reg, ratings: list, like_threshold=LIKE_THRESHOLD, dislike_threshold=DISLIKE_THRESHOLD):
     """Average positives minus a small average of dislikes; L2 normalize."""
     pos_rows, neg_rows = [], []
     for r in ratings:
@@ -72,26 +81,310 @@ def load_profiles(profile_path: Path):
 
 def save_profiles(profile_path: Path, data: dict):
     profile_path.parent.mkdir(parents=True, exist_ok=True)
-    profile_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp = profile_path.with_name(profile_path.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, profile_path)
 
-def rebuild_and_save_profile(reg, user_id="local"):
-    """Recompute taste vec from ratings, persist to storage/profiles.json, return summary."""
-    ratings = load_all_ratings(reg.ratings_path, user_id)
-    taste_vec = compute_taste_vector(reg, ratings)
-    profiles = load_profiles(reg.profile_path)
-    profiles[user_id] = {
+class JsonProfileStore:
+    """storage/profiles.json: whole-file read-merge-write (single process, local dev)."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def put_many(self, entries: dict):
+        profiles = load_profiles(self.path)
+        profiles.update(entries)
+        save_profiles(self.path, profiles)
+
+    def get(self, user_id: str):
+        return load_profiles(self.path).get(user_id)
+
+def profile_store_for(reg):
+    if reg.ratings_backend == "sqlite":
+        return SqliteProfileStore(db_for(reg.sqlite_path))
+    return JsonProfileStore(reg.profile_path)
+
+def _profile_entry(reg, taste_vec, count, updated_at=None):
+    return {
         "has_taste": bool(taste_vec is not None),
         "taste_vec": taste_vec.tolist() if taste_vec is not None else None,
-        "ratings_count": len(ratings),
-        "updated_at": reg.now_iso(),
+        "ratings_count": count,
+        "updated_at": updated_at or reg.now_iso(),
     }
-    save_profiles(reg.profile_path, profiles)
+
+def rebuild_and_save_profile(reg, user_id="local"):
+    """Recompute taste vec from ratings, persist to storage/profiles.json, return summary."""
+    ratings = ratings_service.user_ratings(reg, user_id)
+    taste_vec = compute_taste_vector(reg, ratings)
+    profile_store_for(reg).put_many({user_id: _profile_entry(reg, taste_vec, len(ratings))})
     summary = summarize_taste(reg, taste_vec) if taste_vec is not None else {}
     return {"user_id": user_id, "ratings_count": len(ratings), "summary": summary, "has_taste": taste_vec is not None}
 
+# ----------------- In-process profile cache ----------------- #
+
+class _UserTaste:
+    """Running sums of a user's liked / disliked rows; taste vec is derived in O(D)."""
+    __slots__ = ("pos_sum", "pos_n", "neg_sum", "neg_n", "count", "taste", "version", "updated_at", "cursor",
+                 "rated", "als_key", "als_vec", "lock")
+
+    def __init__(self, dim):
+        self.lock = threading.Lock()  # serialises catch-up / ALS solve for this user only
+        self.pos_sum = np.zeros((dim,), dtype=np.float64); self.pos_n = 0
+        self.neg_sum = np.zeros((dim,), dtype=np.float64); self.neg_n = 0
+        self.count = 0
+        self.taste = None
+        self.version = 0
+        self.updated_at = None
+        self.cursor = None  # rating store position already folded in
+        self.rated = {}     # row -> (ts, rating, tried) of the latest rating, for the ALS user-factor solve
+        self.als_key = None
+        self.als_vec = None
+
+    def add(self, reg, evt):
+        self.count += 1
+        ix = reg.index_by_id.get(evt.get("drink_id"))
+        if ix is None:
+            return
+        rating = float(evt.get("rating", 0))
+        ts = int(evt["ts"]) if evt.get("ts") is not None else -1
+        # latest rating per drink wins, like the trainer (RatingsDataset.latest): newer ts, ties to arrival
+        prev = self.rated.get(ix)
+        if prev is None or ts >= prev[0]:
+            self.rated[ix] = (ts, rating, bool(evt.get("tried", False)))
+        if rating >= LIKE_THRESHOLD:
+            self.pos_sum += reg.vectors[ix]; self.pos_n += 1
+        elif rating <= DISLIKE_THRESHOLD:
+            self.neg_sum += reg.vectors[ix]; self.neg_n += 1
+
+    def refresh(self):
+        """Same formula as compute_taste_vector: mean(pos) - 0.5 * mean(neg), L2 normalized."""
+        self.version = next(_TASTE_VERSIONS)
+        if not self.pos_n and not self.neg_n:
+            self.taste = None
+            return
+        v = np.zeros_like(self.pos_sum)
+        if self.pos_n: v += self.pos_sum / self.pos_n
+        if self.neg_n: v -= 0.5 * self.neg_sum / self.neg_n
+        n = float(np.linalg.norm(v))
+        self.taste = (v / n).astype(np.float32) if n > 0 else None
+
+    def als_events(self):
+        """(row, rating, tried) of the latest rating per drink."""
+        return [(row, rating, tried) for row, (_, rating, tried) in self.rated.items()]
+
+
+class ProfileCache:
+    """
+    Per-process taste vectors. A user's history is read once (on first access); after that
+    only events past the entry's store cursor are read and folded into the running sums in
+    O(D) each, which also picks up ratings written by other worker processes. Changed profiles
+    are written to the profile store by a background thread, batched every `flush_delay` seconds.
+
+    `lock` only guards the LRU dict and the dirty set; store reads run under the entry's own
+    lock, so requests for different users never wait on each other's I/O.
+    """
+    def __init__(self, reg, flush_delay=2.0, max_users=10000):
+        self.reg = reg
+        self.flush_delay = float(flush_delay)
+        self.max_users = int(max_users)
+        self.users: "OrderedDict[str, _UserTaste]" = OrderedDict()
+        self.dirty: set[str] = set()
+        self.evicted: dict = {}  # profile entries of evicted users not yet written
+        self.lock = threading.RLock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="profile-flush", daemon=True)
+        self._thread.start()
+
+    def _slot(self, user_id):
+        """(entry, created, evicted dirty entries to write); caller holds self.lock."""
+        e = self.users.get(user_id)
+        created = e is None
+        evicted = {}
+        if created:
+            e = _UserTaste(self.reg.dim)
+            self.users[user_id] = e
+            evicted = self._evict(keep=user_id)
+        else:
+            self.users.move_to_end(user_id)
+        return e, created, evicted
+
+    def _catch_up(self, e, user_id, created):
+        """Fold in the user's events past e.cursor; caller holds e.lock (not self.lock)."""
+        with span("profile.catchup"):
+            events, e.cursor = ratings_service.user_ratings_since(self.reg, user_id, e.cursor)
+            for evt in events:
+                e.add(self.reg, evt)
+        if events or created:
+            e.refresh()
+        return bool(events)
+
+    def _evict(self, keep):
+        """Drop least-recently used entries other than `keep`; they are rebuilt from ratings on
+        next access. Returns the evicted entries that were dirty, still to be written."""
+        out = {}
+        for uid in list(self.users):
+            if len(self.users) <= self.max_users: break
+            if uid == keep: continue
+            e = self.users.pop(uid)
+            if uid in self.dirty:
+                self.dirty.discard(uid)
+                out[uid] = e
+        return out
+
+    def _snapshot(self, e):
+        with e.lock:  # a consistent taste / count / updated_at
+            return _profile_entry(self.reg, e.taste, e.count, e.updated_at)
+
+    def _mark_dirty(self, user_id):
+        self.dirty.add(user_id)
+        self._wake.set()
+
+    def add_rating(self, evt):
+        """Called after evt was appended to the rating store; folds it (and anything newer) in."""
+        return self.get(evt.get("user_id") or "local", wrote=True)
+
+    def get(self, user_id, wrote=False):
+        """
+        The user's entry, caught up with the rating store. Only a write (`wrote`, from
+        add_rating) or events arriving for an entry already in memory mark it dirty: loading
+        a user's existing history on first access reproduces what is already persisted.
+        """
+        with self.lock:
+            e, created, evicted = self._slot(user_id)
+        if evicted:  # written before they leave memory for good; retried by the flusher on error
+            try:
+                self._write({uid: self._snapshot(x) for uid, x in evicted.items()})
+            except Exception:
+                self._wake.set()
+        with e.lock:
+            changed = self._catch_up(e, user_id, created)
+            persist = wrote or (changed and not created)
+            if persist:
+                e.updated_at = self.reg.now_iso()
+        if changed:
+            result_cache.invalidate_tag(("user", user_id))
+        if persist:
+            with self.lock:
+                live = self.users.get(user_id) is e
+                if live:
+                    self._mark_dirty(user_id)
+            if not live:  # evicted while catching up: hand the update to the flusher directly
+                snap = self._snapshot(e)
+                with self.lock:
+                    self.evicted[user_id] = snap
+                    self._wake.set()
+        return e
+
+    def taste_vec(self, user_id):
+        return self.get(user_id).taste
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty and not self.evicted:
+                return
+            entries = {uid: self.users[uid] for uid in self.dirty if uid in self.users}
+            self.dirty.clear()
+            pending, self.evicted = self.evicted, {}
+        for uid, e in entries.items():
+            pending[uid] = self._snapshot(e)
+        self._write(pending)
+
+    def _write(self, pending):
+        try:
+            with span("profile.flush"):
+                profile_store_for(self.reg).put_many(pending)
+        except Exception:
+            with self.lock:
+                for uid, entry in pending.items():
+                    if uid in self.users:
+                        self.dirty.add(uid)
+                    else:
+                        self.evicted.setdefault(uid, entry)
+            raise
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            if self._closed: break
+            self._wake.clear()
+            time.sleep(self.flush_delay)  # batch bursts of ratings into one write
+            try:
+                self.flush()
+            except Exception:
+                self._wake.set()  # keep the dirty set; retry on the next round
+
+
+_CACHE: ProfileCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+def profile_cache(reg) -> ProfileCache:
+    """
+    Process-wide cache bound to the newest registry snapshot seen. A hot reload with the same
+    feature build carries the cached users over; requests still running on an older snapshot
+    share the current cache (see _same_build).
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None or reg.generation > _CACHE.reg.generation:
+            old = _CACHE
+            if old is not None:
+                old.close()
+            _CACHE = ProfileCache(reg, flush_delay=reg.profile_flush_delay, max_users=reg.profile_cache_size)
+            if old is not None and old.reg.build_id == reg.build_id:
+                with old.lock:
+                    _CACHE.users = old.users
+        return _CACHE
+
+def _same_build(reg, cache):
+    # taste vectors live in the feature space of cache.reg; a request on another build can't use them
+    return cache.reg is reg or cache.reg.build_id == reg.build_id
+
+@atexit.register
+def _flush_on_exit():
+    if _CACHE is not None:
+        _CACHE.close()
+
+def _summary(reg, user_id, e):
+    summary = summarize_taste(reg, e.taste) if e.taste is not None else {}
+    return {"user_id": user_id, "ratings_count": e.count, "summary": summary, "has_taste": e.taste is not None}
+
+def record_rating(reg, evt):
+    """Fold one new rating into the user's cached taste vector; return the /profile summary."""
+    user_id = evt.get("user_id") or "local"
+    cache = profile_cache(reg)
+    return _summary(cache.reg, user_id, cache.add_rating(evt))
+
+def get_profile_summary(reg, user_id="local"):
+    cache = profile_cache(reg)
+    return _summary(cache.reg, user_id, cache.get(user_id))
+
 def get_taste_vec(reg, user_id="local"):
-    profiles = load_profiles(reg.profile_path)
-    entry = profiles.get(user_id)
-    if not entry or not entry.get("taste_vec"):
-        return None
-    return np.array(entry["taste_vec"], dtype=np.float32)
+    return get_taste(reg, user_id)[0]
+
+def get_taste(reg, user_id="local"):
+    """(taste vec or None, version) — the version changes whenever the taste vector does."""
+    cache = profile_cache(reg)
+    e = cache.get(user_id)
+    if not _same_build(reg, cache):
+        return None, 0
+    return e.taste, e.version
+
+def get_user_vectors(reg, user_id="local"):
+    """(taste vec or None, ALS user factor or None, version) read under the user's lock."""
+    cache = profile_cache(reg)
+    e = cache.get(user_id)
+    if not _same_build(reg, cache):
+        return None, None, 0
+    with e.lock:
+        als_vec = None
+        if reg.als is not None and reg.weight_als > 0:
+            key = (reg.als.key, e.version)
+            if e.als_key != key:  # solved once per (model, rating history)
+                e.als_vec, e.als_key = reg.als.user_factor(e.als_events()), key
+            als_vec = e.als_vec
+        return e.taste, als_vec, e.version
@@ -1,8 +1,288 @@
-import json, time
+import json, threading, time, zlib
+from contextlib import contextmanager
+from pathlib import Path
+from .sqlite_store import SqliteRatingsStore, db_for
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive cross-process lock held on `path` (created if missing) for the with-block."""
+    with path.open("a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# ----------------- Rating stores ----------------- #
+
+class JsonlRatingsStore:
+    """
+    Single append-only storage/ratings.jsonl (local dev). Per-user line offsets are indexed in
+    memory as the file grows, so each new byte is parsed once rather than once per user lookup.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self._spans: dict[str, list] = {}  # uid -> [(offset, length)] of their lines
+        self._end = 0                      # bytes of the file indexed so far
+
+    def append(self, evt: dict):
+        with self.lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(evt) + "\n")
+
+    def _index(self):
+        """Index lines appended since the last call; caller holds self.lock."""
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size < self._end:  # file was reset (make reset): start over
+            self._spans, self._end = {}, 0
+        if size <= self._end:
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._end)
+            for raw in f:
+                if not raw.endswith(b"\n"): break  # partial trailing write
+                try:
+                    uid = json.loads(raw).get("user_id") or "local"
+                    self._spans.setdefault(uid, []).append((self._end, len(raw)))
+                except Exception:
+                    pass
+                self._end += len(raw)
+
+    def iter_events(self):
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line: continue
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue
+
+    def user_events(self, user_id: str):
+        return self.events_since(user_id)[0]
+
+    def events_since(self, user_id: str, cursor=None):
+        """Events of user_id after cursor (count of their indexed lines) → (events, new cursor)."""
+        with self.lock:
+            self._index()
+            spans = list(self._spans.get(user_id, ()))
+        start = cursor or 0
+        out = []
+        if len(spans) <= start:
+            return out, start
+        with self.path.open("rb") as f:
+            for off, ln in spans[start:]:
+                f.seek(off)
+                try:
+                    out.append(json.loads(f.read(ln)))
+                except Exception:
+                    continue
+        return out, len(spans)
+
+
+class ShardedRatingsStore:
+    """
+    Ratings partitioned by crc32(user_id) into <root>/shard_NNN.jsonl. Each shard has a
+    sidecar shard_NNN.idx of JSON lines [user_id, byte_offset, byte_length], so reading a
+    user's history seeks straight to their lines. Indexes are cached in memory and extended
+    from the sidecar (or rebuilt from the shard) when the files grow. Every write to a shard
+    or its sidecar holds the shard's lock file (shard_NNN.lock) across worker processes.
+    """
+    def __init__(self, root: Path, shards: int = 64):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shards = int(shards)
+        self.lock = threading.Lock()
+        self._index: dict[int, dict] = {}  # shard -> {"users": {uid: [(off, len)]}, "idx_pos": int, "end": int}
+
+    def shard_of(self, user_id: str) -> int:
+        return zlib.crc32((user_id or "local").encode("utf-8")) % self.shards
+
+    def shard_path(self, shard: int) -> Path:
+        return self.root / f"shard_{shard:03d}.jsonl"
+
+    def index_path(self, shard: int) -> Path:
+        return self.root / f"shard_{shard:03d}.idx"
+
+    def lock_path(self, shard: int) -> Path:
+        return self.root / f"shard_{shard:03d}.lock"
+
+    def _read_sidecar(self, shard: int, ix: dict) -> None:
+        """Pick up entries appended to the sidecar since the last read."""
+        idx_path = self.index_path(shard)
+        if not idx_path.exists() or idx_path.stat().st_size <= ix["idx_pos"]:
+            return
+        with idx_path.open("rb") as f:
+            f.seek(ix["idx_pos"])
+            for raw in f:
+                if not raw.endswith(b"\n"): break  # partial trailing write
+                ix["idx_pos"] += len(raw)
+                try:
+                    uid, off, ln = json.loads(raw)
+                except Exception:
+                    continue
+                if off < ix["end"]:
+                    continue  # entries are written in shard order; this line is indexed already
+                ix["users"].setdefault(uid, []).append((off, ln))
+                ix["end"] = off + ln
+
+    def _index_tail(self, shard: int, ix: dict) -> None:
+        """Index shard lines the sidecar does not cover (crash between writes, legacy copy).
+        Caller holds the shard's file lock, so no writer is between its two writes."""
+        self._read_sidecar(shard, ix)
+        shard_path = self.shard_path(shard)
+        if not shard_path.exists() or shard_path.stat().st_size <= ix["end"]:
+            return
+        with shard_path.open("rb") as f, self.index_path(shard).open("ab") as out:
+            f.seek(ix["end"])
+            off = ix["end"]
+            for raw in f:
+                if not raw.endswith(b"\n"): break
+                try:
+                    uid = json.loads(raw).get("user_id") or "local"
+                except Exception:
+                    off += len(raw)
+                    continue
+                entry = json.dumps([uid, off, len(raw)]).encode("utf-8") + b"\n"
+                out.write(entry)
+                ix["idx_pos"] += len(entry)
+                ix["users"].setdefault(uid, []).append((off, len(raw)))
+                off += len(raw)
+            ix["end"] = off
+
+    def _load_index(self, shard: int) -> dict:
+        ix = self._index.setdefault(shard, {"users": {}, "idx_pos": 0, "end": 0})
+        self._read_sidecar(shard, ix)
+        shard_path = self.shard_path(shard)
+        if shard_path.exists() and shard_path.stat().st_size > ix["end"]:
+            # uncovered bytes: usually another worker between its shard and sidecar writes,
+            # which the lock waits out; whatever is still uncovered after that is indexed
+            with _file_lock(self.lock_path(shard)):
+                self._index_tail(shard, ix)
+        return ix
+
+    def append(self, evt: dict):
+        uid = evt.get("user_id") or "local"
+        shard = self.shard_of(uid)
+        line = (json.dumps(evt) + "\n").encode("utf-8")
+        with self.lock, _file_lock(self.lock_path(shard)):
+            ix = self._index.setdefault(shard, {"users": {}, "idx_pos": 0, "end": 0})
+            self._index_tail(shard, ix)
+            with self.shard_path(shard).open("ab") as f:
+                f.seek(0, 2)
+                off = f.tell()
+                f.write(line)
+            entry = json.dumps([uid, off, len(line)]).encode("utf-8") + b"\n"
+            with self.index_path(shard).open("ab") as f:
+                f.write(entry)
+            ix["users"].setdefault(uid, []).append((off, len(line)))
+            ix["idx_pos"] += len(entry)
+            ix["end"] = off + len(line)
+
+    def user_events(self, user_id: str):
+        return self.events_since(user_id)[0]
+
+    def events_since(self, user_id: str, cursor=None):
+        """Events of user_id after cursor (count of their indexed lines) → (events, new cursor)."""
+        shard = self.shard_of(user_id)
+        with self.lock:
+            spans = list(self._load_index(shard)["users"].get(user_id, ()))
+        start = cursor or 0
+        out = []
+        if len(spans) <= start:
+            return out, start
+        with self.shard_path(shard).open("rb") as f:
+            for off, ln in spans[start:]:
+                f.seek(off)
+                try:
+                    out.append(json.loads(f.read(ln)))
+                except Exception:
+                    continue
+        return out, len(spans)
+
+    def iter_events(self):
+        for path in sorted(self.root.glob("shard_*.jsonl")):
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line: continue
+                    try:
+                        yield json.loads(line)
+                    except Exception:
+                        continue
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def store_for(reg):
+    """Process-wide rating store for the configured backend (shared across registry reloads)."""
+    key = (reg.ratings_backend, str(reg.ratings_path), str(reg.ratings_dir), reg.ratings_shards, str(reg.sqlite_path))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            if reg.ratings_backend == "sqlite":
+                store = SqliteRatingsStore(db_for(reg.sqlite_path))
+            elif reg.ratings_backend == "sharded":
+                store = ShardedRatingsStore(reg.ratings_dir, reg.ratings_shards)
+            else:
+                store = JsonlRatingsStore(reg.ratings_path)
+            if not isinstance(store, JsonlRatingsStore):
+                _check_legacy(reg, store)
+            _STORES[key] = store
+        return store
+
+def _check_legacy(reg, store):
+    """
+    Refuse to serve from an empty sharded/SQLite store while storage/ratings.jsonl still holds
+    ratings: every existing rating would silently vanish from profiles and recommendations.
+    """
+    legacy = Path(reg.ratings_path)
+    if not legacy.exists() or legacy.stat().st_size == 0:
+        return
+    if next(store.iter_events(), None) is None:
+        raise RuntimeError(
+            f"{legacy} has ratings but the configured '{reg.ratings_backend}' store is empty. "
+            f"Run `make migrate-ratings` (scripts/migrate_ratings.py) or set storage.backend to \"jsonl\".")
+
+def migrate_jsonl(src: Path, store) -> int:
+    """One-shot copy of a legacy ratings.jsonl into another store; returns events copied."""
+    n = 0
+    for evt in JsonlRatingsStore(src).iter_events():
+        if "drink_id" not in evt: continue
+        evt.setdefault("ts", 0)
+        store.append(evt)
+        n += 1
+    return n
+
+# ----------------- API ----------------- #
 
 def append_rating(reg, user_id, drink_id, rating, tried=False, ts=None):
     ts = ts or int(time.time())
     evt = {"user_id": user_id or "local", "drink_id": drink_id, "rating": float(rating), "tried": bool(tried), "ts": ts}
-    with reg.ratings_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(evt) + "\n")
+    store_for(reg).append(evt)
     return evt
+
+def user_ratings(reg, user_id="local"):
+    return store_for(reg).user_events(user_id)
+
+def user_ratings_since(reg, user_id="local", cursor=None):
+    """New events for user_id since an opaque store cursor (None = from the start)."""
+    return store_for(reg).events_since(user_id, cursor)
@@ -1,6 +1,9 @@
+import heapq
 import numpy as np
-from .similarity import cosine_all, topk
+from .similarity import cosine_all, cosine_many, topk
 from . import profile_service as prof
+from .result_cache import cache_for
+from .metrics import span
 
 def _zero_vec(dim): return np.zeros((dim,), dtype=np.float32)
 
@@ -44,36 +47,49 @@ def build_query_vec(reg, likes=None, dislikes=None, seed_ids=None):
     n = np.linalg.norm(v)
     return v if n==0 else (v / n).astype(np.float32)
 
+def _attr_of(reg, drink_id, key="primary_spirit"):
+    """Categorical value used as the diversity key (first entry for list fields like tags)."""
+    val = (reg.get(drink_id) or {}).get(key)
+    if isinstance(val, (list, tuple)):
+        val = val[0] if val else None
+    return str(val or "unknown").lower()
+
 def _spirit_of(reg, drink_id):
-    rec = reg.get(drink_id) or {}
-    return (rec.get("primary_spirit") or "unknown").lower()
+    return _attr_of(reg, drink_id, "primary_spirit")
+
+def diversify(reg, ids, scores, penalty=0.12, k=None, key="primary_spirit"):
+    """
+    Greedy re-rank: each pick costs `penalty` per earlier pick sharing the same `key` value.
+    Candidates are queued per key value in score order; a heap over the queue heads holds
+    penalty-adjusted scores, so only the picked group's head changes per step: O(pool log pool).
+    Ties keep the original candidate order.
+    """
+    k = k or len(ids)
+    queues = {}
+    for pos, i in enumerate(ids):
+        queues.setdefault(_attr_of(reg, i, key), []).append((-float(scores.get(i, 0.0)), pos, i))
+    heap = []
+    for val, q in queues.items():
+        q.sort()
+        q.reverse()  # pop() from the end → best first
+        neg, pos, i = q[-1]
+        heap.append((neg, pos, val))
+    heapq.heapify(heap)
+
+    chosen, counts = [], {}
+    while heap and len(chosen) < k:
+        _, _, val = heapq.heappop(heap)
+        q = queues[val]
+        chosen.append(q.pop()[2])
+        counts[val] = counts.get(val, 0) + 1
+        if q:
+            neg, pos, _ = q[-1]
+            heapq.heappush(heap, (neg + penalty * counts[val], pos, val))
+    return chosen
 
 def diversify_by_spirit(reg, ids, scores, penalty=0.12, k=None):
     """Greedy re-rank: penalize candidates that repeat same spirit too often."""
-    k = k or len(ids)
-    chosen, chosen_spirits, chosen_set = [], {}, set()
-    # Precompute spirit for all candidates
-    cand_spirit = {i: _spirit_of(reg, i) for i in ids}
-
-    # Working copy
-    rem = ids[:]
-    sc_map = {i: float(scores.get(i, 0.0)) for i in ids}
-
-    while rem and len(chosen) < k:
-        # apply penalties
-        adjusted = []
-        for i in rem:
-            s = cand_spirit[i]
-            penal = penalty * chosen_spirits.get(s, 0)
-            adjusted.append((i, sc_map[i] - penal))
-        adjusted.sort(key=lambda x: -x[1])
-        pick, _ = adjusted[0]
-        chosen.append(pick)
-        chosen_set.add(pick)
-        s = cand_spirit[pick]
-        chosen_spirits[s] = chosen_spirits.get(s, 0) + 1
-        rem = [i for i in rem if i not in chosen_set]
-    return chosen
+    return diversify(reg, ids, scores, penalty=penalty, k=k, key="primary_spirit")
 
 def reasons_for(reg, drink_id, query_vec=None, taste_vec=None, top_k=3):
     """Simple reason chips from block overlaps."""
@@ -112,45 +128,117 @@ def reasons_for(reg, drink_id, query_vec=None, taste_vec=None, top_k=3):
 
     return chips[:top_k]
 
+def _rank(reg, blend, q, taste_vec, k):
+    """Top-K pool from a blended score column, diversified on reg.diversity_key, with reason chips."""
+    with span("recs.topk"):
+        idx, raw_top = topk(blend, max(k*3, k))  # get a pool, then diversify
+    with span("recs.diversify"):
+        cand_ids = [reg.ids[i] for i in idx]
+        score_map = {reg.ids[i]: float(blend[i]) for i in idx}
+        diversified = diversify(reg, cand_ids, score_map, penalty=reg.diversity_penalty, k=k, key=reg.diversity_key)
+    # Build results with reasons
+    results = []
+    with span("recs.reasons"):
+        for did in diversified[:k]:
+            results.append({
+                "id": did,
+                "name": (reg.get(did) or {}).get("name"),
+                "image_url": (reg.get(did) or {}).get("image_url"),
+                "primary_spirit": (reg.get(did) or {}).get("primary_spirit"),
+                "tags": (reg.get(did) or {}).get("tags"),
+                "season": (reg.get(did) or {}).get("season"),
+                "reason": reasons_for(reg, did, query_vec=q, taste_vec=taste_vec)
+            })
+    return results
+
+def _names(values):
+    return tuple(sorted({(v or "").lower() for v in (values or [])}))
+
+def canonical_query(likes=None, dislikes=None, seed_ids=None, k=48):
+    """Hashable key for everything build_query_vec + k depend on (order/case-insensitive)."""
+    likes = likes or {}; dislikes = dislikes or {}
+    return (
+        tuple((key, _names(likes.get(key))) for key in ("spirit", "tags", "season")),
+        tuple((key, _names(dislikes.get(key))) for key in ("tags", "season")),
+        tuple(sorted(seed_ids or [])),  # duplicates kept: they weight the seed mean
+        int(k),
+    )
+
 def recommend(reg, likes=None, dislikes=None, seed_ids=None, k=48, user_id="local"):
+    # Taste vector + ALS user factor (both from ratings); users with neither share cache entries
+    with span("recs.profile"):
+        taste_vec, als_vec, user_version = prof.get_user_vectors(reg, user_id=user_id)
+    use_als = als_vec is not None and reg.weight_als > 0
+    personal = taste_vec is not None or use_als
+    key = (reg.version, canonical_query(likes, dislikes, seed_ids, k),
+           (user_id, user_version) if personal else None)
+    cache = cache_for(reg, "recs")
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
     # Content query
-    q = build_query_vec(reg, likes, dislikes, seed_ids)
-    content_scores = cosine_all(reg.vectors, q)
+    with span("recs.query"):
+        q = build_query_vec(reg, likes, dislikes, seed_ids)
 
-    # Taste vector (from ratings)
-    taste_vec = prof.get_taste_vec(reg, user_id=user_id)
-    taste_scores = cosine_all(reg.vectors, taste_vec) if taste_vec is not None else None
+    with span("recs.score"):
+        content_scores = cosine_all(reg.score_matrix, q)
+        taste_scores = cosine_all(reg.score_matrix, taste_vec) if taste_vec is not None else None
 
-    # TODO(ALS later): als_scores = ...
+    # Collaborative: cosine of item factors against the user's ALS factor
+    with span("recs.als"):
+        als_scores = reg.als.scores(als_vec) if use_als else None
 
     # Blend
     blend = reg.weight_content * content_scores
     if taste_scores is not None:
         blend = blend + reg.weight_taste * taste_scores
-    # (ALS weight currently 0.0)
+    if als_scores is not None:
+        blend = blend + reg.weight_als * als_scores
 
     # Top-K & diversity
-    idx, raw_top = topk(blend, max(k*3, k))  # get a pool, then diversify
-    cand_ids = [reg.ids[i] for i in idx]
-    score_map = {reg.ids[i]: float(blend[i]) for i in idx}
-    diversified = diversify_by_spirit(reg, cand_ids, score_map, penalty=reg.diversity_penalty, k=k)
-    # Build results with reasons
-    results = []
-    for did in diversified[:k]:
-        results.append({
-            "id": did,
-            "name": (reg.get(did) or {}).get("name"),
-            "image_url": (reg.get(did) or {}).get("image_url"),
-            "primary_spirit": (reg.get(did) or {}).get("primary_spirit"),
-            "tags": (reg.get(did) or {}).get("tags"),
-            "season": (reg.get(did) or {}).get("season"),
-            "reason": reasons_for(reg, did, query_vec=q, taste_vec=taste_vec)
-        })
+    results = _rank(reg, blend, q, taste_vec, k)
+    cache.put(key, results, tag=("user", user_id) if personal else None)
     return results
 
+def recommend_batch(reg, queries: list[dict], chunk=256):
+    """
+    Many recommend() calls at once. Each query is a dict with likes/dislikes/seed_ids/k/user_id.
+    Query, taste and ALS user vectors are stacked and scored with one product per chunk;
+    top-K and diversification then run per query. Returns one result list per query, in order.
+    """
+    out = []
+    for start in range(0, len(queries), chunk):
+        part = queries[start:start+chunk]
+        with span("recs.query"):
+            Q = np.stack([build_query_vec(reg, p.get("likes"), p.get("dislikes"), p.get("seed_ids")) for p in part])
+        with span("recs.profile"):
+            users = [prof.get_user_vectors(reg, user_id=p.get("user_id") or "local") for p in part]
+        tastes = [u[0] for u in users]
+        T = np.stack([t if t is not None else np.zeros((reg.dim,), dtype=np.float32) for t in tastes])
+
+        with span("recs.score"):
+            blend = reg.weight_content * cosine_many(reg.score_matrix, Q)
+            if any(t is not None for t in tastes):
+                blend = blend + reg.weight_taste * cosine_many(reg.score_matrix, T)
+        if reg.als is not None and reg.weight_als > 0 and any(u[1] is not None for u in users):
+            with span("recs.als"):
+                X = np.stack([u[1] if u[1] is not None else np.zeros(reg.als.rank) for u in users])
+                blend = blend + reg.weight_als * reg.als.scores(X)
+
+        for j, p in enumerate(part):
+            out.append(_rank(reg, blend[:, j], Q[j], tastes[j], p.get("k") or 48))
+    return out
+
 def similar(reg, drink_id: str, k=20):
     ix = reg.index_by_id.get(drink_id)
-    if ix is None: return []
-    scores = cosine_all(reg.vectors, reg.vectors[ix])
-    idx, _ = topk(scores, k, exclude_idx=ix)
+    k = int(k)
+    if ix is None or k <= 0: return []   # a negative slice would return all but the last -k
+    # precomputed neighbour table covers k <= K; otherwise score live
+    if reg.neighbors_idx is not None and k <= reg.neighbors_k:
+        with span("similar.table"):
+            return [reg.ids[i] for i in reg.neighbors_idx[ix, :k]]
+    with span("similar.score"):
+        scores = cosine_all(reg.score_matrix, reg.vectors[ix])
+        idx, _ = topk(scores, k, exclude_idx=ix)
     return [reg.ids[i] for i in idx]
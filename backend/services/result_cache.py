@@ -0,0 +1,96 @@
+import json, threading, time
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Thread-safe LRU with TTL, bounded by entry count and by (approximate, JSON-encoded) bytes.
+    Entries can carry a tag (e.g. ("user", id)) for targeted invalidation.
+    """
+    def __init__(self, name: str, max_entries=2048, max_bytes=64 << 20, ttl_s=600.0):
+        self.name = name
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[object, tuple]" = OrderedDict()  # key -> (value, size, expires, tag)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[2] < now:
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, tag=None):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, time.monotonic() + self.ttl_s, tag)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in [k for k, v in self._data.items() if v[3] == tag]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data), "bytes": self._bytes,
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl_s": self.ttl_s,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_CACHES: dict[str, ResultCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def cache_for(reg, name: str) -> ResultCache:
+    """Named process-wide cache, sized from the "cache" section of config/app.json."""
+    with _CACHES_LOCK:
+        c = _CACHES.get(name)
+        if c is None:
+            cfg = reg.cache_cfg.get(name, {})
+            c = _CACHES[name] = ResultCache(
+                name,
+                max_entries=cfg.get("max_entries", 2048),
+                max_bytes=cfg.get("max_bytes", 64 << 20),
+                ttl_s=cfg.get("ttl_s", 600),
+            )
+        return c
+
+def invalidate_tag(tag):
+    for c in list(_CACHES.values()):
+        c.invalidate_tag(tag)
+
+def clear_all():
+    for c in list(_CACHES.values()):
+        c.clear()
+
+def stats_all():
+    return {name: c.stats() for name, c in sorted(_CACHES.items())}
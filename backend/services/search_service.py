@@ -1,36 +1,88 @@
 import re
+import numpy as np
+from .result_cache import cache_for
+from .metrics import span
 TOKEN = re.compile(r"[a-z0-9]+")
 
 def tokenize(s: str): return TOKEN.findall((s or "").lower())
 
-def search(reg, q: str, spirit: str|None=None, tag: str|None=None, season: str|None=None):
-    idx = reg.search_index
+def match_ranks(reg, q: str, spirit: str|None=None, tag: str|None=None, season: str|None=None) -> np.ndarray:
+    """Name ranks of all matching drinks, ascending (i.e. already in name order)."""
+    px = reg.postings
+    empty = np.empty(0, dtype=np.int32)
+    lists = []
     if q:
         toks = tokenize(q)
-        if not toks: candidates = set()
-        else:
-            lists = [set(idx["tok2ids"].get(t, [])) for t in toks]
-            candidates = set.intersection(*lists) if lists else set()
-    else:
-        candidates = set(reg.ids)
+        if not toks: return empty
+        lists.extend(px.resolve(t) for t in dict.fromkeys(toks))
 
     if spirit:
-        candidates &= set(idx["by_spirit"].get(spirit.lower(), []))
+        lists.append(px.by_spirit.get(spirit.lower(), empty))
     if tag:
-        candidates &= set(idx["by_tag"].get(tag.lower(), []))
+        lists.append(px.by_tag.get(tag.lower(), empty))
     if season:
-        candidates &= set(idx["by_season"].get(season.lower(), []))
+        lists.append(px.by_season.get(season.lower(), empty))
+
+    return px.intersect(lists) if lists else px.all
+
+def _bm25_lists(reg, q: str, spirit=None, tag=None, season=None):
+    """(BM25 term groups, one per query token; facet filter postings)."""
+    px = reg.postings
+    groups = [reg.bm25.term_lists(px.expand(t)) for t in dict.fromkeys(tokenize(q))]
+    filters = []
+    if spirit: filters.append(px.by_spirit.get(spirit.lower(), np.empty(0, dtype=np.int32)))
+    if tag:    filters.append(px.by_tag.get(tag.lower(), np.empty(0, dtype=np.int32)))
+    if season: filters.append(px.by_season.get(season.lower(), np.empty(0, dtype=np.int32)))
+    return groups, filters
+
+def bm25_ranks(reg, q: str, spirit=None, tag=None, season=None, n=24) -> np.ndarray:
+    """Name ranks of the n best BM25F matches (all query tokens required)."""
+    return reg.bm25.top(*_bm25_lists(reg, q, spirit, tag, season), n)
 
+def search_page(reg, q: str, spirit: str|None=None, tag: str|None=None, season: str|None=None,
+                page: int=1, page_size: int=24, rank: str|None=None):
+    """
+    One page of matches plus the total; only the page is materialised. Default order is by
+    name; rank="bm25" orders by relevance and only scores as deep as the page needs.
+    """
+    key = (reg.version, tuple(tokenize(q)) if q else None, (spirit or "").lower(), (tag or "").lower(),
+           (season or "").lower(), page, page_size, rank if rank == "bm25" else None)
+    cache = cache_for(reg, "search")
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    start = max(0, (page-1)*page_size)
+    stop = start + max(0, page_size)
+    if rank == "bm25" and reg.bm25 is not None and tokenize(q):
+        # the total is a membership count over the rank-ordered lists; the full match set is
+        # never materialised or sorted, and the threshold pass stops at the page's depth
+        with span("search.bm25"):
+            groups, filters = _bm25_lists(reg, q, spirit, tag, season)
+            total = reg.postings.intersect_count([g[2] for g in groups] + filters)
+            page_ranks = reg.bm25.top(groups, filters, stop)[start:stop]
+    else:
+        with span("search.match"):
+            ranks = match_ranks(reg, q, spirit=spirit, tag=tag, season=season)
+        total = len(ranks)
+        page_ranks = ranks[start:stop]
+    with span("search.page"):
+        ids = reg.postings.id_of_rank
+        items = [reg.catalog[ids[r]] for r in page_ranks]
+    out = (items, int(total))
+    cache.put(key, out)
+    return out
+
+def search(reg, q: str, spirit: str|None=None, tag: str|None=None, season: str|None=None):
     # stable order by name
-    items = sorted((reg.catalog[i] for i in candidates), key=lambda r: (r.get("name") or "").lower())
-    return items
+    ids = reg.postings.id_of_rank
+    return [reg.catalog[ids[r]] for r in match_ranks(reg, q, spirit=spirit, tag=tag, season=season)]
 
 def facets(reg):
-    si = reg.search_index
-    def counts(d): return {k: len(v) for k, v in d.items()}
+    fc = reg.postings.facet_counts
     return {
-        "spirits": counts(si["by_spirit"]),
-        "tags": counts(si["by_tag"]),
-        "seasons": counts(si["by_season"]),
+        "spirits": dict(fc["spirits"]),
+        "tags": dict(fc["tags"]),
+        "seasons": dict(fc["seasons"]),
         "total": len(reg.ids),
     }
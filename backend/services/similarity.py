@@ -1,14 +1,40 @@
 import numpy as np
+import scipy.sparse as sp
 
-def cosine_all(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
-    # matrix: [N,D] L2-normalized, query: [D] (normalize if needed)
-    q = query / max(np.linalg.norm(query), 1e-8)
-    return matrix @ q
+def cosine_all(matrix, query: np.ndarray) -> np.ndarray:
+    # matrix: [N,D] L2-normalized (dense ndarray or scipy CSR), query: [D] (normalize if needed).
+    # Dense rows (often the shared float32 mmap) are scored by a float32 gemv: a float64 query would
+    # upcast a copy of the whole matrix per call. The sparse path accumulates in float64 and rounds
+    # once, like build_features' neighbour table; the two agree to float32 rounding.
+    if sp.issparse(matrix):
+        q = query.astype(np.float64) / max(float(np.linalg.norm(query)), 1e-8)
+        return np.asarray(matrix @ q).ravel().astype(np.float32)
+    q = query.astype(np.float32) / np.float32(max(float(np.linalg.norm(query)), 1e-8))
+    return np.asarray(matrix @ q, dtype=np.float32)
+
+def cosine_many(matrix, queries: np.ndarray) -> np.ndarray:
+    # matrix: [N,D] L2-normalized (dense or CSR), queries: [B,D] → scores [N,B] from a single GEMM.
+    # Zero query rows give zero score columns. Same precision split as cosine_all.
+    if sp.issparse(matrix):
+        Q = queries.astype(np.float64)
+        Q = Q / np.maximum(np.linalg.norm(Q, axis=1), 1e-8)[:, None]
+        return np.asarray(matrix @ Q.T).astype(np.float32)
+    Q = queries.astype(np.float32)
+    Q = Q / np.maximum(np.linalg.norm(Q, axis=1), np.float32(1e-8))[:, None]
+    return np.asarray(matrix @ Q.T, dtype=np.float32)
 
 def topk(scores: np.ndarray, k: int, exclude_idx=None):
     if exclude_idx is not None:
         scores = scores.copy()
         scores[exclude_idx] = -1e9
-    idx = np.argpartition(-scores, kth=min(k, len(scores)-1))[:k]
-    idx = idx[np.argsort(-scores[idx])]
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), scores[:0]
+    part = np.argpartition(-scores, kth=k-1)[:k]
+    # ties at the cut-off are resolved by row index so the selection is deterministic
+    thr = scores[part].min()
+    above = np.flatnonzero(scores > thr)
+    ties = np.flatnonzero(scores == thr)[:k-len(above)]
+    idx = np.concatenate([above, ties])
+    idx = idx[np.lexsort((idx, -scores[idx]))]
     return idx, scores[idx]
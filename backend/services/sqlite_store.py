@@ -0,0 +1,134 @@
+import sqlite3, threading
+from pathlib import Path
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratings (
+    id       INTEGER PRIMARY KEY,
+    user_id  TEXT    NOT NULL,
+    drink_id TEXT    NOT NULL,
+    rating   REAL    NOT NULL,
+    tried    INTEGER NOT NULL DEFAULT 0,
+    ts       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ratings_user_ts ON ratings(user_id, ts);
+CREATE INDEX IF NOT EXISTS ratings_user    ON ratings(user_id);
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id       TEXT PRIMARY KEY,
+    has_taste     INTEGER NOT NULL,
+    taste_vec     BLOB,
+    ratings_count INTEGER NOT NULL,
+    updated_at    TEXT
+);
+"""
+
+# fixed statements: sqlite3 keeps them compiled in each connection's statement cache
+SQL_INSERT_RATING = "INSERT INTO ratings (user_id, drink_id, rating, tried, ts) VALUES (?, ?, ?, ?, ?)"
+SQL_USER_RATINGS  = "SELECT id, user_id, drink_id, rating, tried, ts FROM ratings WHERE user_id = ? ORDER BY ts, id"
+SQL_USER_SINCE    = "SELECT id, user_id, drink_id, rating, tried, ts FROM ratings WHERE user_id = ? AND id > ? ORDER BY id"
+SQL_ALL_RATINGS   = "SELECT id, user_id, drink_id, rating, tried, ts FROM ratings ORDER BY id"
+SQL_UPSERT_PROFILE = (
+    "INSERT INTO profiles (user_id, has_taste, taste_vec, ratings_count, updated_at) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET has_taste = excluded.has_taste, taste_vec = excluded.taste_vec, "
+    "ratings_count = excluded.ratings_count, updated_at = excluded.updated_at"
+)
+SQL_GET_PROFILE = "SELECT has_taste, taste_vec, ratings_count, updated_at FROM profiles WHERE user_id = ?"
+
+
+def _event(row):
+    _, user_id, drink_id, rating, tried, ts = row
+    return {"user_id": user_id, "drink_id": drink_id, "rating": rating, "tried": bool(tried), "ts": ts}
+
+
+class SqliteDB:
+    """
+    One SQLite file in WAL mode shared by every worker process. Each thread gets its own
+    connection; writers serialize on SQLite's lock (busy_timeout) instead of interleaving.
+    """
+    def __init__(self, path: Path, timeout: float = 10.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self.conn()
+        conn.executescript(SCHEMA)
+
+    def conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, cached_statements=64)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+
+_DBS: dict[str, SqliteDB] = {}
+_DBS_LOCK = threading.Lock()
+
+def db_for(path) -> SqliteDB:
+    """One SqliteDB per file per process (ratings and profiles share it)."""
+    key = str(Path(path).resolve())
+    with _DBS_LOCK:
+        if key not in _DBS:
+            _DBS[key] = SqliteDB(path)
+        return _DBS[key]
+
+
+class SqliteRatingsStore:
+    def __init__(self, db: SqliteDB):
+        self.db = db
+
+    def append(self, evt: dict):
+        self.db.conn().execute(SQL_INSERT_RATING, (
+            evt.get("user_id") or "local", evt["drink_id"], float(evt["rating"]),
+            int(bool(evt.get("tried"))), int(evt["ts"]),
+        ))
+
+    def user_events(self, user_id: str):
+        return [_event(r) for r in self.db.conn().execute(SQL_USER_RATINGS, (user_id,))]
+
+    def events_since(self, user_id: str, cursor=None):
+        """Events of user_id after cursor (last seen row id) → (events, new cursor)."""
+        last = cursor or 0
+        rows = self.db.conn().execute(SQL_USER_SINCE, (user_id, last)).fetchall()
+        if rows:
+            last = rows[-1][0]
+        return [_event(r) for r in rows], last
+
+    def iter_events(self):
+        for r in self.db.conn().execute(SQL_ALL_RATINGS):
+            yield _event(r)
+
+
+class SqliteProfileStore:
+    """Profiles with the taste vector stored as a float32 BLOB."""
+    def __init__(self, db: SqliteDB):
+        self.db = db
+
+    def put_many(self, entries: dict):
+        rows = []
+        for uid, p in entries.items():
+            vec = p.get("taste_vec")
+            blob = None if vec is None else np.asarray(vec, dtype=np.float32).tobytes()
+            rows.append((uid, int(bool(p.get("has_taste"))), blob, int(p.get("ratings_count", 0)), p.get("updated_at")))
+        c = self.db.conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.executemany(SQL_UPSERT_PROFILE, rows)
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+    def get(self, user_id: str):
+        row = self.db.conn().execute(SQL_GET_PROFILE, (user_id,)).fetchone()
+        if row is None:
+            return None
+        has_taste, blob, count, updated_at = row
+        return {
+            "has_taste": bool(has_taste),
+            "taste_vec": np.frombuffer(blob, dtype=np.float32).tolist() if blob is not None else None,
+            "ratings_count": count,
+            "updated_at": updated_at,
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ALS trainers on a synthetic implicit-feedback matrix.
+
+Users prefer a couple of item "topics" (Zipf popularity within each topic) plus some global
+popular items, so the factors have structure to recover. One positive per user is held out;
+every backend is timed on the same training matrix and scored with recall@k on the held-out
+items (user factors re-solved exactly against each backend's item factors, so only the item
+side is compared).
+
+Run:
+  python scripts/bench_als.py                                  # ~1.1M interactions
+  python scripts/bench_als.py --users 200000 --per-user 15 --backends native,implicit --out bench_als.json
+"""
+
+import argparse, json, os, sys, time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from train_als import ALSParams, ALSTrainer, NativeALSTrainer, AlternatingLeastSquares, heldout_recall  # noqa: E402
+
+def synthetic(n_users, n_items, per_user, topics=50, seed=0):
+    """(train CSR of confidences before alpha, held-out item per user)."""
+    rng = np.random.default_rng(seed)
+    topic_of = rng.integers(0, topics, n_items)
+    members = [np.flatnonzero(topic_of == t) for t in range(topics)]
+    counts = rng.poisson(per_user, n_users).clip(2, None)
+    users = np.repeat(np.arange(n_users), counts)
+    prefs = rng.integers(0, topics, (n_users, 2))
+    pick_topic = prefs[users, rng.integers(0, 2, users.size)]
+    items = np.empty(users.size, dtype=np.int64)
+    for t in range(topics):
+        sel = np.flatnonzero(pick_topic == t)
+        m = members[t]
+        if m.size:
+            items[sel] = m[np.minimum(rng.zipf(1.3, sel.size) - 1, m.size - 1)]
+    noise = rng.random(users.size) < 0.2  # global popularity background
+    items[noise] = np.minimum(rng.zipf(1.2, int(noise.sum())) - 1, n_items - 1)
+    weights = rng.choice([0.5, 1.0, 1.1], users.size).astype(np.float32)
+
+    M = sp.csr_matrix((weights, (users, items)), shape=(n_users, n_items))
+    M.sum_duplicates()
+    # hold out one random positive per user that has at least two
+    held = np.full(n_users, -1, dtype=np.int64)
+    nnz = np.diff(M.indptr)
+    eligible = np.flatnonzero(nnz >= 2)
+    pos = M.indptr[eligible] + (rng.random(eligible.size) * nnz[eligible]).astype(np.int64)
+    held[eligible] = M.indices[pos]
+    M.data[pos] = 0
+    M.eliminate_zeros()
+    return M, held
+
+def main():
+    ap = argparse.ArgumentParser(description="Time native vs implicit ALS on synthetic ratings")
+    ap.add_argument("--users", type=int, default=100000)
+    ap.add_argument("--items", type=int, default=10000)
+    ap.add_argument("--per-user", type=float, default=15.0, help="Mean interactions per user")
+    ap.add_argument("--rank", type=int, default=64)
+    ap.add_argument("--iters", type=int, default=10)
+    ap.add_argument("--reg", type=float, default=0.05)
+    ap.add_argument("--alpha", type=float, default=40.0)
+    ap.add_argument("--threads", type=int, default=0, help="0 = all cores")
+    ap.add_argument("--backends", default="native,implicit")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--eval-users", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write the JSON report here (else stdout only)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    train, held = synthetic(args.users, args.items, args.per_user, seed=args.seed)
+    report = {
+        "data": {"users": args.users, "items": args.items, "interactions": int(train.nnz),
+                 "generate_s": round(time.perf_counter() - t0, 2)},
+        "params": {"rank": args.rank, "iters": args.iters, "reg": args.reg, "alpha": args.alpha,
+                   "threads": args.threads or os.cpu_count(), "k": args.k},
+        "results": {},
+    }
+    confidence = (train * args.alpha).tocsr()
+
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        params = ALSParams(rank=args.rank, reg=args.reg, iters=args.iters, alpha=args.alpha,
+                           threads=args.threads, seed=args.seed, backend=backend)
+        if backend == "implicit":
+            if AlternatingLeastSquares is None:
+                report["results"][backend] = {"skipped": "implicit not installed"}
+                continue
+            trainer = ALSTrainer(params)
+        else:
+            trainer = NativeALSTrainer(params, verbose=False)
+        t0 = time.perf_counter()
+        Y = trainer.fit(confidence)
+        fit_s = time.perf_counter() - t0
+        report["results"][backend] = {
+            "fit_s": round(fit_s, 2),
+            "s_per_iter": round(fit_s / max(1, args.iters), 3),
+            f"recall@{args.k}": round(heldout_recall(confidence, held, Y, params, k=args.k,
+                                                     max_users=args.eval_users, seed=args.seed), 4),
+        }
+        print(f"{backend}: {report['results'][backend]}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark catalog curation: the compiled matchers (serial and across worker processes) against
+the original per-token `_wb` regex searches and linear synonym scan.
+
+Synthetic records are built from the newest raw snapshot: each one takes a random drink's name,
+glass and instructions and gets 2–8 ingredients, either a real ingredient string from the
+snapshot or a random phrase of brand / spirit / modifier words, with random measures and case.
+The naive reference runs on a subset (it is slow); its output must equal the compiled one.
+
+Run:
+  python scripts/bench_curate.py                              # 200k records, naive on 20k
+  python scripts/bench_curate.py --records 2000000 --workers 8 --out bench_curate.json
+"""
+
+import argparse, json, os, random, re, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import curate_catalog as cc  # noqa: E402
+from record_io import iter_records  # noqa: E402
+
+MEASURES = [None, "1 oz", "2 oz", "1/2 oz", "1 1/2 oz", "2 cl", "dash", "splash", "1 shot", "30 ml", "3 tbsp"]
+
+class NaiveMatcher:
+    """The pre-compiled behaviour: one `_wb` regex search per vocabulary token."""
+    def __init__(self, tokens):
+        self.tokens = list(dict.fromkeys(tokens))
+
+    def find(self, text):
+        return frozenset(t for t in self.tokens if cc._wb(t, text))
+
+    def any(self, text):
+        return any(cc._wb(t, text) for t in self.tokens)
+
+def naive_normalize_ingredient(name):
+    if not name: return None
+    t = cc.norm_text(name)
+    t = re.sub(r"[^\w\s&/-]", "", t)
+    for canon, alts in cc.ING_SYNONYMS.items():
+        for a in alts:
+            if t == cc.norm_text(a):
+                return canon
+    return t
+
+def naive_has_any(ingredients, token_set):
+    return any(any(tok in ing for tok in token_set) for ing in ingredients)
+
+def run_naive(records):
+    saved = {k: getattr(cc, k) for k in ("BRAND_MATCH", "SPIRIT_MATCH", "MODIFIER_MATCH", "SECONDARY_MATCH",
+                                         "normalize_ingredient", "has_any")}
+    cc.BRAND_MATCH = NaiveMatcher(cc.BRAND_CANON)
+    cc.SPIRIT_MATCH = NaiveMatcher(t for toks in cc.BASE_SPIRITS.values() for t in toks)
+    cc.MODIFIER_MATCH = NaiveMatcher(sorted(cc.NON_BASE_MODIFIERS))
+    cc.SECONDARY_MATCH = NaiveMatcher(sorted(t for toks in cc.SECONDARY_BASES.values() for t in toks))
+    cc.normalize_ingredient = naive_normalize_ingredient
+    cc.has_any = naive_has_any
+    try:
+        return cc.curate_chunk(records)
+    finally:
+        for k, v in saved.items():
+            setattr(cc, k, v)
+
+def synthetic(raw: list[dict], n: int, rng: random.Random) -> list[dict]:
+    pool = [r[f"strIngredient{i}"] for r in raw for i in range(1, 16) if r.get(f"strIngredient{i}")]
+    words = (list(cc.BRAND_CANON) + [t for toks in cc.BASE_SPIRITS.values() for t in toks]
+             + sorted(t for toks in cc.SECONDARY_BASES.values() for t in toks) + sorted(cc.NON_BASE_MODIFIERS)
+             + ["fresh", "aged", "white", "premium", "infused", "house", "syrup", "juice"])
+    out = []
+    for k in range(n):
+        base = rng.choice(raw)
+        r = {"idDrink": f"s{k}", "strDrink": f"{base.get('strDrink')} #{k}", "strAlcoholic": base.get("strAlcoholic"),
+             "strInstructions": base.get("strInstructions"), "strGlass": base.get("strGlass"),
+             "strDrinkThumb": base.get("strDrinkThumb")}
+        for i in range(1, rng.randint(3, 9)):
+            if rng.random() < 0.5:
+                ing = rng.choice(pool)
+            else:
+                ing = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            r[f"strIngredient{i}"] = ing.title() if rng.random() < 0.3 else ing
+            r[f"strMeasure{i}"] = rng.choice(MEASURES)
+        out.append(r)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Time compiled vs naive catalog curation")
+    ap.add_argument("--in", dest="inp", default=None, help="Raw snapshot (default: newest in data/raw/)")
+    ap.add_argument("--records", type=int, default=200000)
+    ap.add_argument("--naive-records", type=int, default=20000, help="Subset timed with the naive matcher")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-size", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write the JSON report here (else stdout only)")
+    args = ap.parse_args()
+
+    raw = list(iter_records(cc.latest_raw_path(args.inp)))
+    records = synthetic(raw, args.records, random.Random(args.seed))
+    subset = records[:args.naive_records]
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        out = fn()
+        return out, time.perf_counter() - t0
+
+    naive, naive_s = timed(lambda: run_naive(subset))
+    compiled_sub = cc.curate_chunk(subset)
+    for m in (cc.BRAND_MATCH, cc.SPIRIT_MATCH, cc.MODIFIER_MATCH, cc.SECONDARY_MATCH):
+        m.find.cache_clear()  # time the full run from a cold memo
+    _, serial_s = timed(lambda: list(cc.curate_stream(records, workers=1)))
+    parallel, parallel_s = timed(lambda: list(cc.curate_stream(records, workers=args.workers,
+                                                               chunk_size=args.chunk_size)))
+
+    def rate(n, s): return round(n / s) if s else None
+    report = {
+        "records": len(records),
+        "naive": {"records": len(subset), "s": round(naive_s, 2), "records_per_s": rate(len(subset), naive_s)},
+        "compiled_serial": {"s": round(serial_s, 2), "records_per_s": rate(len(records), serial_s)},
+        "compiled_parallel": {"workers": args.workers, "s": round(parallel_s, 2),
+                              "records_per_s": rate(len(records), parallel_s)},
+        "identical_to_naive": compiled_sub == naive and parallel[:len(subset)] == naive,
+    }
+    report["speedup_serial"] = round(report["compiled_serial"]["records_per_s"] / report["naive"]["records_per_s"], 1)
+    report["speedup_parallel"] = round(report["compiled_parallel"]["records_per_s"] / report["naive"]["records_per_s"], 1)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+if __name__ == "__main__":
+    main()
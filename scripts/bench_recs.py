@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Offline quality + speed benchmark for the recommender, search and similar-drinks paths.
+
+For each catalog size (the real curated catalog, or N synthetic drinks cloned from it with
+perturbed ingredients / tags and built with build_features.py) it:
+  1. generates synthetic users with a couple of preferred spirits and tags, and ratings that
+     mostly follow those preferences (configurable users x ratings-per-user);
+  2. holds out each user's latest positive rating (leave-last-out) and writes the rest to a
+     throwaway SQLite store through ratings_service;
+  3. replays recommend() for every user, similar() for random drinks and search() for random
+     tokens / prefixes / facet filters, timing every call;
+  4. reports p50/p95/p99/mean latency and single-thread throughput per operation, peak RSS,
+     and recall@k, NDCG@k, catalog coverage and spirit diversity of the recommendations.
+
+Each size runs in its own process (so peak RSS and process-wide caches are per size) and the
+result caches are disabled unless --warm-cache is given. Output is JSON (stdout and --out),
+tagged with the git commit, so runs can be diffed across commits and catalog sizes.
+
+Run:
+  python scripts/bench_recs.py                                 # real catalog + 1k + 10k drinks
+  python scripts/bench_recs.py --sizes 1000,100000 --users 2000 --out bench_recs.json
+  python scripts/bench_recs.py --sizes 1000000 --neighbors-k 0  # skip the O(N^2) neighbour table
+"""
+
+import argparse, copy, json, math, random, resource, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CONFIG = ROOT / "config" / "app.json"
+
+# ---------------- synthetic data ----------------
+
+def synth_catalog(records, n, rng: random.Random):
+    """n drinks cloned from the curated records, each with one ingredient and tag perturbed."""
+    ingredients = sorted({i for r in records for i in (r.get("ingredients") or [])})
+    tags = sorted({t for r in records for t in (r.get("tags") or [])})
+    out = []
+    for i in range(n):
+        r = copy.deepcopy(records[rng.randrange(len(records))])
+        r["id"] = f"syn{i}"
+        r["name"] = f"{r.get('name') or 'Drink'} {i}"
+        ings = list(r.get("ingredients") or [])
+        if ings and rng.random() < 0.7:
+            ings[rng.randrange(len(ings))] = rng.choice(ingredients)
+        r["ingredients"] = list(dict.fromkeys(ings))
+        if tags and rng.random() < 0.5:
+            r["tags"] = sorted(set(r.get("tags") or []) | {rng.choice(tags)})
+        out.append(r)
+    return out
+
+def synth_users(reg, n_users, per_user, rng: random.Random):
+    """{user_id: [(drink_id, rating, ts), ...]} in time order; ratings follow hidden preferences."""
+    by_spirit = {}
+    for did in reg.ids:
+        by_spirit.setdefault((reg.get(did) or {}).get("primary_spirit") or "unknown", []).append(did)
+    spirits = sorted(by_spirit, key=lambda s: -len(by_spirit[s]))[:8]
+    users = {}
+    for u in range(n_users):
+        liked = set(rng.sample(spirits, min(2, len(spirits))))
+        pool = [d for s in liked for d in by_spirit[s]]
+        events, seen = [], set()
+        for j in range(per_user):
+            did = rng.choice(pool) if rng.random() < 0.75 else rng.choice(reg.ids)
+            if did in seen:
+                continue
+            seen.add(did)
+            spirit = (reg.get(did) or {}).get("primary_spirit") or "unknown"
+            rating = rng.choice([4, 5, 5]) if spirit in liked else rng.choice([1, 2, 3])
+            events.append((did, rating, 1_700_000_000 + j))
+        users[f"bench{u}"] = events
+    return users
+
+def split_last(events):
+    """(train events, held-out drink id or None): the latest positive is held out."""
+    for i in range(len(events) - 1, -1, -1):
+        if events[i][1] >= 4:
+            return events[:i] + events[i+1:], events[i][0]
+    return events, None
+
+# ---------------- setup ----------------
+
+def prepare(size: str, workdir: Path, args) -> dict:
+    """Feature build for this size (synthetic only) and a config pointing at it + a scratch store."""
+    cfg = json.loads(CONFIG.read_text())
+    p = cfg["paths"]
+    for key in ("catalog", "vectors", "vectors_npy", "vectors_csr", "id_map", "search_index"):
+        if key in p:
+            p[key] = str(ROOT / p[key])
+    build_s = 0.0
+    if size != "real":
+        records = synth_catalog(json.loads(Path(p["catalog"]).read_text()), int(size), random.Random(args.seed))
+        catalog = workdir / "drinks_catalog.json"
+        catalog.write_text(json.dumps(records), encoding="utf-8")
+        feat = workdir / "features"
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, str(ROOT / "scripts" / "build_features.py"), "--in", str(catalog),
+                        "--outdir", str(feat), "--neighbors-k", str(args.neighbors_k)],
+                       check=True, stdout=subprocess.DEVNULL)
+        build_s = time.perf_counter() - t0
+        p.update({"catalog": str(catalog), "vectors": str(feat / "drink_vectors.json"),
+                  "vectors_npy": str(feat / "drink_vectors.npy"), "vectors_csr": str(feat / "drink_vectors_csr.npz"),
+                  "id_map": str(feat / "id_map.json"), "search_index": str(feat / "search_index.json")})
+    p.update({"ratings": str(workdir / "ratings.jsonl"), "profile": str(workdir / "profiles.json"),
+              "als_active": str(workdir / "no_als.json")})
+    cfg["storage"] = {"backend": "sqlite", "sqlite_path": str(workdir / "app.db")}
+    cfg["reload"] = {"watch": False}
+    if not args.warm_cache:
+        cfg["cache"] = {name: {"max_entries": 0} for name in ("recs", "search")}
+    path = workdir / "app.json"
+    path.write_text(json.dumps(cfg), encoding="utf-8")
+    return {"config": path, "build_s": build_s}
+
+# ---------------- measurement ----------------
+
+def latency_stats(samples):
+    a = np.asarray(samples, dtype=np.float64) * 1000.0
+    if not a.size:
+        return {}
+    return {"n": int(a.size), "p50_ms": round(float(np.percentile(a, 50)), 3),
+            "p95_ms": round(float(np.percentile(a, 95)), 3), "p99_ms": round(float(np.percentile(a, 99)), 3),
+            "mean_ms": round(float(a.mean()), 3), "throughput_qps": round(1000.0 / max(a.mean(), 1e-9), 1)}
+
+def timed(fn, *a, **kw):
+    t0 = time.perf_counter()
+    out = fn(*a, **kw)
+    return out, time.perf_counter() - t0
+
+def run_size(size: str, args) -> dict:
+    from backend.loaders.registry import Registry
+    from backend.services import ratings_service, recommender_service, search_service
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="bench_recs_") as tmp:
+        setup = prepare(size, Path(tmp), args)
+        reg, load_s = timed(Registry, setup["config"])
+        n = len(reg.ids)
+
+        # ratings (train split) → store
+        users = synth_users(reg, args.users, args.ratings_per_user, rng)
+        held = {}
+        t0 = time.perf_counter()
+        for uid, events in users.items():
+            train, held[uid] = split_last(events)
+            for did, rating, ts in train:
+                ratings_service.append_rating(reg, uid, did, rating, tried=True, ts=ts)
+        ingest_s = time.perf_counter() - t0
+
+        # recommend: quality on the held-out positive + latency
+        k = args.k
+        rec_lat, hits, ndcg, evaluated, diversity, recommended = [], 0, 0.0, 0, [], set()
+        for uid in users:
+            items, dt = timed(recommender_service.recommend, reg, k=k, user_id=uid)
+            rec_lat.append(dt)
+            ids = [it["id"] for it in items]
+            recommended.update(ids)
+            if ids:
+                diversity.append(len({(reg.get(i) or {}).get("primary_spirit") for i in ids}) / len(ids))
+            if held[uid] is None:
+                continue
+            evaluated += 1
+            if held[uid] in ids:
+                hits += 1
+                ndcg += 1.0 / math.log2(ids.index(held[uid]) + 2)
+
+        # similar
+        sim_lat = [timed(recommender_service.similar, reg, rng.choice(reg.ids), k=args.similar_k)[1]
+                   for _ in range(args.queries)]
+
+        # search: whole tokens, prefixes, facet-only and combined
+        vocab = reg.postings.vocab
+        spirits = sorted(reg.postings.by_spirit)
+        tags = sorted(reg.postings.by_tag)
+        search_lat = []
+        for i in range(args.queries):
+            tok = rng.choice(vocab) if vocab else ""
+            kind = i % 4
+            q = tok if kind == 0 else (tok[:3] if kind == 1 else (f"{tok} {rng.choice(vocab)}" if kind == 2 else None))
+            spirit = rng.choice(spirits) if kind == 3 and spirits else None
+            tag = rng.choice(tags) if kind == 3 and tags else None
+            search_lat.append(timed(search_service.search_page, reg, q=q, spirit=spirit, tag=tag, season=None,
+                                    page=1, page_size=24)[1])
+
+        return {
+            "size": size,
+            "items": n,
+            "dim": int(reg.dim),
+            "users": len(users),
+            "ratings": sum(len(e) for e in users.values()) - sum(1 for h in held.values() if h),
+            "build_features_s": round(setup["build_s"], 2),
+            "load_registry_s": round(load_s, 3),
+            "ingest_s": round(ingest_s, 3),
+            "quality": {
+                f"recall@{k}": round(hits / max(1, evaluated), 4),
+                f"ndcg@{k}": round(ndcg / max(1, evaluated), 4),
+                "coverage": round(len(recommended) / max(1, n), 4),
+                "spirit_diversity": round(float(np.mean(diversity)) if diversity else 0.0, 4),
+                "evaluated_users": evaluated,
+            },
+            "latency": {
+                "recommend": latency_stats(rec_lat),
+                "similar": latency_stats(sim_lat),
+                "search": latency_stats(search_lat),
+            },
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark recommend/similar/search quality and latency")
+    ap.add_argument("--sizes", default="real,1000,10000",
+                    help="Comma list: 'real' (curated catalog) and/or synthetic drink counts")
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--ratings-per-user", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=500, help="similar() and search() calls per size")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--similar-k", type=int, default=20)
+    ap.add_argument("--neighbors-k", type=int, default=100, help="Neighbour table size for synthetic builds")
+    ap.add_argument("--warm-cache", action="store_true", help="Keep the recs/search result caches enabled")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write the JSON report here (else stdout only)")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)  # one size, in-process
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args)))
+        return
+
+    runs = []
+    passthrough = list(sys.argv[1:])
+    for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        print(f"[bench] size={size} ...", file=sys.stderr)
+        res = subprocess.run([sys.executable, __file__, *passthrough, "--child", size],
+                             capture_output=True, text=True, cwd=ROOT)
+        if res.returncode != 0:
+            runs.append({"size": size, "error": res.stderr.strip().splitlines()[-1:]})
+            continue
+        runs.append(json.loads(res.stdout.strip().splitlines()[-1]))
+        print(f"[bench] {json.dumps(runs[-1]['quality'])} recommend p50={runs[-1]['latency']['recommend'].get('p50_ms')}ms",
+              file=sys.stderr)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "params": {"users": args.users, "ratings_per_user": args.ratings_per_user, "queries": args.queries,
+                   "k": args.k, "similar_k": args.similar_k, "warm_cache": args.warm_cache, "seed": args.seed},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 # ... (header docstring unchanged)
 
-import argparse, json, os, re, math, hashlib
+import argparse, json, os, re, hashlib, heapq
 from collections import defaultdict, Counter
 from pathlib import Path
 
+import numpy as np
+import scipy.sparse as sp
+
+from record_io import RecordSpill, iter_records
+
 CURATED_DIR = Path("data/curated")
 FEATURE_DIR  = Path("data/features")
 
 DEFAULT_INPUTS = [
     CURATED_DIR / "drinks_catalog_v1.json",
     CURATED_DIR / "drinks_catalog.json",
+    CURATED_DIR / "drinks_catalog.ndjson",
 ]
 
 # ----------------- Config ----------------- #
@@ -27,14 +33,27 @@ WEIGHTS = {
 }
 
 TASTE_KEYS = ["sweet","sour","bitter","boozy","herbal","smoky","spicy","creamy","fruity"]
+BLOCK_ORDER = ["spirit","tags","season","taste","ingredients","brands"]
+
+# binary vector store: float32 [N, dim], rows aligned with id_map["ids"]
+VECTORS_NPY = "drink_vectors.npy"
+# same rows as CSR (most of each row is zeros: one spirit, a few tags, a few hashed hits)
+VECTORS_CSR = "drink_vectors_csr.npz"
+
+# precomputed item-item neighbours for /similar: int32 rows + float16 cosine scores [N, K]
+NEIGHBORS_K     = 100
+NEIGHBORS_BLOCK = 1024           # query rows per block at most ...
+NEIGHBORS_MEM   = 256 << 20      # ... and fewer for big catalogs, so a block's [B, N] work arrays fit this
+NEIGHBORS_IDX   = "neighbors_idx.npy"
+NEIGHBORS_SCORE = "neighbors_score.npy"
+
+# per-record content hashes + float64 rows of the last build, for incremental rebuilds
+FEATURE_STATE = "feature_state.npz"
 TOKEN_RE = re.compile(r"[a-z0-9]+")
 
-def load_curated(path: Path) -> list[dict]:
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    if isinstance(data, dict):
-        data = list(data.values())
-    return data
+def load_curated(path: Path):
+    """Curated records streamed from a JSON array / keyed object or an NDJSON file."""
+    return iter_records(path)
 
 def choose_input() -> Path:
     for p in DEFAULT_INPUTS:
@@ -52,12 +71,6 @@ def hash_index(text: str, dim: int, salt: str = "") -> int:
     h = hashlib.sha1((salt + "§" + text).encode("utf-8")).digest()
     return int.from_bytes(h[:4], "little") % dim
 
-def l2_normalize(vec: list[float]) -> list[float]:
-    s = math.sqrt(sum(x*x for x in vec))
-    if s == 0:
-        return vec
-    return [x / s for x in vec]
-
 def build_vocabs(records: list[dict]):
     spirits, tags, seasons = set(), set(), set()
     for r in records:
@@ -66,33 +79,6 @@ def build_vocabs(records: list[dict]):
         for s in (r.get("season") or []): seasons.add(s.lower())
     return sorted(spirits), sorted(tags), sorted(seasons)
 
-def spirit_one_hot(spirit: str, vocab: list[str]) -> list[float]:
-    spirit = (spirit or "unknown").lower()
-    v = [0.0] * len(vocab)
-    try:
-        v[vocab.index(spirit)] = 1.0
-    except ValueError:
-        if "unknown" in vocab: v[vocab.index("unknown")] = 1.0
-    return v
-
-def multi_hot(items: list[str], vocab: list[str]) -> list[float]:
-    v = [0.0] * len(vocab)
-    for it in (items or []):
-        it = it.lower()
-        try: v[vocab.index(it)] = 1.0
-        except ValueError: pass
-    return v
-
-def taste_block(taste: dict) -> list[float]:
-    return [float(taste.get(k, 0.0)) for k in TASTE_KEYS]
-
-def hashed_block(tokens: list[str], dim: int, salt: str) -> list[float]:
-    if not tokens: return [0.0] * dim
-    v = [0.0] * dim
-    for tok in tokens:
-        v[hash_index(tok, dim, salt=salt)] = 1.0
-    return v
-
 def ingredient_tokens(ingredients: list[str]) -> list[str]:
     toks = []
     for ing in (ingredients or []):
@@ -110,6 +96,78 @@ def brand_tokens(brands: list[str]) -> list[str]:
         toks.extend(tokenize(b))
     return toks
 
+FUZZY_MIN_LEN = 3  # tokens shorter than this get no typo variants
+
+def deletes1(tok: str) -> set[str]:
+    """All strings obtained by deleting one character."""
+    return {tok[:i] + tok[i+1:] for i in range(len(tok))}
+
+def build_deletes(tokens: list[str]) -> dict[str, list[int]]:
+    """
+    Deletion-neighbourhood index for edit-distance-1 lookups: one-deletion variant → indices
+    into the sorted token list. At query time q is looked up directly (a character was dropped)
+    and via its own one-deletion variants (an extra, substituted or swapped character).
+    """
+    out: dict[str, list[int]] = defaultdict(list)
+    for i, tok in enumerate(tokens):
+        if len(tok) < FUZZY_MIN_LEN: continue
+        for d in sorted(deletes1(tok)):
+            out[d].append(i)
+    return dict(sorted(out.items()))
+
+BM25_FIELDS = ["name", "ingredients", "brands", "glass", "technique"]
+BM25_FILE   = "search_bm25.npz"
+
+def field_tokens(r: dict) -> dict[str, list[str]]:
+    """Tokens per searchable field (same tokenizer and fields as the inverted index)."""
+    return {
+        "name":        tokenize(r.get("name") or ""),
+        "ingredients": [t for ing in (r.get("ingredients") or []) for t in tokenize(ing)],
+        "brands":      [t for br in (r.get("brands") or []) for t in tokenize(br)],
+        "glass":       tokenize(r.get("glass") or ""),
+        "technique":   tokenize(r.get("technique") or ""),
+    }
+
+def build_bm25(records: list[dict], tokens: list[str]) -> dict[str, np.ndarray]:
+    """
+    Per-field term statistics for BM25F ranking, as flat arrays (CSR over terms):
+      term_ptr [T+1] int64   postings of term t are term_ptr[t]:term_ptr[t+1]
+      post_row [nnz] int32   catalog row (ids order), ascending within a term
+      tf       [nnz, F] uint16 term frequency per field (BM25_FIELDS order)
+      doc_len  [N, F] float32  field lengths in tokens
+    Impacts are derived at load time, so k1/b/field weights can change without a rebuild.
+    """
+    col = {t: i for i, t in enumerate(tokens)}
+    n_f = len(BM25_FIELDS)
+    doc_len = np.zeros((len(records), n_f), dtype=np.float32)
+    per_term: dict[int, list[tuple[int, list[int]]]] = defaultdict(list)
+    for row, r in enumerate(records):
+        counts: dict[int, list[int]] = {}
+        fields = field_tokens(r)
+        for f, field in enumerate(BM25_FIELDS):
+            toks = fields[field]
+            doc_len[row, f] = len(toks)
+            for tok, c in Counter(toks).items():
+                t = col.get(tok)
+                if t is None: continue
+                counts.setdefault(t, [0] * n_f)[f] = c
+        for t, tf in counts.items():
+            per_term[t].append((row, tf))
+
+    term_ptr = np.zeros(len(tokens) + 1, dtype=np.int64)
+    rows, tfs = [], []
+    for t in range(len(tokens)):
+        plist = per_term.get(t, [])
+        term_ptr[t + 1] = term_ptr[t] + len(plist)
+        for row, tf in plist:
+            rows.append(row); tfs.append(tf)
+    return {
+        "term_ptr": term_ptr,
+        "post_row": np.asarray(rows, dtype=np.int32),
+        "tf": np.minimum(np.asarray(tfs, dtype=np.int64).reshape(-1, n_f), 65535).astype(np.uint16),
+        "doc_len": doc_len,
+    }
+
 def build_search_index(records: list[dict], ids: list[str]):
     tok2ids: dict[str, list[str]] = defaultdict(list)
     by_spirit: dict[str, list[str]] = defaultdict(list)
@@ -135,72 +193,417 @@ def build_search_index(records: list[dict], ids: list[str]):
         for t in (r.get("tags") or []): by_tag[t.lower()].append(rid)
         for s in (r.get("season") or []): by_season[s.lower()].append(rid)
 
-    for d in (tok2ids, by_spirit, by_tag, by_season):
-        for k in d: d[k] = sorted(d[k], key=lambda x: (x is None, x))
+    # keys in sorted order, so a patched index (patch_search_index) serialises byte for byte alike
+    tok2ids, by_spirit, by_tag, by_season = (
+        {k: sorted(d[k], key=lambda x: (x is None, x)) for k in sorted(d)}
+        for d in (tok2ids, by_spirit, by_tag, by_season))
 
+    tokens = list(tok2ids)
     return {"tok2ids": tok2ids, "by_spirit": by_spirit, "by_tag": by_tag, "by_season": by_season,
+            "tokens": tokens, "deletes": build_deletes(tokens),
             "count": {"unique_tokens": len(tok2ids)}}
 
-def build_vectors(records: list[dict]):
-    records = sorted(records, key=lambda r: r.get("id") or "")
-    ids = [r["id"] for r in records]
-    spirit_vocab, tag_vocab, season_vocab = build_vocabs(records)
-
-    vectors: list[list[float]] = []
-    for r in records:
-        b_spirit = spirit_one_hot(r.get("primary_spirit"), spirit_vocab)
-        b_tags   = multi_hot(r.get("tags") or [], tag_vocab)
-        b_season = multi_hot(r.get("season") or [], season_vocab)
-        b_taste  = taste_block(r.get("taste_profile") or {})
-        b_ing    = hashed_block(ingredient_tokens(r.get("ingredients") or []), ING_HASH_DIM,   "ingredients")
-        b_brand  = hashed_block(brand_tokens(r.get("brands") or []),           BRAND_HASH_DIM, "brands")
-
-        def scale(block, w): return [x * w for x in block]
-        blocks = [
-            scale(b_spirit, WEIGHTS["spirit"]),
-            scale(b_tags,   WEIGHTS["tags"]),
-            scale(b_season, WEIGHTS["season"]),
-            scale(b_taste,  WEIGHTS["taste"]),
-            scale(b_ing,    WEIGHTS["ingredients"]),
-            scale(b_brand,  WEIGHTS["brands"]),
-        ]
-        vec = [x for blk in blocks for x in blk]
-        vectors.append(l2_normalize(vec))
-
-    block_sizes = {
-        "spirit": len(spirit_vocab),
-        "tags": len(tag_vocab),
-        "season": len(season_vocab),
-        "taste": len(TASTE_KEYS),
-        "ingredients": ING_HASH_DIM,
-        "brands": BRAND_HASH_DIM,
-    }
-    dim = sum(block_sizes.values())
+class HashedColumns(dict):
+    """
+    Memoised raw string → columns of its hashed block. The sha1 per token dominates the
+    feature build, and ingredient / brand strings repeat heavily across a catalog.
+    """
+    def __init__(self, tokens_of, dim: int, salt: str, offset: int):
+        super().__init__()
+        self.tokens_of, self.dim, self.salt, self.offset = tokens_of, dim, salt, offset
+
+    def __missing__(self, s: str) -> tuple[int, ...]:
+        cols = tuple(self.offset + hash_index(t, self.dim, salt=self.salt) for t in self.tokens_of([s]))
+        self[s] = cols
+        return cols
+
+def row_sq_norms(indptr: np.ndarray, sq: np.ndarray) -> np.ndarray:
+    """
+    Per-row sum of sq (CSR order), added left to right like Python's sum() so the norms —
+    and hence the normalised vectors — are bit-identical to a per-row loop. Vectorised across
+    rows: step j adds the j-th entry of every row that has one.
+    """
+    counts = np.diff(indptr)
+    out = np.zeros(counts.size, dtype=np.float64)
+    order = np.argsort(-counts, kind="stable")
+    sorted_counts = counts[order]
+    for j in range(int(sorted_counts[0]) if counts.size else 0):
+        active = order[:np.searchsorted(-sorted_counts, -j, side="left")]
+        out[active] += sq[indptr[active] + j]
+    return out
+
+def block_sizes_for(vocabs) -> list[int]:
+    spirit_vocab, tag_vocab, season_vocab = vocabs
+    return [len(spirit_vocab), len(tag_vocab), len(season_vocab), len(TASTE_KEYS), ING_HASH_DIM, BRAND_HASH_DIM]
+
+def featurize(records: list[dict], vocabs) -> sp.csr_matrix:
+    """
+    Weighted block features for records (in the given order), L2-normalised, as float64 CSR.
+    Explicit zeros are kept for the taste block so the dense JSON dump matches value for value.
+    """
+    spirit_vocab, tag_vocab, season_vocab = vocabs
+    sizes = block_sizes_for(vocabs)
+    off = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+    dim = off[-1]
+
+    spirit_col = {v: off[0] + i for i, v in enumerate(spirit_vocab)}
+    tag_col    = {v: off[1] + i for i, v in enumerate(tag_vocab)}
+    season_col = {v: off[2] + i for i, v in enumerate(season_vocab)}
+    unknown    = spirit_col.get("unknown")
+    ing_cols   = HashedColumns(ingredient_tokens, ING_HASH_DIM, "ingredients", off[4])
+    brand_cols = HashedColumns(brand_tokens, BRAND_HASH_DIM, "brands", off[5])
+
+    # multi-hot / hashed entries as (row, col) pairs; duplicates collapse below
+    rows, cols = [], []
+    taste = np.zeros((len(records), len(TASTE_KEYS)), dtype=np.float64)
+    for i, r in enumerate(records):
+        c = []
+        sc = spirit_col.get((r.get("primary_spirit") or "unknown").lower(), unknown)
+        if sc is not None: c.append(sc)
+        c.extend(tag_col[t.lower()] for t in (r.get("tags") or []) if t.lower() in tag_col)
+        c.extend(season_col[t.lower()] for t in (r.get("season") or []) if t.lower() in season_col)
+        for ing in (r.get("ingredients") or []): c.extend(ing_cols[ing])
+        for br in (r.get("brands") or []): c.extend(brand_cols[br])
+        rows.extend([i] * len(c))
+        cols.extend(c)
+        tp = r.get("taste_profile") or {}
+        taste[i] = [float(tp.get(k, 0.0)) for k in TASTE_KEYS]
+
+    n = len(records)
+    keys = np.unique(np.asarray(rows, dtype=np.int64) * dim + np.asarray(cols, dtype=np.int64))
+    hot_rows, hot_cols = keys // dim, keys % dim
+    col_weight = np.repeat([WEIGHTS[k] for k in BLOCK_ORDER], sizes).astype(np.float64)
+
+    # merge hot entries with the dense taste block, sorted by (row, col)
+    t_rows = np.repeat(np.arange(n, dtype=np.int64), len(TASTE_KEYS))
+    t_cols = np.tile(np.arange(off[3], off[4], dtype=np.int64), n)
+    all_rows = np.concatenate([hot_rows, t_rows])
+    all_cols = np.concatenate([hot_cols, t_cols])
+    x = np.concatenate([np.ones(hot_rows.size), taste.ravel()])
+    order = np.lexsort((all_cols, all_rows))
+    all_rows, all_cols = all_rows[order], all_cols[order]
+    vals = x[order] * col_weight[all_cols]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(all_rows, minlength=n), out=indptr[1:])
+    norms = np.sqrt(row_sq_norms(indptr, vals * vals))
+    row_norm = norms[all_rows]
+    nz = row_norm != 0
+    vals[nz] = vals[nz] / row_norm[nz]
+    return sp.csr_matrix((vals, all_cols, indptr), shape=(n, dim))
+
+def make_id_map(ids: list[str], vocabs) -> dict:
+    spirit_vocab, tag_vocab, season_vocab = vocabs
+    sizes = block_sizes_for(vocabs)
+    block_sizes = dict(zip(BLOCK_ORDER, sizes))
+    offsets = dict(zip(BLOCK_ORDER, np.concatenate([[0], np.cumsum(sizes)[:-1]]).tolist()))
+    dim = sum(sizes)
 
     id_map = {
         "ids": ids,
         "dim": dim,
         "block_sizes": block_sizes,
+        "offsets": offsets,
         "weights": WEIGHTS,
         "vocab": {"spirit": spirit_vocab, "tags": tag_vocab, "season": season_vocab, "taste_keys": TASTE_KEYS},
         "hash_dims": {"ingredients": ING_HASH_DIM, "brands": BRAND_HASH_DIM},
-        "version": 1,
+        "vectors_file": VECTORS_NPY,
+        "vectors_csr_file": VECTORS_CSR,
+        "version": 2,
     }
-    return vectors, id_map, records
+    return id_map
 
-def save_json(obj, path: Path):
+def build_vectors(records: list[dict]):
+    """(float64 CSR vectors, id_map, records) with rows in id order."""
+    records = sorted(records, key=lambda r: r.get("id") or "")
+    vocabs = build_vocabs(records)
+    return featurize(records, vocabs), make_id_map([r["id"] for r in records], vocabs), records
+
+# ---------------- incremental rebuilds ---------------- #
+
+def record_hash(r: dict) -> bytes:
+    return hashlib.sha1(json.dumps(r, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+
+def feature_fingerprint(vocabs) -> str:
+    """Everything besides a record's own content that determines its vector."""
+    spec = {"vocab": list(vocabs), "taste_keys": TASTE_KEYS, "weights": WEIGHTS, "block_order": BLOCK_ORDER,
+            "hash_dims": [ING_HASH_DIM, BRAND_HASH_DIM], "version": 2}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def load_state(outdir: Path, fingerprint: str) -> dict | None:
+    """The previous build's state, or None if missing / built for a different feature space."""
+    needed = [outdir / FEATURE_STATE, outdir / "id_map.json", outdir / "search_index.json", outdir / BM25_FILE]
+    if not all(p.exists() for p in needed):
+        return None
+    with np.load(outdir / FEATURE_STATE) as z:
+        if str(z["fingerprint"]) != fingerprint:
+            return None
+        state = {k: z[k] for k in z.files}
+    state["ids"] = state["ids"].tolist()
+    return state
+
+def hash_array(hashes: list[bytes]) -> np.ndarray:
+    """sha1 digests as an [N, 20] uint8 array (an "S20" array would drop trailing NUL bytes)."""
+    return np.frombuffer(b"".join(hashes), dtype=np.uint8).reshape(len(hashes), 20)
+
+def save_state(outdir: Path, ids: list[str], hashes: list[bytes], fingerprint: str, vectors: sp.csr_matrix):
+    tmp = outdir / (FEATURE_STATE + ".tmp.npz")
+    np.savez(tmp, ids=np.asarray(ids, dtype=str), hashes=hash_array(hashes),
+             fingerprint=np.asarray(fingerprint), data=vectors.data, indices=vectors.indices, indptr=vectors.indptr)
+    os.replace(tmp, outdir / FEATURE_STATE)
+
+def reused_rows(ids: list[str], hashes: list[bytes], state: dict) -> np.ndarray:
+    """Row in the previous build for every unchanged record, -1 for new or changed ones."""
+    prev = {did: i for i, did in enumerate(state["ids"])}
+    out = np.asarray([prev.get(did, -1) for did in ids], dtype=np.int64)
+    seen = np.flatnonzero(out >= 0)
+    same = (state["hashes"][out[seen]] == hash_array(hashes)[seen]).all(axis=1)
+    out[seen[~same]] = -1
+    return out
+
+def patch_vectors(records: list[dict], vocabs, state: dict, old_row: np.ndarray, dirty: np.ndarray):
+    """Unchanged rows copied from the previous build, dirty rows featurised afresh."""
+    dim = sum(block_sizes_for(vocabs))
+    prev = sp.csr_matrix((state["data"], state["indices"], state["indptr"]), shape=(len(state["ids"]), dim))
+    keep = np.flatnonzero(old_row >= 0)
+    fresh = featurize([records[i] for i in dirty], vocabs)
+    stacked = sp.vstack([prev[old_row[keep]], fresh], format="csr")
+    perm = np.empty(len(records), dtype=np.int64)
+    perm[keep] = np.arange(keep.size)
+    perm[dirty] = keep.size + np.arange(dirty.size)
+    return stacked[perm]
+
+def patch_search_index(prev: dict, records: list[dict], dirty: np.ndarray, gone: set[str]) -> dict:
+    """
+    Drop the postings of removed / changed drinks and merge in those of the dirty records.
+    Posting lists stay sorted by id and keys sorted, so the result equals a full rebuild.
+    """
+    fresh = build_search_index([records[i] for i in dirty], [records[i]["id"] for i in dirty])
+    out = {}
+    for key in ("tok2ids", "by_spirit", "by_tag", "by_season"):
+        old, add, merged = prev[key], fresh[key], {}
+        for k, members in old.items():
+            if not gone.isdisjoint(members):
+                members = [m for m in members if m not in gone]
+            if k in add:
+                members = list(heapq.merge(members, add[k]))
+            if members:
+                merged[k] = members
+        for k, members in add.items():
+            if k not in old:
+                merged[k] = members
+        out[key] = dict(sorted(merged.items()))
+    tokens = list(out["tok2ids"])
+    out["tokens"] = tokens
+    out["deletes"] = prev["deletes"] if tokens == prev["tokens"] else build_deletes(tokens)
+    out["count"] = {"unique_tokens": len(tokens)}
+    return out
+
+def patch_bm25(prev: dict, prev_tokens: list[str], tokens: list[str], records: list[dict],
+               old_row: np.ndarray, dirty: np.ndarray) -> dict:
+    """BM25 arrays with unchanged rows' statistics remapped to the new row / term numbering."""
+    n, n_f = len(records), len(BM25_FIELDS)
+    col = {t: i for i, t in enumerate(tokens)}
+    term_of_prev = np.asarray([col.get(t, -1) for t in prev_tokens], dtype=np.int64)
+    keep = np.flatnonzero(old_row >= 0)
+    new_of_old = np.full(prev["doc_len"].shape[0], -1, dtype=np.int64)
+    new_of_old[old_row[keep]] = keep
+
+    rows = new_of_old[prev["post_row"]]
+    m = rows >= 0
+    old_terms = term_of_prev[np.repeat(np.arange(len(prev_tokens)), np.diff(prev["term_ptr"]))]
+    fresh = build_bm25([records[i] for i in dirty], tokens)
+    fresh_terms = np.repeat(np.arange(len(tokens)), np.diff(fresh["term_ptr"]))
+
+    terms = np.concatenate([old_terms[m], fresh_terms])
+    rows = np.concatenate([rows[m], dirty[fresh["post_row"]]])
+    tf = np.concatenate([prev["tf"][m], fresh["tf"]]).reshape(-1, n_f)
+    order = np.lexsort((rows, terms))
+    term_ptr = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(tokens)), out=term_ptr[1:])
+    doc_len = np.zeros((n, n_f), dtype=np.float32)
+    doc_len[keep] = prev["doc_len"][old_row[keep]]
+    doc_len[dirty] = fresh["doc_len"]
+    return {"term_ptr": term_ptr, "post_row": rows[order].astype(np.int32), "tf": tf[order], "doc_len": doc_len}
+
+def save_json(obj, path: Path, pretty: bool = False):
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+        json.dump(obj, f, ensure_ascii=False, indent=2 if pretty else None)
+
+def save_npy(arr: np.ndarray, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+def save_vectors_json(vectors: sp.csr_matrix, path: Path, pretty: bool = False):
+    """
+    Legacy dense JSON dump, byte-for-byte what json.dump(rows) (indent=2 if pretty) writes, but
+    only the stored entries are formatted; runs of zeros are sliced from one preformatted string.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n, dim = vectors.shape
+    pre, sep = ("    ", ",\n") if pretty else ("", ", ")
+    row_open, row_close = ("  [\n", "\n  ]") if pretty else ("[", "]")
+    doc_open, row_sep, doc_close = ("[\n", ",\n", "\n]") if pretty else ("[", ", ", "]")
+    zero = f"{pre}0.0{sep}"
+    zeros = zero * dim
+    indptr, indices, data = vectors.indptr, vectors.indices.tolist(), vectors.data.tolist()
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        if n == 0:
+            f.write("[]")
+        else:
+            f.write(doc_open)
+            for i in range(n):
+                parts, prev = [], 0
+                for j in range(indptr[i], indptr[i + 1]):
+                    c = indices[j]
+                    parts.append(zeros[:(c - prev) * len(zero)])
+                    parts.append(f"{pre}{data[j]!r}{sep}")
+                    prev = c + 1
+                parts.append(zeros[:(dim - prev) * len(zero)])
+                f.write((row_sep if i else "") + row_open + "".join(parts)[:-len(sep)] + row_close)
+            f.write(doc_close)
+    os.replace(tmp, path)
+
+def save_vectors_npy(vectors: sp.csr_matrix, path: Path):
+    """Write vectors as a float32 .npy so the API can np.load(..., mmap_mode="r") them."""
+    dense = np.zeros(vectors.shape, dtype=np.float32)
+    rows = np.repeat(np.arange(vectors.shape[0]), np.diff(vectors.indptr))
+    dense[rows, vectors.indices] = vectors.data
+    save_npy(dense, path)
+
+def save_vectors_csr(vectors: sp.csr_matrix, path: Path):
+    """Write the sparse (CSR, float32) form used by the sparse scoring path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mat = vectors.astype(np.float32)
+    mat.eliminate_zeros()
+    mat.indices = mat.indices.astype(np.int32)
+    mat.indptr = mat.indptr.astype(np.int32)
+    tmp = path.with_name(path.name + ".tmp.npz")
+    sp.save_npz(tmp, mat, compressed=False)
+    os.replace(tmp, path)
+    return mat
+
+def neighbor_block(n: int, mem_bytes: int = NEIGHBORS_MEM) -> int:
+    """Query rows per block: ~32 bytes per [B, N] entry (float64 product, float32 scores,
+    argpartition / cumsum int64 indices, masks) within mem_bytes."""
+    return int(max(1, min(NEIGHBORS_BLOCK, mem_bytes // (32 * max(1, n)))))
+
+def topk_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of each row's top k of scores [B, N], best first, ties broken by column
+    index (the same selection as the API's similarity.topk), for the whole block at once.
+    """
+    part = np.argpartition(-scores, kth=k-1, axis=1)[:, :k]
+    thr = np.take_along_axis(scores, part, axis=1).min(axis=1, keepdims=True)
+    above = scores > thr
+    tied = scores == thr
+    need = k - above.sum(axis=1, keepdims=True)
+    take = above | (tied & (np.cumsum(tied, axis=1) <= need))  # lowest-index ties at the cut-off
+    idx = np.nonzero(take)[1].reshape(scores.shape[0], k)      # ascending column order per row
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+def _query_norms(csr: sp.csr_matrix, rows: np.ndarray) -> np.ndarray:
+    """Norms of rows as the live path takes them (np.linalg.norm of each float32 row on its own;
+    the axis= reduction rounds differently), so table and live scores match bit for bit."""
+    out = np.empty(len(rows), dtype=np.float64)
+    for start in range(0, len(rows), 4096):  # densify a chunk at a time
+        dense = csr[rows[start:start + 4096]].astype(np.float32).toarray()
+        out[start:start + len(dense)] = [max(float(np.linalg.norm(x)), 1e-8) for x in dense]
+    return out
+
+def build_neighbors(csr: sp.csr_matrix, k: int = NEIGHBORS_K, rows: np.ndarray | None = None,
+                    mem_bytes: int = NEIGHBORS_MEM):
+    """
+    Top-k cosine neighbours (self excluded) of `rows` (default: every row) via blocked sparse
+    matmuls -> (int32 [len(rows), k], float16 [len(rows), k]). Scores are computed like the API's
+    live path (float64 accumulate, rounded to float32, ties broken by row index) so table
+    lookups and live scoring agree.
+    """
+    n = csr.shape[0]
+    k = max(0, min(k, n - 1))
+    rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64)
+    nb_idx = np.zeros((rows.size, k), dtype=np.int32)
+    nb_score = np.zeros((rows.size, k), dtype=np.float16)
+    if k == 0 or rows.size == 0:
+        return nb_idx, nb_score
+
+    mat = csr.astype(np.float64)
+    block = neighbor_block(n, mem_bytes)
+    for start in range(0, rows.size, block):
+        r = rows[start:start + block]
+        q = mat[r].toarray() / _query_norms(csr, r)[:, None]
+        scores = np.asarray(mat @ q.T).T.astype(np.float32)  # [B, N]
+        scores[np.arange(r.size), r] = -1e9
+        idx = topk_rows(scores, k)
+        nb_idx[start:start + r.size] = idx
+        nb_score[start:start + r.size] = np.take_along_axis(scores, idx, axis=1)
+    return nb_idx, nb_score
+
+def update_neighbors(csr: sp.csr_matrix, k: int, prev_idx: np.ndarray, prev_score: np.ndarray,
+                     old_row: np.ndarray, mem_bytes: int = NEIGHBORS_MEM):
+    """
+    Neighbour table of an incremental build from the previous one (old row numbering; old_row as
+    from reused_rows). Recomputed: new / changed rows, rows whose list held a changed or removed
+    drink, and rows a new / changed drink now scores within their k-th neighbour. Every other row
+    keeps its list, renumbered. -> (idx, score, rows recomputed)
+    """
+    n = csr.shape[0]
+    keep = np.flatnonzero(old_row >= 0)
+    new_of_old = np.full(prev_idx.shape[0], -1, dtype=np.int64)
+    new_of_old[old_row[keep]] = keep
+    nb_idx = np.full((n, k), -1, dtype=np.int64)
+    nb_score = np.zeros((n, k), dtype=np.float16)
+    nb_idx[keep] = new_of_old[prev_idx[old_row[keep]]]
+    nb_score[keep] = prev_score[old_row[keep]]
+    redo = (old_row < 0) | (nb_idx < 0).any(axis=1)
+
+    dirty = np.flatnonzero(old_row < 0)
+    live = np.flatnonzero(~redo)
+    if k and dirty.size and live.size:
+        mat = csr.astype(np.float64)
+        q = sp.diags(1.0 / _query_norms(csr, live)) @ mat[live]              # live rows as queries
+        kth = np.asarray(q.multiply(mat[nb_idx[live, -1]]).sum(axis=1)).ravel().astype(np.float32)
+        enters = np.zeros(live.size, dtype=bool)
+        step = max(1, mem_bytes // (16 * live.size))
+        for start in range(0, dirty.size, step):
+            s = (mat[dirty[start:start + step]] @ q.T).toarray().astype(np.float32)  # [D, live]
+            enters |= (s >= kth - 1e-6).any(axis=0)  # conservative: a tie may also reorder
+        redo[live[enters]] = True
+
+    rows = np.flatnonzero(redo)
+    nb_idx[rows], nb_score[rows] = build_neighbors(csr, k=k, rows=rows, mem_bytes=mem_bytes)
+    return nb_idx.astype(np.int32), nb_score, int(rows.size)
+
+def build_fingerprint(outdir: Path, id_map: dict, search_index: dict) -> str:
+    """Content hash of this feature build; the API keys HTTP ETags on it."""
+    h = hashlib.sha1()
+    h.update(json.dumps({k: v for k, v in id_map.items() if k != "build_id"}, sort_keys=True).encode("utf-8"))
+    h.update(json.dumps(search_index, sort_keys=True).encode("utf-8"))
+    for name in (VECTORS_NPY, NEIGHBORS_IDX, NEIGHBORS_SCORE, BM25_FILE):
+        if (outdir / name).exists():
+            h.update((outdir / name).read_bytes())
+    return h.hexdigest()[:16]
 
 def main():
     global ING_HASH_DIM, BRAND_HASH_DIM  # <-- moved to the very top of main()
 
     ap = argparse.ArgumentParser(description="Build content features and search index.")
-    ap.add_argument("--in", dest="inp", default=None, help="Path to curated JSON (defaults to v1 then current).")
+    ap.add_argument("--in", dest="inp", default=None, help="Path to curated JSON / NDJSON (defaults to v1 then current).")
     ap.add_argument("--outdir", default=str(FEATURE_DIR), help="Output directory (default: data/features)")
     ap.add_argument("--ing-dim", type=int, default=ING_HASH_DIM, help="Ingredient hash dim (default 512)")
     ap.add_argument("--brand-dim", type=int, default=BRAND_HASH_DIM, help="Brand hash dim (default 64)")
+    ap.add_argument("--neighbors-k", type=int, default=NEIGHBORS_K, help="Stored neighbours per drink (default 100)")
+    ap.add_argument("--full", action="store_true",
+                    help="Ignore the previous build's state and featurise every record")
+    ap.add_argument("--pretty", action="store_true", help="Indent the JSON outputs (default: compact)")
+    ap.add_argument("--no-json", action="store_true",
+                    help="Skip the legacy dense drink_vectors.json (the API reads the .npy)")
     args = ap.parse_args()
 
     # allow override dims via CLI
@@ -208,19 +611,75 @@ def main():
     BRAND_HASH_DIM = args.brand_dim
 
     curated_path = Path(args.inp) if args.inp else choose_input()
-    records = load_curated(curated_path)
-
-    vectors, id_map, ordered_records = build_vectors(records)
-    search_index = build_search_index(ordered_records, id_map["ids"])
+    # records are spilled to a temp file sorted by id; every pass below re-reads them from there
+    records = RecordSpill(load_curated(curated_path), key=lambda r: r.get("id") or "")
+    ids, hashes = [], []
+    for r in records:
+        ids.append(r["id"])
+        hashes.append(record_hash(r))
+    vocabs = build_vocabs(records)
+    fingerprint = feature_fingerprint(vocabs)
 
     outdir = Path(args.outdir)
-    save_json(vectors,      outdir / "drink_vectors.json")
-    save_json(id_map,       outdir / "id_map.json")
-    save_json(search_index, outdir / "search_index.json")
-
-    norms = [sum(x*x for x in v) ** 0.5 for v in vectors]
-    print(f"Saved {len(vectors)} vectors → {outdir/'drink_vectors.json'}")
-    print(f"Dim: {id_map['dim']} | norms mean≈{sum(norms)/len(norms):.3f} min={min(norms):.3f} max={max(norms):.3f}")
+    state = None if args.full else load_state(outdir, fingerprint)
+    nb_k = max(0, min(args.neighbors_k, len(ids) - 1))
+    prev_nb = None  # previous neighbour table, patched instead of rebuilt on incremental builds
+    if state is None:
+        vectors, id_map = featurize(records, vocabs), make_id_map(ids, vocabs)
+        search_index = build_search_index(records, ids)
+        bm25 = build_bm25(records, search_index["tokens"])
+        print(f"Full build: {len(records)} records")
+    else:
+        old_row = reused_rows(ids, hashes, state)
+        dirty = np.flatnonzero(old_row < 0)
+        gone = (set(state["ids"]) - set(ids)) | {ids[i] for i in dirty}
+        prev_k = json.loads((outdir / "id_map.json").read_text(encoding="utf-8")).get("neighbors", {}).get("k")
+        if not gone and len(ids) == len(state["ids"]) and prev_k == nb_k:
+            print(f"Features up to date ({len(records)} records) → {outdir}")
+            return
+        if prev_k == nb_k and (outdir / NEIGHBORS_IDX).exists() and (outdir / NEIGHBORS_SCORE).exists():
+            prev_nb = (np.load(outdir / NEIGHBORS_IDX), np.load(outdir / NEIGHBORS_SCORE))
+            if prev_nb[0].shape != (len(state["ids"]), nb_k) or prev_nb[1].shape != prev_nb[0].shape:
+                prev_nb = None
+        prev_index = json.loads((outdir / "search_index.json").read_text(encoding="utf-8"))
+        with np.load(outdir / BM25_FILE) as z:
+            prev_bm25 = {k: z[k] for k in z.files}
+        vectors = patch_vectors(records, vocabs, state, old_row, dirty)
+        id_map = make_id_map(ids, vocabs)
+        search_index = patch_search_index(prev_index, records, dirty, gone)
+        bm25 = patch_bm25(prev_bm25, prev_index["tokens"], search_index["tokens"], records, old_row, dirty)
+        print(f"Incremental build: {dirty.size} new/changed, {len(set(state['ids']) - set(ids))} removed, "
+              f"{len(records) - dirty.size} reused")
+
+    # a crash part-way through leaves no state behind, so the next run is a full build
+    (outdir / FEATURE_STATE).unlink(missing_ok=True)
+    if not args.no_json:
+        save_vectors_json(vectors, outdir / "drink_vectors.json", pretty=args.pretty)
+    save_vectors_npy(vectors, outdir / VECTORS_NPY)
+    csr = save_vectors_csr(vectors, outdir / VECTORS_CSR)
+
+    np.savez(outdir / BM25_FILE, **bm25)
+    search_index["bm25"] = {"file": BM25_FILE, "fields": BM25_FIELDS}
+
+    if prev_nb is not None:
+        nb_idx, nb_score, redone = update_neighbors(csr, nb_k, *prev_nb, old_row)
+        print(f"Neighbour table: {redone} of {len(ids)} rows recomputed")
+    else:
+        nb_idx, nb_score = build_neighbors(csr, k=nb_k)
+    save_npy(nb_idx,   outdir / NEIGHBORS_IDX)
+    save_npy(nb_score, outdir / NEIGHBORS_SCORE)
+    id_map["neighbors"] = {"k": int(nb_idx.shape[1]), "idx_file": NEIGHBORS_IDX, "score_file": NEIGHBORS_SCORE}
+
+    id_map["build_id"] = build_fingerprint(outdir, id_map, search_index)
+    save_json(id_map,       outdir / "id_map.json", pretty=args.pretty)
+    save_json(search_index, outdir / "search_index.json", pretty=args.pretty)
+    save_state(outdir, ids, hashes, fingerprint, vectors)
+
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel()) if vectors.shape[0] else np.zeros(1)
+    print(f"Saved {vectors.shape[0]} vectors → {outdir/VECTORS_NPY}" + ("" if args.no_json else f" (+ {outdir/'drink_vectors.json'})"))
+    print(f"Dim: {id_map['dim']} | norms mean≈{norms.mean():.3f} min={norms.min():.3f} max={norms.max():.3f}")
+    print(f"Neighbour table: k={nb_idx.shape[1]} → {outdir/NEIGHBORS_IDX}")
+    print(f"Non-zeros: {csr.nnz} | density={csr.nnz / max(1, csr.shape[0] * csr.shape[1]):.4f}")
     print(f"Vocab sizes → spirit:{id_map['block_sizes']['spirit']} tags:{id_map['block_sizes']['tags']} season:{id_map['block_sizes']['season']}")
     print(f"Search tokens: {search_index['count']['unique_tokens']} | Index saved → {outdir/'search_index.json'}")
 
@@ -7,61 +7,237 @@ Build a large local snapshot from TheCocktailDB (free key '1').
 - Sweeps ingredients via list.php?i=list + filter.php?i=
 - Hydrates full records with lookup.php?i=
 - Dedupes by idDrink
-- Saves raw JSON (canonical). Optional: flattened CSV for quick viewing.
+- Streams records to raw JSON (canonical, keyed by idDrink) or NDJSON as they are hydrated.
+  Optional: flattened CSV for quick viewing.
+
+Requests go out concurrently over one pooled async client, paced by a token bucket (--rate)
+rather than fixed sleeps, so a snapshot takes about request count / rate. Every response is
+kept in a content-addressed cache (data/raw/http_cache), so re-runs and interrupted runs only
+fetch what is missing. scripts/stub_cocktaildb.py serves a snapshot or recorded responses
+locally; point --base-url at it to run the collector offline.
 """
 
-import argparse, json, os, string, time, csv
+import argparse, asyncio, hashlib, json, os, string, time, csv
+from collections import deque
 from datetime import datetime
-import requests
+from pathlib import Path
+from urllib.parse import urlencode
+import httpx
+
+from record_io import RecordWriter, is_ndjson, iter_records
 
 BASE = "https://www.thecocktaildb.com/api/json/v1/1"
+CACHE_DIR = Path("data/raw/http_cache")
+LIST_KEYS = {"c": "strCategory", "g": "strGlass", "a": "strAlcoholic", "i": "strIngredient1"}
+
+class TokenBucket:
+    """Up to `rate` acquisitions per second on average, in bursts of at most `burst`; rate <= 0 means unlimited."""
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate, self.burst = rate, max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:  # FIFO: waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+class ResponseCache:
+    """
+    On-disk API response cache. Bodies are stored once under their sha256 (objects/ab/abcd…)
+    and each request — endpoint plus sorted query params, independent of the host — points at
+    a body digest (refs/…). Entries are written atomically and verified on read, so an
+    interrupted run leaves only complete entries behind.
+    """
+    def __init__(self, root, max_age: float | None = None):
+        self.root = Path(root)
+        self.max_age = max_age
 
-def safe_get(path, params=None, retries=3, backoff=0.8, delay=0.25, timeout=30):
-    url = f"{BASE}/{path}"
-    err = None
-    for attempt in range(retries):
+    @staticmethod
+    def request_key(path: str, params: dict | None) -> str:
+        canon = f"{path}?{urlencode(sorted((params or {}).items()))}"
+        return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+    def _ref(self, key: str) -> Path:
+        return self.root / "refs" / key[:2] / key
+
+    def _obj(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def get(self, path: str, params: dict | None) -> bytes | None:
+        ref = self._ref(self.request_key(path, params))
         try:
-            r = requests.get(url, params=params or {}, timeout=timeout)
-            r.raise_for_status()
-            time.sleep(delay)  # be polite
-            return r.json()
-        except Exception as e:
-            err = e
-            time.sleep(backoff * (attempt + 1))
-    raise err
-
-def sweep_letters():
-    drinks = {}
+            if self.max_age is not None and time.time() - ref.stat().st_mtime > self.max_age:
+                return None
+            digest = ref.read_text(encoding="ascii").strip()
+            body = self._obj(digest).read_bytes()
+        except OSError:
+            return None
+        return body if hashlib.sha256(body).hexdigest() == digest else None
+
+    def put(self, path: str, params: dict | None, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()
+        obj = self._obj(digest)
+        if not obj.exists():
+            _write_atomic(obj, body)
+        _write_atomic(self._ref(self.request_key(path, params)), digest.encode("ascii"))
+
+def drinks_of(data) -> list:
+    """The "drinks" rows of a response (the API returns null or a message string when empty)."""
+    rows = (data or {}).get("drinks")
+    return rows if isinstance(rows, list) else []
+
+class CocktailApi:
+    """
+    TheCocktailDB over one pooled httpx.AsyncClient: token-bucket pacing, at most
+    `concurrency` requests in flight, retries with linear backoff, and the response cache.
+    """
+    def __init__(self, base_url: str = BASE, rate: float = 4.0, burst: float = 4, concurrency: int = 8,
+                 retries: int = 3, backoff: float = 0.8, timeout: float = 30.0, cache: ResponseCache | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.bucket = TokenBucket(rate, burst)
+        self.sem = asyncio.Semaphore(concurrency)
+        self.retries, self.backoff = max(1, retries), backoff
+        self.cache = cache
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.fetched = self.cached = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+    async def get(self, path: str, params: dict | None = None) -> dict:
+        if self.cache:
+            body = self.cache.get(path, params)
+            if body is not None:
+                self.cached += 1
+                return json.loads(body) if body.strip() else {}
+        err = None
+        async with self.sem:
+            for attempt in range(self.retries):
+                await self.bucket.acquire()
+                try:
+                    r = await self.client.get(f"{self.base_url}/{path}", params=params or {})
+                    r.raise_for_status()
+                    data = r.json() if r.content.strip() else {}  # empty body: no results
+                except (httpx.HTTPError, ValueError) as e:
+                    err = e
+                    await asyncio.sleep(self.backoff * (attempt + 1))
+                    continue
+                self.fetched += 1
+                if self.cache:
+                    self.cache.put(path, params, r.content)
+                return data
+        raise err
+
+    async def list_values(self, kind: str) -> list[str]:
+        # kind: 'c' (category), 'g' (glass), 'a' (alcoholic), 'i' (ingredient)
+        return [row[LIST_KEYS[kind]] for row in drinks_of(await self.get("list.php", {kind: "list"}))]
+
+    async def filter_ids(self, param: str, value: str) -> list[str]:
+        return [row["idDrink"] for row in drinks_of(await self.get("filter.php", {param: value}))]
+
+    async def lookup(self, did: str) -> list[dict]:
+        return drinks_of(await self.get("lookup.php", {"i": did}))[:1]
+
+async def ordered_map(fn, items, window: int):
+    """await fn(item) for each item with at most `window` calls in flight; results in input order."""
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(fn(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def iter_snapshot(api: CocktailApi, max_ingredients=None, window: int = 32):
+    """
+    Every drink reachable through the sweeps, each yielded once, in a deterministic order.
+    Only ids are kept in memory; full records are yielded as soon as they are hydrated.
+    """
+    seen = set()
+
+    def unseen(records):
+        for d in records:
+            if d["idDrink"] not in seen:
+                seen.add(d["idDrink"])
+                yield d
+
+    async def hydrate(ids):
+        missing = list(dict.fromkeys(i for i in ids if i not in seen))
+        async for rec in ordered_map(api.lookup, missing, window):
+            for d in unseen(rec):
+                yield d
+
+    # 1) A–Z / 0–9
+    print("Sweeping A–Z and 0–9 …")
     letters = list(string.ascii_lowercase) + list(string.digits)
-    for ch in letters:
-        data = safe_get("search.php", {"f": ch})
-        for d in (data.get("drinks") or []):
-            drinks[d["idDrink"]] = d
-    return drinks
-
-def list_values(kind):
-    # kind: 'c' (category), 'g' (glass), 'a' (alcoholic), 'i' (ingredient)
-    key_map = {"c": "strCategory", "g": "strGlass", "a": "strAlcoholic", "i": "strIngredient1"}
-    data = safe_get("list.php", {kind: "list"})
-    return [row[key_map[kind]] for row in (data.get("drinks") or [])]
-
-def filter_ids(param, value):
-    data = safe_get("filter.php", {param: value})
-    return [row["idDrink"] for row in (data.get("drinks") or [])]
-
-def hydrate_ids(ids, delay=0.25):
-    out = {}
-    for did in ids:
-        rec = safe_get("lookup.php", {"i": did}, delay=delay).get("drinks") or []
-        if rec:
-            out[rec[0]["idDrink"]] = rec[0]
-    return out
-
-def save_json(drinks_by_id, path, pretty=False):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(drinks_by_id, f, ensure_ascii=False, indent=2 if pretty else None)
-    print(f"Saved {len(drinks_by_id):,} drinks → {path}")
+    async for data in ordered_map(lambda ch: api.get("search.php", {"f": ch}), letters, window):
+        for d in unseen(drinks_of(data)):
+            yield d
+    print(f"After letters: {len(seen):,}")
+
+    # 2) Categories, Glasses, Alcoholic flags
+    for param, label in (("c","categories"),("g","glasses"),("a","alcoholic flags")):
+        print(f"Sweeping {label} …")
+        ids = []
+        async for found in ordered_map(lambda v: api.filter_ids(param, v), await api.list_values(param), window):
+            ids.extend(found)
+        async for d in hydrate(ids):
+            yield d
+        print(f"After {label}: {len(seen):,}")
+
+    # 3) Ingredients (bigger pass)
+    print("Sweeping ingredients (this can take a while) …")
+    ingredients = await api.list_values("i")
+    if max_ingredients:
+        ingredients = ingredients[:max_ingredients]
+    ids = []
+    idx = 0
+    async for found in ordered_map(lambda ing: api.filter_ids("i", ing), ingredients, window):
+        ids.extend(found)
+        idx += 1
+        if idx % 50 == 0:
+            print(f"  {idx}/{len(ingredients)} ingredients filtered")
+    async for d in hydrate(ids):
+        yield d
+    print(f"After ingredients: {len(seen):,}")
+
+async def collect(args) -> int:
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, max_age=args.cache_ttl)
+    api = CocktailApi(args.base_url, rate=args.rate, burst=args.burst, concurrency=args.concurrency,
+                      retries=args.retries, timeout=args.timeout, cache=cache)
+    key = None if is_ndjson(args.out_json) else "idDrink"
+    async with api:
+        with RecordWriter(args.out_json, pretty=args.pretty, key=key) as out:
+            async for d in iter_snapshot(api, args.max_ingredients, window=4 * args.concurrency):
+                out.write(d)
+    print(f"Saved {out.count:,} drinks → {args.out_json} ({api.fetched:,} requests fetched, {api.cached:,} from cache)")
+    return out.count
 
 def flatten_row(d):
     ing = [d.get(f"strIngredient{i}") for i in range(1, 16)]
@@ -80,60 +256,39 @@ def flatten_row(d):
         "instructions": (d.get("strInstructions") or "").replace("\n", " ").strip(),
     }
 
-def save_csv(drinks_by_id, path):
+def save_csv(drinks, path):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     fields = ["id","name","category","alcoholic","glass","ingredients","measures","thumb","instructions"]
     with open(path, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=fields)
         w.writeheader()
-        for d in drinks_by_id.values():
+        for d in drinks:
             w.writerow(flatten_row(d))
     print(f"Saved CSV → {path}")
 
 def main():
     ap = argparse.ArgumentParser(description="CocktailDB bulk snapshot (JSON canonical; optional CSV).")
     today = datetime.utcnow().strftime("%Y%m%d")
-    ap.add_argument("--out-json", default=f"data/raw/cocktails_{today}.json")
+    ap.add_argument("--out-json", default=f"data/raw/cocktails_{today}.json",
+                    help="Raw snapshot; a .ndjson suffix writes one record per line")
     ap.add_argument("--out-csv", default=None, help="Optional flattened CSV path (e.g., data/raw/cocktails_flat.csv)")
-    ap.add_argument("--delay", type=float, default=0.25, help="Delay between requests (seconds)")
+    ap.add_argument("--pretty", action="store_true", help="Indent the JSON snapshot (default: compact)")
+    ap.add_argument("--base-url", default=BASE, help="API root (e.g. a local stub_cocktaildb.py)")
+    ap.add_argument("--rate", type=float, default=4.0, help="Average requests per second (0 = unlimited)")
+    ap.add_argument("--burst", type=float, default=4, help="Requests allowed back to back before pacing kicks in")
+    ap.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
     ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (seconds)")
+    ap.add_argument("--cache-dir", default=str(CACHE_DIR), help="Response cache directory")
+    ap.add_argument("--cache-ttl", type=float, default=None, help="Refetch cached responses older than this (seconds)")
+    ap.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
     ap.add_argument("--max-ingredients", type=int, default=None, help="Limit ingredient sweep for faster tests")
     args = ap.parse_args()
 
-    # 1) A–Z / 0–9
-    print("Sweeping A–Z and 0–9 …")
-    drinks = sweep_letters()
-    print(f"After letters: {len(drinks):,}")
-
-    # 2) Categories, Glasses, Alcoholic flags
-    for param, label in (("c","categories"),("g","glasses"),("a","alcoholic flags")):
-        print(f"Sweeping {label} …")
-        for v in list_values(param):
-            ids = filter_ids(param, v)
-            missing = [i for i in ids if i not in drinks]
-            if not missing: continue
-            hydrated = hydrate_ids(missing, delay=args.delay)
-            drinks.update(hydrated)
-        print(f"After {label}: {len(drinks):,}")
-
-    # 3) Ingredients (bigger pass)
-    print("Sweeping ingredients (this can take a while) …")
-    ingredients = list_values("i")
-    if args.max_ingredients:
-        ingredients = ingredients[: args.max_ingredients]
-    for idx, ing in enumerate(ingredients, 1):
-        ids = filter_ids("i", ing)
-        missing = [i for i in ids if i not in drinks]
-        if missing:
-            drinks.update(hydrate_ids(missing, delay=args.delay))
-        if idx % 50 == 0:
-            print(f"  {idx}/{len(ingredients)} ingredients → total drinks: {len(drinks):,}")
-
-    # Save outputs
-    save_json(drinks, args.out_json, pretty=True)
+    asyncio.run(collect(args))
     if args.out_csv:
-        save_csv(drinks, args.out_csv)
+        save_csv(iter_records(args.out_json), args.out_csv)
     print("Done. Next: curate to data/curated/drinks_catalog.json.")
-    
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
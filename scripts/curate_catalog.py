@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
 """
-Curate TheCocktailDB raw snapshot → data/curated/drinks_catalog.json
+Curate TheCocktailDB raw snapshot → data/curated/drinks_catalog.json (or .ndjson)
 
 Adds:
 - brands, primary_spirit_brand, season, alcoholic flag
 - Stronger primary_spirit detection (spirits first; fallback to secondary bases)
 """
 
-import json, re, glob
+import argparse, functools, itertools, json, os, re, glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from fractions import Fraction
 
+from record_io import RecordSpill, iter_records, write_records
+
 RAW_DIR = Path("data/raw")
 OUT_DIR = Path("data/curated")
 OUT_FILE = OUT_DIR / "drinks_catalog.json"
@@ -148,28 +152,30 @@ SEASONS = ["spring","summer","fall","winter","holiday"]
 
 # ---------------- Utils ---------------- #
 
-def load_latest_raw(path=None):
+def latest_raw_path(path=None) -> Path:
     if path:
-        with Path(path).open("r", encoding="utf-8") as f:
-            return json.load(f)
-    files = sorted(glob.glob(str(RAW_DIR / "cocktails_*.json")))
+        return Path(path)
+    files = sorted(glob.glob(str(RAW_DIR / "cocktails_*.json")) + glob.glob(str(RAW_DIR / "cocktails_*.ndjson")))
     if not files:
         raise FileNotFoundError("No raw snapshots in data/raw/")
-    with open(files[-1], "r", encoding="utf-8") as f:
-        return json.load(f)
+    return Path(files[-1])
+
+WS_RE = re.compile(r"\s+")
+PUNCT_RE = re.compile(r"[^\w\s&/-]")
 
 def norm_text(s: str) -> str:
-    return re.sub(r"\s+", " ", s.strip().lower())
+    return WS_RE.sub(" ", s.strip().lower())
+
+# normalised alias → canonical name (first listed canonical wins, as in a linear scan)
+SYNONYM_OF: dict[str, str] = {}
+for _canon, _alts in ING_SYNONYMS.items():
+    for _a in _alts:
+        SYNONYM_OF.setdefault(norm_text(_a), _canon)
 
 def normalize_ingredient(name):
     if not name: return None
-    t = norm_text(name)
-    t = re.sub(r"[^\w\s&/-]", "", t)
-    for canon, alts in ING_SYNONYMS.items():
-        for a in alts:
-            if t == norm_text(a):
-                return canon
-    return t
+    t = PUNCT_RE.sub("", norm_text(name))
+    return SYNONYM_OF.get(t, t)
 
 def extract_ing_and_measures(rec):
     out = []
@@ -184,6 +190,46 @@ def extract_ing_and_measures(rec):
 def _wb(word: str, text: str) -> bool:
     return re.search(rf"\b{re.escape(word)}\b", text) is not None
 
+def _is_word(c: str) -> bool:
+    return re.match(r"\w", c) is not None
+
+class TokenMatcher:
+    """
+    Every vocabulary token that occurs in a text as a whole word (the `_wb` test), from one
+    compiled scan instead of a regex search per token.
+
+    The pattern is a zero-width lookahead over all tokens, longest first, so each position
+    reports the longest token matching there. Any shorter token matching at the same position
+    is a prefix of it; whether that prefix ends on a word boundary depends only on the longer
+    token's next character, so those are precomputed. Results are memoised per text.
+    """
+    def __init__(self, tokens):
+        self.tokens = list(dict.fromkeys(tokens))
+        longest_first = sorted(self.tokens, key=len, reverse=True)
+        self.rx = re.compile(r"(?=\b(" + "|".join(map(re.escape, longest_first)) + r")\b)")
+        self.prefixes = {
+            t: [p for p in self.tokens
+                if len(p) < len(t) and t.startswith(p) and _is_word(p[-1]) != _is_word(t[len(p)])]
+            for t in self.tokens
+        }
+        self.any_rx = re.compile(r"\b(?:" + "|".join(map(re.escape, longest_first)) + r")\b")
+        self.find = functools.lru_cache(maxsize=1 << 16)(self._find)
+
+    def _find(self, text: str) -> frozenset[str]:
+        hits = set()
+        for m in self.rx.finditer(text):
+            hits.add(m.group(1))
+            hits.update(self.prefixes[m.group(1)])
+        return frozenset(hits)
+
+    def any(self, text: str) -> bool:
+        return self.any_rx.search(text) is not None
+
+BRAND_MATCH    = TokenMatcher(BRAND_CANON)
+SPIRIT_MATCH   = TokenMatcher(t for toks in BASE_SPIRITS.values() for t in toks)
+MODIFIER_MATCH = TokenMatcher(sorted(NON_BASE_MODIFIERS))
+SECONDARY_MATCH = TokenMatcher(sorted(t for toks in SECONDARY_BASES.values() for t in toks))
+
 def parse_amount_ml(measure: str | None) -> float:
     if not measure: return 0.0
     s = measure.lower().replace("½","1/2").replace("¼","1/4").replace("¾","3/4")
@@ -224,9 +270,7 @@ def get_alcoholic_flag(rec):
 def extract_brands(ingredients: list[str]) -> list[str]:
     found = set()
     for ing in ingredients:
-        for token, canon in BRAND_CANON.items():
-            if _wb(token, ing):
-                found.add(canon)
+        found.update(BRAND_CANON[t] for t in BRAND_MATCH.find(ing))
     return sorted(found)
 
 def guess_primary_spirit(ing_meas_pairs):
@@ -243,12 +287,13 @@ def guess_primary_spirit(ing_meas_pairs):
         text = ing
 
         # Skip obvious mixers when searching for spirits
-        if text in NON_BASE_MODIFIERS or any(_wb(m, text) for m in NON_BASE_MODIFIERS):
+        if text in NON_BASE_MODIFIERS or MODIFIER_MATCH.any(text):
             continue
 
-        # brand hint → spirit
-        for token, canon in BRAND_CANON.items():
-            if _wb(token, text):
+        # brand hint → spirit (vocabulary order, so ties resolve as before)
+        brands = BRAND_MATCH.find(text)
+        for token, canon in (BRAND_CANON.items() if brands else ()):
+            if token in brands:
                 spirit = BRAND_TO_SPIRIT.get(canon)
                 if spirit:
                     ml = parse_amount_ml(meas)
@@ -256,9 +301,10 @@ def guess_primary_spirit(ing_meas_pairs):
                     first_idx.setdefault(spirit, idx)
 
         # explicit spirit tokens
-        for spirit, tokens in BASE_SPIRITS.items():
+        hits = SPIRIT_MATCH.find(text)
+        for spirit, tokens in (BASE_SPIRITS.items() if hits else ()):
             for tok in tokens:
-                if _wb(tok, text):
+                if tok in hits:
                     ml = parse_amount_ml(meas)
                     totals[spirit] = totals.get(spirit, 0.0) + ml
                     first_idx.setdefault(spirit, idx)
@@ -277,9 +323,10 @@ def guess_primary_spirit(ing_meas_pairs):
         if not ing: continue
         text = ing
         ml = parse_amount_ml(meas)
-        for cat, tokens in SECONDARY_BASES.items():
+        hits = SECONDARY_MATCH.find(text)
+        for cat, tokens in (SECONDARY_BASES.items() if hits else ()):
             for tok in tokens:
-                if _wb(tok, text):
+                if tok in hits:
                     sec_totals[cat] = sec_totals.get(cat, 0.0) + (ml if ml else 1.0)
 
     if sec_totals:
@@ -291,8 +338,9 @@ def guess_primary_spirit_brand(primary_spirit: str | None, ingredients: list[str
     if not primary_spirit: return None
     scores = {}
     for (ing, meas) in ing_meas_pairs:
-        for token, canon in BRAND_CANON.items():
-            if _wb(token, ing):
+        brands = BRAND_MATCH.find(ing) if ing else frozenset()
+        for token, canon in (BRAND_CANON.items() if brands else ()):
+            if token in brands:
                 mapped = BRAND_TO_SPIRIT.get(canon)
                 if mapped == primary_spirit:
                     scores[canon] = scores.get(canon, 0.0) + parse_amount_ml(meas)
@@ -309,8 +357,14 @@ def guess_technique(instructions):
         return "build"
     return None
 
+@functools.lru_cache(maxsize=None)
+def _substring_rx(tokens: frozenset) -> re.Pattern:
+    return re.compile("|".join(map(re.escape, sorted(tokens, key=len, reverse=True))))
+
 def has_any(ingredients, token_set):
-    return any(any(tok in ing for tok in token_set) for ing in ingredients)
+    """True if any token occurs as a plain substring of any ingredient."""
+    rx = _substring_rx(frozenset(token_set))
+    return any(rx.search(ing) for ing in ingredients)
 
 def derive_flavors_and_taste(ingredients):
     tags = set()
@@ -328,8 +382,8 @@ def derive_flavors_and_taste(ingredients):
     if has_any(ingredients, NUTTY_TOKENS):  tags.add("nutty")
 
     mixers = {"juice","soda","syrup","beer","wine","cordial","puree","cream","milk"}
-    has_mixer = any(any(m in ing for m in mixers) for ing in ingredients)
-    spirit_mentions = sum(1 for ing in ingredients for s in BASE_SPIRITS for t in BASE_SPIRITS[s] if _wb(t, ing))
+    has_mixer = has_any(ingredients, mixers)
+    spirit_mentions = sum(len(SPIRIT_MATCH.find(ing)) for ing in ingredients)
     taste["boozy"] = 0.8 if (spirit_mentions >= 2 and not has_mixer) else (0.5 if spirit_mentions >= 1 else 0.2)
 
     for k in taste:
@@ -397,33 +451,70 @@ def curate_record(rec):
         "source_attribution": "TheCocktailDB snapshot",
     }
 
-def main(in_path=None):
-    raw = load_latest_raw(in_path)
-    records = list(raw.values()) if isinstance(raw, dict) else raw
-    curated = [curate_record(r) for r in records]
-    curated = [c for c in curated if c["name"]]
-    curated.sort(key=lambda x: (x["primary_spirit"] or "zzz", x["name"].lower()))
+def curate_chunk(records):
+    return [curate_record(r) for r in records]
 
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    with OUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(curated, f, ensure_ascii=False, indent=2)
+def curate_stream(records, workers: int = 1, chunk_size: int = 2000):
+    """
+    curate_record over an iterable of raw records, yielded in input order. With several workers,
+    chunks fan out over a process pool with at most 2×workers chunks in flight, so memory stays
+    bounded however large the snapshot is.
+    """
+    it = iter(records)
+    chunks = iter(lambda: list(itertools.islice(it, chunk_size)), [])
+    head = list(itertools.islice(chunks, 2))
+    if workers <= 1 or len(head) < 2:
+        for chunk in itertools.chain(head, chunks):
+            yield from curate_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for chunk in itertools.chain(head, chunks):
+            pending.append(ex.submit(curate_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def main(in_path=None, out_path=OUT_FILE, workers: int = 1, chunk_size: int = 2000, pretty: bool = False):
+    in_path = latest_raw_path(in_path)
+    out_path = Path(out_path)
+    counts = dict.fromkeys(["records_in", "records_out", "null_primary_spirit", "blend_count", "with_brands",
+                            "secondary_bases_used", "non_alcoholic_count"], 0)
+
+    def raw_records():
+        for r in iter_records(in_path):
+            counts["records_in"] += 1
+            yield r
+
+    def named(curated):
+        for c in curated:
+            if not c["name"]:
+                continue
+            counts["records_out"] += 1
+            counts["null_primary_spirit"] += c["primary_spirit"] is None
+            counts["blend_count"] += c["primary_spirit"] == "blend"
+            counts["with_brands"] += bool(c.get("brands"))
+            counts["secondary_bases_used"] += c["primary_spirit"] in SECONDARY_BASES.keys()
+            counts["non_alcoholic_count"] += c.get("alcoholic") == "non_alcoholic"
+            yield c
+
+    # curated records go to a temporary spill; only their sort keys and offsets stay in memory
+    curated = named(curate_stream(raw_records(), workers=workers, chunk_size=chunk_size))
+    with RecordSpill(curated, key=lambda x: (x["primary_spirit"] or "zzz", x["name"].lower())) as ordered:
+        write_records(ordered, out_path, pretty=pretty)
 
     manifest = {
         "generated_at_utc": datetime.now(timezone.utc).isoformat(),
         "source_file_count": 1,
-        "records_in": len(records),
-        "records_out": len(curated),
-        "null_primary_spirit": sum(1 for c in curated if c["primary_spirit"] is None),
-        "blend_count": sum(1 for c in curated if c["primary_spirit"] == "blend"),
-        "with_brands": sum(1 for c in curated if c.get("brands")),
-        "secondary_bases_used": sum(1 for c in curated if c["primary_spirit"] in SECONDARY_BASES.keys()),
-        "non_alcoholic_count": sum(1 for c in curated if c.get("alcoholic") == "non_alcoholic"),
+        **counts,
     }
-    with MANIFEST.open("w", encoding="utf-8") as f:
+    manifest_path = out_path.parent / MANIFEST.name
+    with manifest_path.open("w", encoding="utf-8") as f:
         json.dump(manifest, f, ensure_ascii=False, indent=2)
 
-    print(f"Curated {manifest['records_out']} drinks → {OUT_FILE}")
-    print(f"Manifest → {MANIFEST}")
+    print(f"Curated {manifest['records_out']} drinks → {out_path}")
+    print(f"Manifest → {manifest_path}")
     print(
         "Missing primary_spirit:", manifest["null_primary_spirit"],
         "| blend:", manifest["blend_count"],
@@ -433,4 +524,11 @@ def main(in_path=None):
     )
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Curate the latest raw snapshot into the drinks catalog.")
+    ap.add_argument("--in", dest="inp", default=None, help="Raw snapshot, .json or .ndjson (default: newest in data/raw/)")
+    ap.add_argument("--out", default=str(OUT_FILE), help="Curated catalog; a .ndjson suffix writes one record per line")
+    ap.add_argument("--pretty", action="store_true", help="Indent JSON output (default: compact)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Curation processes (default: all cores)")
+    ap.add_argument("--chunk-size", type=int, default=2000, help="Records per worker task (default 2000)")
+    args = ap.parse_args()
+    main(args.inp, args.out, workers=args.workers, chunk_size=args.chunk_size, pretty=args.pretty)
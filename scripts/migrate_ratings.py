@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+One-shot migration: storage/ratings.jsonl → the rating store configured under "storage" in
+config/app.json: sharded (storage/ratings/shard_NNN.jsonl + per-shard offset index) or
+sqlite (storage/app.db).
+
+Run:
+  python scripts/migrate_ratings.py                 # uses config paths/backend
+  python scripts/migrate_ratings.py --to sharded --src old.jsonl --dest storage/ratings --shards 64
+  python scripts/migrate_ratings.py --to sqlite --dest storage/app.db
+"""
+
+import argparse, json, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.services.ratings_service import ShardedRatingsStore, migrate_jsonl  # noqa: E402
+from backend.services.sqlite_store import SqliteRatingsStore, db_for  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrate ratings.jsonl into the sharded or SQLite rating store.")
+    ap.add_argument("--config", default="config/app.json", help="Path to config/app.json")
+    ap.add_argument("--to", choices=["sharded", "sqlite"], default=None, help="Target store (default: storage.backend)")
+    ap.add_argument("--src", default=None, help="Legacy ratings JSONL (default: paths.ratings)")
+    ap.add_argument("--dest", default=None, help="Shard directory or SQLite file (default: from storage config)")
+    ap.add_argument("--shards", type=int, default=None, help="Shard count (default: storage.shards)")
+    args = ap.parse_args()
+
+    cfg = json.loads(Path(args.config).read_text())
+    store_cfg = cfg.get("storage", {})
+    target = args.to or store_cfg.get("backend", "jsonl")
+    if target == "jsonl":
+        print("storage.backend is jsonl: ratings.jsonl is already the live store. "
+              "Set storage.backend to sqlite/sharded (or pass --to) to migrate.")
+        sys.exit(1)
+    src = Path(args.src or cfg["paths"]["ratings"])
+    shards = args.shards or int(store_cfg.get("shards", 64))
+
+    if not src.exists():
+        print(f"No ratings at {src}. Nothing to migrate.")
+        return
+
+    if target == "sqlite":
+        dest = Path(args.dest or store_cfg.get("sqlite_path", "storage/app.db"))
+        store = SqliteRatingsStore(db_for(dest))
+        if next(store.iter_events(), None) is not None:
+            print(f"{dest} already has ratings; refusing to append a second copy.")
+            sys.exit(1)
+        n = migrate_jsonl(src, store)
+        print(f"Migrated {n:,} events → {dest}")
+        return
+
+    if target != "sharded":
+        print(f"Unsupported target backend: {target}")
+        sys.exit(1)
+    dest = Path(args.dest or store_cfg.get("ratings_dir", "storage/ratings"))
+    if any(dest.glob("shard_*.jsonl")):
+        print(f"{dest} already has shards; refusing to append a second copy.")
+        sys.exit(1)
+    n = migrate_jsonl(src, ShardedRatingsStore(dest, shards))
+    print(f"Migrated {n:,} events → {dest} ({shards} shards)")
+
+if __name__ == "__main__":
+    main()
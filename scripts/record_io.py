@@ -0,0 +1,205 @@
+"""
+Streaming record I/O shared by the data pipeline (collect → curate → build_features).
+
+Files ending in .ndjson / .jsonl hold one compact JSON record per line. Anything else is a
+JSON document: a top-level array of records, or an object whose values are records (the raw
+snapshot format, keyed by idDrink). Both are read incrementally, one record at a time, and
+written incrementally; nothing here holds a whole dataset in memory.
+"""
+
+import json, os, tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+import numpy as np
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+READ_CHUNK = 1 << 16
+_WS = " \t\n\r"
+
+def is_ndjson(path) -> bool:
+    return Path(path).suffix.lower() in NDJSON_SUFFIXES
+
+# ---------------- reading ---------------- #
+
+def _iter_document(f) -> Iterator[dict]:
+    """Values of a top-level JSON array / object, decoded one at a time from a text stream."""
+    dec = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_CHUNK)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip(chars=_WS):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def peek() -> str:
+        skip()
+        if pos >= len(buf):
+            raise ValueError("unexpected end of JSON document")
+        return buf[pos]
+
+    def value():
+        nonlocal pos
+        while True:
+            try:
+                obj, end = dec.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buf) and not eof:  # a number may continue in the next chunk
+                fill()
+                continue
+            pos = end
+            return obj
+
+    fill()
+    opener = peek()
+    if opener not in "[{":
+        raise ValueError(f"expected a JSON array or object, got {opener!r}")
+    closer = "]" if opener == "[" else "}"
+    pos += 1
+    first = True
+    while True:
+        c = peek()
+        if c == closer:
+            return
+        if not first:
+            if c != ",":
+                raise ValueError(f"expected ',' or {closer!r} in JSON document, got {c!r}")
+            pos += 1
+            peek()
+        first = False
+        if opener == "{":
+            value()  # key
+            if peek() != ":":
+                raise ValueError("expected ':' after object key")
+            pos += 1
+            peek()
+        yield value()
+
+def iter_records(path) -> Iterator[dict]:
+    """Records from an NDJSON file or a JSON array / keyed-object document, streamed."""
+    with Path(path).open("r", encoding="utf-8") as f:
+        if is_ndjson(path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_document(f)
+
+# ---------------- writing ---------------- #
+
+def _dumps(obj, pretty: bool) -> str:
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None)
+
+class RecordWriter:
+    """
+    Incremental writer behind write_records, for producers that push records one at a time
+    (e.g. an async collector). The file is written to a temp name and only replaces path
+    when the block exits cleanly. NDJSON is always one compact line per record. JSON output
+    is an array, or an object keyed by record[key] when key is given; pretty=True matches
+    json.dump(..., indent=2) byte for byte.
+    """
+    def __init__(self, path, pretty: bool = False, key: str | None = None):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        self.pretty, self.key = pretty, key
+        self.ndjson = is_ndjson(self.path)
+        self.count = 0
+        self._f = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.tmp.open("w", encoding="utf-8")
+        if not self.ndjson:
+            self._f.write("{" if self.key else "[")
+        return self
+
+    def write(self, r: dict):
+        if self.ndjson:
+            self._f.write(_dumps(r, False) + "\n")
+        else:
+            item = _dumps(r, self.pretty).replace("\n", "\n  ") if self.pretty else _dumps(r, False)
+            if self.key:
+                item = f"{_dumps(str(r[self.key]), False)}: {item}"
+            sep, lead = (",\n  ", "\n  ") if self.pretty else (", ", "")
+            self._f.write((sep if self.count else lead) + item)
+        self.count += 1
+
+    def __exit__(self, exc_type, *exc):
+        if not self.ndjson and exc_type is None:
+            self._f.write(("\n" if self.pretty and self.count else "") + ("}" if self.key else "]"))
+        self._f.close()
+        if exc_type is None:
+            os.replace(self.tmp, self.path)
+        else:
+            self.tmp.unlink(missing_ok=True)
+        return False
+
+def write_records(records: Iterable[dict], path, pretty: bool = False, key: str | None = None) -> int:
+    """Stream records to path (atomically replaced, see RecordWriter) and return how many were written."""
+    with RecordWriter(path, pretty=pretty, key=key) as out:
+        for r in records:
+            out.write(r)
+    return out.count
+
+# ---------------- spilling / sorting ---------------- #
+
+class RecordSpill(Sequence):
+    """
+    Records spilled to an unnamed temporary NDJSON file and addressed by byte offset, so the
+    pipeline can sort, index and re-iterate a catalog while only offsets (and sort keys while
+    sorting) stay in memory. Rows are ordered by key (stable, like sorted()) if one is given.
+    """
+    def __init__(self, records: Iterable[dict], key=None, dir=None):
+        self._f = tempfile.TemporaryFile(dir=dir)
+        starts, keys = [], []
+        for r in records:
+            starts.append(self._f.tell())
+            self._f.write(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n")
+            if key is not None:
+                keys.append(key(r))
+        starts.append(self._f.tell())
+        bounds = np.asarray(starts, dtype=np.int64)
+        order = np.arange(len(starts) - 1)
+        if key is not None:
+            order = np.asarray(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64)
+        self._start = bounds[:-1][order]
+        self._size = (bounds[1:] - bounds[:-1])[order]
+
+    def __len__(self) -> int:
+        return int(self._start.size)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        self._f.seek(int(self._start[i]))
+        return json.loads(self._f.read(int(self._size[i])))
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for TheCocktailDB API, for running collect_cocktails.py offline.
+
+Responses come from one of:
+  --snapshot FILE   a raw snapshot (.json or .ndjson); search / list / filter / lookup are answered from it
+  --replay DIR      a collector response cache (data/raw/http_cache); unrecorded requests get a 404
+
+--latency adds a fixed delay per request to model a remote API.
+
+Run:
+  python scripts/stub_cocktaildb.py --snapshot data/raw/cocktails_20250815.json --latency 0.1
+  python scripts/collect_cocktails.py --base-url http://127.0.0.1:8765/api/json/v1/1 --rate 0 --no-cache
+"""
+
+import argparse, json, sys, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from collect_cocktails import LIST_KEYS, ResponseCache  # noqa: E402
+from record_io import iter_records  # noqa: E402
+
+def _ingredients(r: dict) -> list[str]:
+    return [r[f"strIngredient{i}"].strip() for i in range(1, 16) if (r.get(f"strIngredient{i}") or "").strip()]
+
+class SnapshotSource:
+    """Answers the collector's endpoints from a list of raw records."""
+    def __init__(self, records: list[dict]):
+        self.by_id = {r["idDrink"]: r for r in records}
+        self.records = list(self.by_id.values())
+
+    def _values(self, kind: str) -> list[str]:
+        if kind == "i":
+            vals = (ing for r in self.records for ing in _ingredients(r))
+        else:
+            vals = (r.get(LIST_KEYS[kind]) for r in self.records)
+        return sorted({v for v in vals if v}, key=str.lower)
+
+    def _matches(self, param: str, value: str, r: dict) -> bool:
+        if param == "i":
+            return value.lower() in (ing.lower() for ing in _ingredients(r))
+        return (r.get(LIST_KEYS[param]) or "").lower() == value.lower()
+
+    def __call__(self, endpoint: str, params: dict) -> bytes | None:
+        if endpoint == "search.php" and "f" in params:
+            f = params["f"].lower()
+            rows = [r for r in self.records if (r.get("strDrink") or "").lower().startswith(f)]
+        elif endpoint == "list.php" and len(params) == 1 and next(iter(params)) in LIST_KEYS:
+            kind = next(iter(params))
+            rows = [{LIST_KEYS[kind]: v} for v in self._values(kind)]
+        elif endpoint == "filter.php" and len(params) == 1 and next(iter(params)) in LIST_KEYS:
+            param, value = next(iter(params.items()))
+            rows = [{"strDrink": r.get("strDrink"), "strDrinkThumb": r.get("strDrinkThumb"), "idDrink": r["idDrink"]}
+                    for r in self.records if self._matches(param, value, r)]
+        elif endpoint == "lookup.php" and "i" in params:
+            rows = [self.by_id[params["i"]]] if params["i"] in self.by_id else []
+        else:
+            return None
+        return json.dumps({"drinks": rows or None}, ensure_ascii=False).encode("utf-8")
+
+class ReplaySource:
+    """Serves responses recorded in a ResponseCache directory."""
+    def __init__(self, root):
+        self.cache = ResponseCache(root)
+
+    def __call__(self, endpoint: str, params: dict) -> bytes | None:
+        return self.cache.get(endpoint, params)
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = url.path.rsplit("/", 1)[-1]
+        body = self.server.source(endpoint, dict(parse_qsl(url.query, keep_blank_values=True)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status = 200 if body is not None else 404
+        body = body if body is not None else b'{"error": "not found"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve TheCocktailDB endpoints locally from a snapshot or recorded responses.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--snapshot", help="Raw snapshot (.json / .ndjson) to answer queries from")
+    src.add_argument("--replay", help="Response cache directory to replay")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="Added delay per request (seconds)")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.source = SnapshotSource(list(iter_records(args.snapshot))) if args.snapshot else ReplaySource(args.replay)
+    server.latency, server.verbose = args.latency, args.verbose
+    print(f"Serving on http://{args.host}:{args.port}/api/json/v1/1/ "
+          f"({'snapshot ' + args.snapshot if args.snapshot else 'replay ' + args.replay})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
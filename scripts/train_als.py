@@ -10,18 +10,30 @@ Artifacts written to: models/als/<version>/
 And pointer:
   - models/als/active.json  -> {"path":"models/als/<version>"}
 
+Backends: `implicit` (if installed) or the built-in NumPy/SciPy conjugate-gradient solver
+(`--backend native`, threaded across users/items); `auto` picks implicit when available.
+
+Incremental mode (`--incremental`) warm-starts from the active model: it reads only events newer
+than `last_ts` in its meta.json (plus the full history of the users who rated since), runs a few
+native iterations with item factors pulled towards the previous ones, and publishes only if
+held-out recall@k (each affected user's latest positive) is no worse than the previous model's.
+The published factors are then refit the same way with the held-out positives put back.
+
 Run:
-  pip install implicit numpy scipy
   python scripts/train_als.py --rank 64 --reg 0.05 --iters 30 --alpha 40 \
-      --min-users 30 --min-interactions 200
+      --min-users 30 --min-interactions 200 [--backend auto|implicit|native] [--threads N]
 """
 
 from __future__ import annotations
 
 import argparse
+import dataclasses
 import json
+import os
+import sqlite3
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 from pathlib import Path
@@ -54,6 +66,12 @@ def write_json(obj, path: Path) -> None:
     with path.open("w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
 
+def write_json_atomic(obj, path: Path) -> None:
+    """For files a running server polls (active.json): readers never see a partial write."""
+    tmp = path.with_name(path.name + ".tmp")
+    write_json(obj, tmp)
+    os.replace(tmp, path)
+
 
 # --------------------------- Config ---------------------------
 
@@ -88,11 +106,21 @@ class ALSParams:
     min_interactions: int = 200
     like_threshold: float = 3.0   # ratings > threshold → positive signal
     tried_bonus: float = 0.10     # add small weight if tried=True
+    backend: str = "auto"         # "implicit", "native" or "auto" (implicit if installed)
+    cg_steps: int = 3             # conjugate-gradient steps per solve (native backend)
+    threads: int = 0              # worker threads for the native backend (0 = all cores)
+    seed: int = 0                 # factor initialisation (native backend)
+    incremental: bool = False     # warm-start from the active model on events since its last_ts
+    inc_iters: int = 3            # iterations of an incremental run
+    prox: float = 1.0             # pull of item factors towards the previous model (incremental)
+    tolerance: float = 0.0        # allowed drop in held-out recall before refusing to publish
+    eval_k: int = 10
     tag: str | None = None        # version folder suffix (else timestamp)
 
     def as_meta(self) -> Dict:
         d = asdict(self)
         d.pop("tag", None)
+        d.pop("threads", None)
         return d
 
 
@@ -115,47 +143,177 @@ class IDMap:
 
 # --------------------------- Data: Ratings ---------------------------
 
-@dataclass
-class RatingEvent:
-    user_id: str
-    drink_id: str
-    rating: float
-    tried: bool
-    ts: int | None = None
+class _Growable:
+    """Preallocated 1-D array that doubles when full (amortised O(1) appends of whole chunks)."""
+    def __init__(self, dtype, capacity: int = 1 << 16):
+        self.buf = np.empty(capacity, dtype=dtype)
+        self.n = 0
 
-    @classmethod
-    def from_json(cls, obj: Dict) -> "RatingEvent":
-        return cls(
-            user_id=str(obj.get("user_id") or "local"),
-            drink_id=str(obj.get("drink_id")),
-            rating=float(obj.get("rating", 0)),
-            tried=bool(obj.get("tried", False)),
-            ts=int(obj["ts"]) if "ts" in obj and obj["ts"] is not None else None,
-        )
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self.buf.dtype)
+        need = self.n + values.size
+        if need > self.buf.size:
+            grown = np.empty(max(need, 2 * self.buf.size), dtype=self.buf.dtype)
+            grown[:self.n] = self.buf[:self.n]
+            self.buf = grown
+        self.buf[self.n:need] = values
+        self.n = need
+
+    def array(self) -> np.ndarray:
+        return self.buf[:self.n]
 
 
 class RatingsDataset:
-    def __init__(self, rows: List[RatingEvent]):
-        self.rows = rows
+    """
+    Rating events as columns: user / drink codes (int32, interned), rating (float32),
+    tried (bool) and ts (int64, -1 if missing), in store order. Sources are parsed in chunks
+    straight into doubling arrays, so memory is ~21 bytes per event plus one chunk.
+    """
+    CHUNK = 65536
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self.drink_ids: List[str] = []
+        self._user_code: Dict[str, int] = {}
+        self._drink_code: Dict[str, int] = {}
+        self._cols = {"user": _Growable(np.int32), "drink": _Growable(np.int32),
+                      "rating": _Growable(np.float32), "tried": _Growable(np.bool_), "ts": _Growable(np.int64)}
+
+    def __len__(self) -> int:
+        return self._cols["user"].n
+
+    # column views
+    users   = property(lambda self: self._cols["user"].array())
+    drinks  = property(lambda self: self._cols["drink"].array())
+    ratings = property(lambda self: self._cols["rating"].array())
+    tried   = property(lambda self: self._cols["tried"].array())
+    ts      = property(lambda self: self._cols["ts"].array())
+
+    def append_chunk(self, users, drinks, ratings, tried, ts) -> None:
+        """Add parallel lists of raw values (ids as strings; ts None if missing)."""
+        ucode, dcode = self._user_code, self._drink_code
+        for uid in users:
+            if uid not in ucode:
+                ucode[uid] = len(self.user_ids); self.user_ids.append(uid)
+        for did in drinks:
+            if did not in dcode:
+                dcode[did] = len(self.drink_ids); self.drink_ids.append(did)
+        self._cols["user"].extend([ucode[u] for u in users])
+        self._cols["drink"].extend([dcode[d] for d in drinks])
+        self._cols["rating"].extend(ratings)
+        self._cols["tried"].extend(tried)
+        self._cols["ts"].extend([-1 if t is None else t for t in ts])
+
+    @staticmethod
+    def source_files(path: Path) -> List[Path]:
+        """A single ratings.jsonl, or every shard_*.jsonl of a sharded rating store directory."""
+        if path.is_dir():
+            return sorted(path.glob("shard_*.jsonl"))
+        return [path] if path.exists() else []
+
+    @classmethod
+    def load_jsonl(cls, path: Path, since_ts: int | None = None, users: set | None = None) -> "RatingsDataset":
+        """All events, or only those with ts > since_ts and/or by the given users."""
+        ds = cls()
+        only_users = users
+        cols = ([], [], [], [], [])
+        users, drinks, ratings, tried, ts = cols
+        for src in cls.source_files(path):
+            with src.open("r", encoding="utf-8") as f:
+                for line in f:
+                    s = line.strip()
+                    if not s:
+                        continue
+                    try:
+                        obj = json.loads(s)
+                        if "drink_id" not in obj:
+                            continue
+                        u, d = str(obj.get("user_id") or "local"), str(obj["drink_id"])
+                        r, t = float(obj.get("rating", 0)), bool(obj.get("tried", False))
+                        when = int(obj["ts"]) if obj.get("ts") is not None else None
+                    except Exception:
+                        # skip malformed
+                        continue
+                    if since_ts is not None and (when is None or when <= since_ts):
+                        continue
+                    if only_users is not None and u not in only_users:
+                        continue
+                    users.append(u); drinks.append(d); ratings.append(r); tried.append(t); ts.append(when)
+                    if len(users) >= cls.CHUNK:
+                        ds.append_chunk(*cols)
+                        for c in cols: c.clear()
+        if users:
+            ds.append_chunk(*cols)
+        return ds
 
     @classmethod
-    def load_jsonl(cls, path: Path) -> "RatingsDataset":
+    def load_sqlite(cls, path: Path, since_ts: int | None = None, users: set | None = None) -> "RatingsDataset":
+        """Read the ratings table of the SQLite storage backend (storage/app.db), optionally filtered."""
+        ds = cls()
         if not path.exists():
-            return cls([])
-        out: List[RatingEvent] = []
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                s = line.strip()
-                if not s:
-                    continue
-                try:
-                    obj = json.loads(s)
-                    if "drink_id" in obj:
-                        out.append(RatingEvent.from_json(obj))
-                except Exception:
-                    # skip malformed
-                    continue
-        return cls(out)
+            return ds
+        sql = "SELECT user_id, drink_id, rating, tried, ts FROM ratings"
+        where, args = [], []
+        if since_ts is not None:
+            where.append("ts > ?"); args.append(int(since_ts))
+        queries = []
+        if users is None:
+            queries.append((where, args))
+        else:
+            # per-user lookups go through the ratings_user index; a user's events stay in one batch
+            ulist = sorted(users)
+            for i in range(0, len(ulist), 500):
+                batch = ulist[i:i+500]
+                queries.append((where + [f"user_id IN ({','.join('?' * len(batch))})"], args + batch))
+        conn = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
+        try:
+            for w, a in queries:
+                cur = conn.execute(sql + (" WHERE " + " AND ".join(w) if w else "") + " ORDER BY id", a)
+                while True:
+                    rows = cur.fetchmany(cls.CHUNK)
+                    if not rows:
+                        break
+                    us, drinks, ratings, tried, ts = zip(*rows)
+                    ds.append_chunk([u or "local" for u in us], [str(d) for d in drinks],
+                                    ratings, [bool(t) for t in tried], ts)
+        finally:
+            conn.close()
+        return ds
+
+    def max_ts(self) -> int | None:
+        ts = self.ts
+        return int(ts.max()) if ts.size and ts.max() >= 0 else None
+
+    def latest(self, id_map: IDMap) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (event positions, user codes, columns) of the latest event per (user, drink) among drinks
+        known to id_map -- latest ts wins, ties and missing ts go to the later event.
+        """
+        col_of_code = np.asarray([id_map.index_by_id.get(d, -1) for d in self.drink_ids], dtype=np.int64)
+        cols = col_of_code[self.drinks] if len(self) else np.empty(0, dtype=np.int64)
+        pos = np.flatnonzero(cols >= 0)
+        key = self.users[pos].astype(np.int64) * len(id_map.ids) + cols[pos]
+        order = np.lexsort((pos, self.ts[pos], key))  # by key, then ts, then arrival
+        key_sorted = key[order]
+        last = np.ones(order.size, dtype=bool)
+        last[:-1] = key_sorted[1:] != key_sorted[:-1]
+        keep = np.sort(pos[order[last]])
+        return keep, self.users[keep], cols[keep]
+
+    def _implicit_entries(self, id_map: IDMap, like_threshold: float, tried_bonus: float):
+        """(row, col, weight, ts) of positive entries + user_index, rows in first-appearance order."""
+        keep, ucodes, cols = self.latest(id_map)
+        codes, first = np.unique(ucodes, return_index=True)
+        codes = codes[np.argsort(first)]
+        row_of_code = np.empty(len(self.user_ids), dtype=np.int32)
+        row_of_code[codes] = np.arange(codes.size, dtype=np.int32)
+        user_index = {self.user_ids[c]: i for i, c in enumerate(codes.tolist())}
+
+        # translate explicit rating to implicit weight
+        denom = max(1e-6, 5.0 - like_threshold)
+        w = np.maximum(0.0, self.ratings[keep] - like_threshold) / denom + np.where(self.tried[keep], tried_bonus, 0.0)
+        pos = w > 0
+        return row_of_code[ucodes[pos]], cols[pos], w[pos].astype(np.float32), keep[pos], user_index
 
     def to_implicit_csr(
         self,
@@ -164,59 +322,57 @@ class RatingsDataset:
         tried_bonus: float = 0.10,
     ) -> Tuple[sp.csr_matrix, Dict[str, int]]:
         """
-        Convert explicit events → implicit positives.
+        Convert explicit events → implicit positives (one per user/drink: the latest rating).
         weight = max(0, (rating - like_threshold) / (5 - like_threshold)) + (tried_bonus if tried else 0)
+        Users are numbered in order of first appearance.
         """
-        if not self.rows:
+        if not len(self):
             return sp.csr_matrix((0, len(id_map.ids))), {}
-
-        user_index: Dict[str, int] = {}
-        next_uid = 0
-
-        data, rows, cols = [], [], []
-
-        for ev in self.rows:
-            col = id_map.index_by_id.get(ev.drink_id)
-            if col is None:
-                continue
-
-            if ev.user_id not in user_index:
-                user_index[ev.user_id] = next_uid
-                next_uid += 1
-            row = user_index[ev.user_id]
-
-            # translate explicit rating to implicit weight
-            denom = max(1e-6, 5.0 - like_threshold)
-            rel = max(0.0, ev.rating - like_threshold) / denom  # [0,1]
-            w = rel + (tried_bonus if ev.tried else 0.0)
-            if w <= 0:
-                continue
-
-            rows.append(row)
-            cols.append(col)
-            data.append(w)
-
-        if not data:
-            return sp.csr_matrix((0, len(id_map.ids))), user_index
-
-        user_item = sp.csr_matrix(
-            (np.array(data, dtype=np.float32), (np.array(rows), np.array(cols))),
-            shape=(len(user_index), len(id_map.ids))
-        )
+        rows, cols, w, _, user_index = self._implicit_entries(id_map, like_threshold, tried_bonus)
+        user_item = sp.csr_matrix((w, (rows, cols)), shape=(len(user_index), len(id_map.ids)))
         return user_item, user_index
 
+    def split_last(
+        self,
+        id_map: IDMap,
+        like_threshold: float = 3.0,
+        tried_bonus: float = 0.10,
+    ) -> Tuple[sp.csr_matrix, np.ndarray, Dict[str, int]]:
+        """
+        Leave-last-out: like to_implicit_csr, but each user's most recent positive (if they have
+        at least two) is removed from the matrix and returned as held[row] (column, or -1).
+        """
+        n_items = len(id_map.ids)
+        if not len(self):
+            return sp.csr_matrix((0, n_items)), np.empty(0, dtype=np.int64), {}
+        rows, cols, w, pos, user_index = self._implicit_entries(id_map, like_threshold, tried_bonus)
+        order = np.lexsort((pos, self.ts[pos], rows))           # per user, oldest → newest
+        rows_s = rows[order]
+        last = np.ones(order.size, dtype=bool)
+        last[:-1] = rows_s[1:] != rows_s[:-1]
+        counts = np.bincount(rows, minlength=len(user_index))
+        out = order[last & (counts[rows_s] >= 2)]
+        held = np.full(len(user_index), -1, dtype=np.int64)
+        held[rows[out]] = cols[out]
+        mask = np.ones(rows.size, dtype=bool)
+        mask[out] = False
+        train = sp.csr_matrix((w[mask], (rows[mask], cols[mask])), shape=(len(user_index), n_items))
+        return train, held, user_index
+
 
 # --------------------------- Training ---------------------------
 
 class ALSTrainer:
+    algo = "implicit-als"
+
     def __init__(self, params: ALSParams):
         if AlternatingLeastSquares is None:
             raise RuntimeError("The 'implicit' library is not installed. Install with: pip install implicit numpy scipy")
         self.params = params
 
-    def fit(self, item_user: sp.csr_matrix) -> np.ndarray:
+    def fit(self, user_item: sp.csr_matrix) -> np.ndarray:
         """
-        Train ALS on item-user matrix. Returns item_factors [n_items, rank].
+        Train ALS on the user-item confidence matrix. Returns item_factors [n_items, rank].
         """
         model = AlternatingLeastSquares(
             factors=self.params.rank,
@@ -224,8 +380,161 @@ class ALSTrainer:
             iterations=self.params.iters,
             use_gpu=False,
         )
-        model.fit(item_user, show_progress=True)
-        return model.item_factors.astype(np.float32)
+        model.fit(user_item, show_progress=True)  # implicit >= 0.5 takes user-item
+        self.user_factors = np.asarray(model.user_factors, dtype=np.float32)
+        return np.asarray(model.item_factors, dtype=np.float32)
+
+
+class NativeALSTrainer:
+    """
+    Implicit-feedback ALS (Hu, Koren & Volinsky) with the conjugate-gradient update of
+    Takacs et al. -- the same objective and solver `implicit` uses on CPU -- in NumPy/SciPy.
+
+    Each half-step solves (YtY + Yu^T (Cu - I) Yu + reg*I) x_u = Yu^T Cu 1 for every row with a
+    few CG steps warm-started from the previous factors. Rows are processed in blocks that run
+    CG in lockstep (one gather/scatter pass over the block's nonzeros per step); blocks go to a
+    thread pool, where the BLAS / sparse kernels run without the GIL.
+    """
+    algo = "native-cg-als"
+    block_rows = 2048       # rows per work unit ...
+    block_nnz = 1 << 17     # ... or fewer, so the gathered [nnz, rank] factors stay small
+
+    def __init__(self, params: ALSParams, verbose: bool = True):
+        self.params = params
+        self.verbose = verbose
+        self.user_factors = None
+        self.threads = params.threads or os.cpu_count() or 1
+
+    def fit(self, user_item: sp.csr_matrix, item_factors: np.ndarray | None = None, prox=0.0,
+            gram: np.ndarray | None = None) -> np.ndarray:
+        """
+        Item factors [n_items, rank]. Warm start (incremental runs): with item_factors and prox
+        (scalar or per item), each item solve adds prox_i * ||y_i - y_i_prev||^2 in place of the
+        users not in user_item, whose factor Gram matrix `gram` is added to the item-side XtX.
+        Items nobody in user_item rated keep their previous factors.
+        """
+        Cui = user_item.tocsr().astype(np.float32)
+        Ciu = Cui.T.tocsr()
+        n_users, n_items = Cui.shape
+        rng = np.random.default_rng(self.params.seed)
+        X = (rng.standard_normal((n_users, self.params.rank)) * 0.01).astype(np.float32)
+        Y = (rng.standard_normal((n_items, self.params.rank)) * 0.01).astype(np.float32) \
+            if item_factors is None else np.array(item_factors, dtype=np.float32)
+        prior = None if item_factors is None or not np.any(prox) else Y.copy()
+        idle = np.diff(Ciu.indptr) == 0
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            for it in range(self.params.iters):
+                t0 = time.perf_counter()
+                self.solve(Cui, X, Y, pool)
+                self.solve(Ciu, Y, X, pool, prior=prior, prox=prox, gram=gram)
+                if prior is not None:
+                    Y[idle] = prior[idle]
+                if self.verbose:
+                    print(f"  iter {it + 1}/{self.params.iters}: {time.perf_counter() - t0:.2f}s")
+        self.user_factors = X
+        return Y
+
+    def solve(self, C: sp.csr_matrix, X: np.ndarray, Y: np.ndarray, pool=None,
+              prior: np.ndarray | None = None, prox=0.0, gram: np.ndarray | None = None) -> None:
+        """Update every row of X in place given the fixed factors Y of the other side
+        (optionally regularised towards prior with weight prox, plus an external Gram term)."""
+        YtY = Y.T.astype(np.float64) @ Y
+        if gram is not None:
+            YtY += gram
+        YtY = YtY.astype(np.float32)
+        YtY[np.diag_indices_from(YtY)] += self.params.reg
+        blocks = self.blocks(C.indptr)
+        if pool is None:
+            for s, e in blocks:
+                self._cg_block(C, X, Y, YtY, s, e, prior, prox)
+        else:
+            list(pool.map(lambda b: self._cg_block(C, X, Y, YtY, *b, prior, prox), blocks))
+
+    def blocks(self, indptr: np.ndarray) -> List[Tuple[int, int]]:
+        out, start, n = [], 0, len(indptr) - 1
+        while start < n:
+            stop = int(np.searchsorted(indptr, indptr[start] + self.block_nnz, side="right")) - 1
+            stop = min(max(stop, start + 1), start + self.block_rows, n)
+            out.append((start, stop))
+            start = stop
+        return out
+
+    def _cg_block(self, C, X, Y, YtY, start, stop, prior=None, prox=0.0) -> None:
+        sub = C[start:stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(sub.indptr))
+        Yg = Y[sub.indices]                       # [nnz, rank] factors of each nonzero's column
+        cm1 = sub.data - 1.0
+        W = sp.csr_matrix((cm1, np.arange(sub.nnz), sub.indptr), shape=(stop - start, sub.nnz))
+
+        pb = 0.0
+        if prior is not None:
+            pb = prox[start:stop, None] if np.ndim(prox) else prox
+
+        def A(v):  # (YtY + reg*I + prox) v + Yu^T (Cu - I) Yu v, for the whole block at once
+            W.data = cm1 * np.einsum("ij,ij->i", Yg, v[rows])
+            return v @ YtY + W @ Yg + pb * v
+
+        x = X[start:stop].copy()
+        b = sub @ Y                               # b = Yu^T Cu 1 (+ prox * prior)
+        if prior is not None:
+            b += pb * prior[start:stop]
+        r = b - A(x)
+        p = r.copy()
+        rs = np.einsum("ij,ij->i", r, r)
+        for _ in range(self.params.cg_steps):
+            if not np.any(rs > 1e-20):
+                break
+            Ap = A(p)
+            pAp = np.einsum("ij,ij->i", p, Ap)
+            a = np.divide(rs, pAp, out=np.zeros_like(rs), where=pAp > 0)
+            x += a[:, None] * p
+            r -= a[:, None] * Ap
+            rs_new = np.einsum("ij,ij->i", r, r)
+            beta = np.divide(rs_new, rs, out=np.zeros_like(rs), where=rs > 0)
+            p = r + beta[:, None] * p
+            rs = rs_new
+        X[start:stop] = x
+
+
+def factor_stats(confidence: sp.csr_matrix, user_factors: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Saved with each model for later warm starts: the user-factor Gram matrix (stands in for
+    all users in the item-side XtX) and each item's evidence, sum_u c_ui ||x_u||^2 / rank
+    (the weight that keeps an item near its old factors when only a few users are re-solved).
+    """
+    X = np.asarray(user_factors, dtype=np.float64)
+    sq = np.einsum("ij,ij->i", X, X) / X.shape[1]
+    return {"user_gram": X.T @ X,
+            "item_precision": np.asarray(confidence.T @ sq, dtype=np.float32).ravel()}
+
+
+def heldout_recall(confidence: sp.csr_matrix, held: np.ndarray, Y: np.ndarray, params: ALSParams,
+                   k: int = 10, max_users: int = 5000, seed: int = 0) -> float | None:
+    """
+    recall@k of held[u] for users with a held-out item: user factors are solved exactly from
+    their training rows against Y, training items are excluded from the ranking.
+    """
+    users = np.flatnonzero(held >= 0)
+    if not users.size:
+        return None
+    if users.size > max_users:
+        users = np.sort(np.random.default_rng(seed).choice(users, max_users, replace=False))
+    sub = confidence[users].tocsr()
+    X = np.zeros((users.size, Y.shape[1]), dtype=np.float32)
+    NativeALSTrainer(dataclasses.replace(params, cg_steps=30), verbose=False).solve(sub, X, Y)
+    scores = X @ np.asarray(Y).T
+    scores[sub.nonzero()] = -np.inf
+    k = min(k, scores.shape[1] - 1)
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return float(np.mean(np.any(top == held[users][:, None], axis=1)))
+
+
+def make_trainer(params: ALSParams):
+    """Trainer for params.backend ("auto": implicit when installed, else the native solver)."""
+    backend = params.backend
+    if backend == "auto":
+        backend = "implicit" if AlternatingLeastSquares is not None else "native"
+    return ALSTrainer(params) if backend == "implicit" else NativeALSTrainer(params)
 
 
 # --------------------------- Artifacts ---------------------------
@@ -235,8 +544,28 @@ class ALSArtifacts:
     root: Path = Path("models/als")
 
     def version_dir(self, tag: str | None = None) -> Path:
-        version = tag or datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        return self.root / version
+        """
+        Create and return a fresh models/als/<version>/. A tag that already exists is refused;
+        timestamped versions get a numeric suffix, so runs never overwrite one another (or the
+        base model of an incremental run). mkdir is atomic, which also covers concurrent runs.
+        """
+        ensure_dir(self.root)
+        if tag:
+            outdir = self.root / tag
+            try:
+                outdir.mkdir()
+            except FileExistsError:
+                raise FileExistsError(f"ALS version {outdir} already exists; pick another --tag") from None
+            return outdir
+        base = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+        for n in range(1000):
+            outdir = self.root / (base if n == 0 else f"{base}_{n}")
+            try:
+                outdir.mkdir()
+                return outdir
+            except FileExistsError:
+                continue
+        raise FileExistsError(f"could not allocate a version directory under {self.root}")
 
     def save(
         self,
@@ -246,36 +575,66 @@ class ALSArtifacts:
         n_users: int,
         interactions: int,
         version_tag: str | None = None,
+        algo: str = "implicit-als",
+        extra_meta: Dict | None = None,
+        arrays: Dict[str, np.ndarray] | None = None,
     ) -> Path:
         outdir = self.version_dir(version_tag)
-        ensure_dir(outdir)
 
         # Save factors + norms
         np.save(outdir / "item_factors.npy", item_factors)
         norms = np.linalg.norm(item_factors, axis=1)
         norms[norms == 0] = 1e-8
         np.save(outdir / "item_norms.npy", norms)
+        for name, arr in (arrays or {}).items():  # warm-start state (user_gram, item_precision)
+            np.save(outdir / f"{name}.npy", arr)
 
         # Save id map aligned to rows
         write_json({did: i for i, did in enumerate(id_map.ids)}, outdir / "item_id_map.json")
 
         # Meta
         meta = {
-            "algo": "implicit-als",
+            "algo": algo,
             "trained_at_utc": now_utc_iso(),
             "n_items": int(item_factors.shape[0]),
             "n_users": int(n_users),
             "interactions": int(interactions),
             **params.as_meta(),
+            **(extra_meta or {}),
         }
         write_json(meta, outdir / "meta.json")
 
         # Update active pointer
         ensure_dir(self.root)
-        write_json({"path": f"{outdir.as_posix()}"}, self.root / "active.json")
+        write_json_atomic({"path": f"{outdir.as_posix()}"}, self.root / "active.json")
 
         return outdir
 
+    def load_active(self, id_map: IDMap) -> Tuple[Path, Dict, np.ndarray, Dict[str, np.ndarray]] | None:
+        """(path, meta, item factors aligned to id_map, warm-start arrays) of the active model;
+        None if there is none. Items the model has not seen get small random factors, no evidence."""
+        pointer = self.root / "active.json"
+        if not pointer.exists():
+            return None
+        path = Path(read_json(pointer)["path"])
+        if not (path / "item_factors.npy").exists():
+            return None
+        meta = read_json(path / "meta.json")
+        factors = np.load(path / "item_factors.npy")
+        row_of = read_json(path / "item_id_map.json")
+        rows = np.asarray([row_of.get(did, -1) for did in id_map.ids], dtype=np.int64)
+        aligned = (np.random.default_rng(0).standard_normal((len(id_map.ids), factors.shape[1])) * 0.01).astype(np.float32)
+        known = rows >= 0
+        aligned[known] = factors[rows[known]]
+        state = {}
+        if (path / "user_gram.npy").exists():
+            state["user_gram"] = np.load(path / "user_gram.npy")
+        if (path / "item_precision.npy").exists():
+            prec = np.load(path / "item_precision.npy")
+            state["item_precision"] = np.zeros(len(id_map.ids), dtype=np.float32)
+            state["item_precision"][known] = prec[rows[known]]
+        return path, meta, aligned, state
+
 
 # --------------------------- Orchestration ---------------------------
 
@@ -284,14 +643,33 @@ class ALSPipeline:
         self.cfg_path = cfg_path
         self.params = params
         self.paths = AppPaths.from_config(cfg_path)
+        self.storage = read_json(cfg_path).get("storage", {})
         self.id_map = IDMap.load(Path(self.paths.id_map))
         self.artifacts = ALSArtifacts()
 
+    def ratings_path(self) -> Path:
+        backend = self.storage.get("backend", "jsonl")
+        if backend == "sqlite":
+            return Path(self.storage.get("sqlite_path", "storage/app.db"))
+        if backend == "sharded":
+            return Path(self.storage.get("ratings_dir", "storage/ratings"))
+        return Path(self.paths.ratings)
+
+    def load_ratings(self, since_ts: int | None = None, users: set | None = None) -> RatingsDataset:
+        """Ratings from the configured store (all shards / the SQLite DB / ratings.jsonl)."""
+        if self.storage.get("backend", "jsonl") == "sqlite":
+            return RatingsDataset.load_sqlite(self.ratings_path(), since_ts=since_ts, users=users)
+        return RatingsDataset.load_jsonl(self.ratings_path(), since_ts=since_ts, users=users)
+
     def run(self) -> None:
-        # Load ratings
-        ratings_path = Path(self.paths.ratings)
-        ds = RatingsDataset.load_jsonl(ratings_path)
-        if not ds.rows:
+        if self.params.incremental:
+            return self.run_incremental()
+        return self.run_full()
+
+    def run_full(self) -> None:
+        ratings_path = self.ratings_path()
+        ds = self.load_ratings()
+        if not len(ds):
             print(f"No ratings found at {ratings_path}. Nothing to train.")
             return
 
@@ -310,13 +688,13 @@ class ALSPipeline:
                   f"interactions={interactions} (need ≥{self.params.min_interactions}).")
             return
 
-        # Scale confidences and transpose
-        item_user = (user_item.tocsr() * self.params.alpha).T.tocsr()
+        # Scale weights into confidences
+        confidence = (user_item.tocsr() * self.params.alpha).tocsr()
 
-        print(f"Training ALS: users={n_users}, items={n_items}, "
+        trainer = make_trainer(self.params)
+        print(f"Training ALS ({trainer.algo}): users={n_users}, items={n_items}, "
               f"rank={self.params.rank}, reg={self.params.reg}, iters={self.params.iters}, alpha={self.params.alpha}")
-        trainer = ALSTrainer(self.params)
-        item_factors = trainer.fit(item_user)
+        item_factors = trainer.fit(confidence)
 
         # Align/Pad safety (should already match n_items)
         if item_factors.shape[0] != n_items:
@@ -331,17 +709,101 @@ class ALSPipeline:
             n_users=n_users,
             interactions=interactions,
             version_tag=self.params.tag,
+            algo=trainer.algo,
+            extra_meta={"mode": "full", "last_ts": ds.max_ts()},
+            arrays=factor_stats(confidence, trainer.user_factors),
         )
 
         print(f"Saved ALS artifacts → {outdir}")
         print(f"Updated active pointer → {self.artifacts.root / 'active.json'}")
         print(f"item_factors: {item_factors.shape}, users: {n_users}, interactions: {interactions}")
 
+    def run_incremental(self) -> None:
+        """Warm-start from the active model on the users who rated since its last_ts."""
+        prev = self.artifacts.load_active(self.id_map)
+        if prev is None or prev[1].get("last_ts") is None or prev[2].shape[1] != self.params.rank:
+            print("No active model with a last_ts at this rank; running a full retrain instead.")
+            return self.run_full()
+        prev_path, prev_meta, prev_factors, state = prev
+        since = int(prev_meta["last_ts"])
+
+        delta = self.load_ratings(since_ts=since)
+        if not len(delta):
+            print(f"No ratings newer than last_ts={since} (model {prev_path}). Nothing to do.")
+            return
+        # the whole history of every user who rated since, so their factors are solved properly
+        ds = self.load_ratings(users=set(delta.user_ids))
+        last_ts = max(since, delta.max_ts() or since)
+
+        train, held, users = ds.split_last(
+            self.id_map,
+            like_threshold=self.params.like_threshold,
+            tried_bonus=self.params.tried_bonus,
+        )
+        if not train.nnz:
+            print(f"{len(delta)} new events but no positive interactions. Nothing to do.")
+            return
+        confidence = (train * self.params.alpha).tocsr()
+
+        params = dataclasses.replace(self.params, iters=self.params.inc_iters)
+        trainer = NativeALSTrainer(params)
+        print(f"Incremental ALS from {prev_path}: {len(delta)} new events, users={len(users)}, "
+              f"interactions={train.nnz}, iters={params.iters}, prox={params.prox}")
+        # older models without warm-start state: a flat pull towards the previous factors
+        precision = state.get("item_precision")
+        prox = params.prox * precision if precision is not None else params.prox
+        candidate = trainer.fit(confidence, item_factors=prev_factors, prox=prox, gram=state.get("user_gram"))
+
+        # held-out recall only gates publishing ...
+        k = params.eval_k
+        before = heldout_recall(confidence, held, prev_factors, params, k=k, seed=params.seed)
+        after = heldout_recall(confidence, held, candidate, params, k=k, seed=params.seed)
+        if before is not None:
+            print(f"held-out recall@{k}: previous={before:.4f} new={after:.4f} "
+                  f"({int((held >= 0).sum())} users)")
+            if after < before - params.tolerance:
+                print("Held-out recall regressed; keeping the active model.")
+                return
+        else:
+            print("No users with a held-out positive; publishing without comparison.")
+
+        # ... the published model is refit the same way on everything, held-out events included:
+        # last_ts moves past them, so a later incremental run would never see them again
+        full, full_users = ds.to_implicit_csr(
+            self.id_map,
+            like_threshold=self.params.like_threshold,
+            tried_bonus=self.params.tried_bonus,
+        )
+        confidence = (full * self.params.alpha).tocsr()
+        print(f"Refitting on all {full.nnz} interactions of {len(full_users)} users")
+        item_factors = trainer.fit(confidence, item_factors=prev_factors, prox=prox, gram=state.get("user_gram"))
+        stats = factor_stats(confidence, trainer.user_factors)
+        if precision is not None:
+            stats["item_precision"] = np.maximum(precision, stats["item_precision"])
+        if "user_gram" in state:
+            stats["user_gram"] = state["user_gram"]  # population Gram carried forward
+
+        outdir = self.artifacts.save(
+            item_factors=item_factors,
+            id_map=self.id_map,
+            params=params,
+            n_users=len(full_users),
+            interactions=int(full.nnz),
+            version_tag=self.params.tag,
+            algo=trainer.algo,
+            extra_meta={"mode": "incremental", "base": prev_path.as_posix(), "last_ts": last_ts,
+                        "delta_events": len(delta), f"heldout_recall@{k}": after,
+                        f"base_heldout_recall@{k}": before},
+            arrays=stats,
+        )
+        print(f"Saved ALS artifacts → {outdir}")
+        print(f"Updated active pointer → {self.artifacts.root / 'active.json'}")
+
 
 # --------------------------- CLI ---------------------------
 
 def parse_args() -> Tuple[Path, ALSParams]:
-    ap = argparse.ArgumentParser(description="Train ALS item factors from storage/ratings.jsonl")
+    ap = argparse.ArgumentParser(description="Train ALS item factors from the configured rating store")
     ap.add_argument("--config", default="config/app.json", help="Path to config/app.json")
     ap.add_argument("--rank", type=int, default=64, help="ALS rank (factors)")
     ap.add_argument("--reg", type=float, default=0.05, help="ALS regularization")
@@ -351,6 +813,17 @@ def parse_args() -> Tuple[Path, ALSParams]:
     ap.add_argument("--min-interactions", type=int, default=200, help="Minimum positive interactions to train")
     ap.add_argument("--like-threshold", type=float, default=3.0, help="Ratings above this count as positive signal")
     ap.add_argument("--tried-bonus", type=float, default=0.10, help="Bonus weight if tried=True")
+    ap.add_argument("--backend", choices=["auto", "implicit", "native"], default="auto",
+                    help="ALS solver: implicit library, built-in NumPy/SciPy CG, or implicit if installed")
+    ap.add_argument("--cg-steps", type=int, default=3, help="CG steps per least-squares solve (native)")
+    ap.add_argument("--threads", type=int, default=0, help="Worker threads for the native backend (0 = all cores)")
+    ap.add_argument("--seed", type=int, default=0, help="Factor initialisation seed (native)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Warm-start from the active model on ratings newer than its last_ts (native solver)")
+    ap.add_argument("--inc-iters", type=int, default=3, help="Iterations of an incremental run")
+    ap.add_argument("--prox", type=float, default=1.0, help="Pull towards the previous item factors (incremental)")
+    ap.add_argument("--tolerance", type=float, default=0.0,
+                    help="Allowed held-out recall drop before an incremental model is rejected")
     ap.add_argument("--tag", default=None, help="Version tag for models/als/<tag>")
     args = ap.parse_args()
 
@@ -363,17 +836,25 @@ def parse_args() -> Tuple[Path, ALSParams]:
         min_interactions=args.min_interactions,
         like_threshold=args.like_threshold,
         tried_bonus=args.tried_bonus,
+        backend=args.backend,
+        cg_steps=args.cg_steps,
+        threads=args.threads,
+        seed=args.seed,
+        incremental=args.incremental,
+        inc_iters=args.inc_iters,
+        prox=args.prox,
+        tolerance=args.tolerance,
         tag=args.tag,
     )
     return Path(args.config), params
 
 
 def main():
-    if AlternatingLeastSquares is None:
-        print("Error: 'implicit' library not available. Install with: pip install implicit numpy scipy")
-        sys.exit(1)
-
     cfg_path, params = parse_args()
+    if params.backend == "implicit" and AlternatingLeastSquares is None:
+        print("Error: 'implicit' library not available. Install with: pip install implicit, "
+              "or use --backend native")
+        sys.exit(1)
     pipeline = ALSPipeline(cfg_path, params)
     pipeline.run()
 
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# backend.* imports resolve from the repo root; the pipeline scripts import each other by module name
+for p in (ROOT, ROOT / "scripts"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+
+@pytest.fixture
+def scratch_ratings(tmp_path, monkeypatch):
+    """Route the live registry's ratings and profile cache to scratch state for one test."""
+    from backend.api import routes
+    from backend.services import profile_service, ratings_service
+    from backend.services.profile_service import ProfileCache
+    from backend.services.ratings_service import JsonlRatingsStore
+
+    reg = routes.LIVE.current
+    key = (reg.ratings_backend, str(reg.ratings_path), str(reg.ratings_dir), reg.ratings_shards, str(reg.sqlite_path))
+    monkeypatch.setitem(ratings_service._STORES, key, JsonlRatingsStore(tmp_path / "ratings.jsonl"))
+    monkeypatch.setattr(reg, "profile_path", tmp_path / "profiles.json")
+    cache = ProfileCache(reg, flush_delay=60)
+    monkeypatch.setattr(profile_service, "_CACHE", cache)
+    yield reg
+    with cache.lock:  # nothing of this test reaches the real profile store
+        cache.dirty.clear(); cache.evicted.clear()
+    cache._closed = True
+    cache._wake.set()
@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.api import routes
+from backend.main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv(routes.ADMIN_TOKEN_ENV, raising=False)
+    return TestClient(app)  # requests come from host "testclient", i.e. not local
+
+
+def test_admin_is_local_only_without_token(client, monkeypatch):
+    assert client.post("/admin/reload").status_code == 403
+    assert client.get("/admin/status").status_code == 403
+    local = TestClient(app, client=("127.0.0.1", 50000))
+    assert local.get("/admin/status").status_code == 200
+
+
+def test_admin_token(client, monkeypatch):
+    monkeypatch.setenv(routes.ADMIN_TOKEN_ENV, "s3cret")
+    assert client.get("/admin/status").status_code == 403
+    assert client.get("/admin/status", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    r = client.get("/admin/status", headers={"X-Admin-Token": "s3cret"})
+    assert r.status_code == 200 and "version" in r.json()
+
+
+def test_reload_watch_is_off_by_default():
+    assert routes.LIVE.current.cfg["reload"]["watch"] is False
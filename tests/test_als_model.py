@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.loaders.als_model import AlsModel
+from backend.services.profile_service import _UserTaste
+
+
+def _model(tmp_path, n=4, rank=3):
+    rng = np.random.default_rng(0)
+    factors = rng.normal(size=(n, rank)).astype(np.float32)
+    ids = [f"d{i}" for i in range(n)]
+    np.save(tmp_path / "item_factors.npy", factors)
+    np.save(tmp_path / "item_norms.npy", np.linalg.norm(factors, axis=1).astype(np.float32))
+    (tmp_path / "item_id_map.json").write_text(json.dumps({d: i for i, d in enumerate(ids)}))
+    (tmp_path / "meta.json").write_text(json.dumps({"alpha": 40.0, "reg": 0.05, "like_threshold": 3.0,
+                                                    "tried_bonus": 0.1, "trained_at_utc": "t"}))
+    return AlsModel(tmp_path, ids), ids
+
+
+def _reg(ids, dim=2):
+    return SimpleNamespace(index_by_id={d: i for i, d in enumerate(ids)},
+                           vectors=np.ones((len(ids), dim), dtype=np.float32))
+
+
+def test_repeated_ratings_use_latest_per_drink(tmp_path):
+    model, ids = _model(tmp_path)
+    reg = _reg(ids)
+    e = _UserTaste(2)
+    for evt in ({"drink_id": "d0", "rating": 5, "ts": 10},
+                {"drink_id": "d0", "rating": 4, "ts": 20},
+                {"drink_id": "d1", "rating": 5, "ts": 30},
+                {"drink_id": "d1", "rating": 1, "ts": 40},
+                {"drink_id": "d2", "rating": 2, "ts": 60},
+                {"drink_id": "d2", "rating": 5, "ts": 50}):  # arrived later but older: ignored
+        e.add(reg, evt)
+
+    conf = model.confidences(e.als_events())
+    assert conf == {0: 40.0 * 0.5}  # one 4-star on d0, not 5+4 summed; d1/d2 latest are dislikes
+
+    single = _UserTaste(2)
+    single.add(reg, {"drink_id": "d0", "rating": 4, "ts": 20})
+    np.testing.assert_allclose(model.user_factor(e.als_events()), model.user_factor(single.als_events()))
+
+
+def test_equal_ts_goes_to_later_event(tmp_path):
+    model, ids = _model(tmp_path)
+    e = _UserTaste(2)
+    e.add(_reg(ids), {"drink_id": "d3", "rating": 5, "ts": 7})
+    e.add(_reg(ids), {"drink_id": "d3", "rating": 4, "tried": True, "ts": 7})
+    assert e.als_events() == [(3, 4.0, True)]
+    assert model.confidences(e.als_events()) == {3: 40.0 * (0.5 + 0.1)}
+
+
+def test_scores_are_float32_cosines_without_upcasting(tmp_path):
+    import tracemalloc
+    model, _ = _model(tmp_path, n=20000, rank=16)
+    X = np.random.default_rng(3).normal(size=(3, 16))
+    X[2] = 0.0
+    F = np.asarray(model.factors, dtype=np.float64)
+    ref = (F @ X.T) / np.linalg.norm(F, axis=1)[:, None] / np.maximum(np.linalg.norm(X, axis=1), 1e-8)
+    tracemalloc.start()
+    S = model.scores(X)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert S.dtype == np.float32 and S.shape == (20000, 3)
+    np.testing.assert_allclose(S, ref, rtol=0, atol=1e-5)
+    assert not S[:, 2].any()
+    np.testing.assert_allclose(model.scores(X[0]), S[:, 0], rtol=0, atol=1e-6)
+    assert peak < F.nbytes // 2  # a float64 copy of the factors would be F.nbytes
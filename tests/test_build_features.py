@@ -0,0 +1,137 @@
+import copy
+import json
+import math
+
+import numpy as np
+import pytest
+
+import build_features as bf
+from conftest import ROOT
+
+
+def _records():
+    catalog = json.loads((ROOT / "data" / "curated" / "drinks_catalog.json").read_text(encoding="utf-8"))
+    records = copy.deepcopy(catalog[::12])
+    # edge cases: unknown / missing spirit, no features at all, repeated and mixed-case entries
+    records[0]["primary_spirit"] = "Not-A-Spirit"
+    records[1].pop("primary_spirit", None)
+    records[2].update(ingredients=[], brands=[], tags=[], season=[], taste_profile={})
+    records[3]["ingredients"] = records[3]["ingredients"] * 2 + ["LIME Juice"]
+    records[4]["tags"] = [t.upper() for t in records[4].get("tags") or []] + ["no-such-tag"]
+    return records
+
+
+# ---- the per-row list builder that build_vectors replaced, kept as the reference ----
+
+def _ref_vectors(records):
+    records = sorted(records, key=lambda r: r.get("id") or "")
+    spirit_vocab, tag_vocab, season_vocab = bf.build_vocabs(records)
+
+    def one_hot(spirit, vocab):
+        v = [0.0] * len(vocab)
+        spirit = (spirit or "unknown").lower()
+        if spirit in vocab: v[vocab.index(spirit)] = 1.0
+        elif "unknown" in vocab: v[vocab.index("unknown")] = 1.0
+        return v
+
+    def multi_hot(items, vocab):
+        v = [0.0] * len(vocab)
+        for it in items or []:
+            if it.lower() in vocab: v[vocab.index(it.lower())] = 1.0
+        return v
+
+    def hashed(tokens, dim, salt):
+        v = [0.0] * dim
+        for tok in tokens: v[bf.hash_index(tok, dim, salt=salt)] = 1.0
+        return v
+
+    out = []
+    for r in records:
+        blocks = [
+            (one_hot(r.get("primary_spirit"), spirit_vocab), bf.WEIGHTS["spirit"]),
+            (multi_hot(r.get("tags"), tag_vocab), bf.WEIGHTS["tags"]),
+            (multi_hot(r.get("season"), season_vocab), bf.WEIGHTS["season"]),
+            ([float((r.get("taste_profile") or {}).get(k, 0.0)) for k in bf.TASTE_KEYS], bf.WEIGHTS["taste"]),
+            (hashed(bf.ingredient_tokens(r.get("ingredients") or []), bf.ING_HASH_DIM, "ingredients"),
+             bf.WEIGHTS["ingredients"]),
+            (hashed(bf.brand_tokens(r.get("brands") or []), bf.BRAND_HASH_DIM, "brands"), bf.WEIGHTS["brands"]),
+        ]
+        vec = [x * w for blk, w in blocks for x in blk]
+        s = math.sqrt(sum(x * x for x in vec))
+        out.append([x / s for x in vec] if s else vec)
+    return out
+
+
+def test_vectors_match_row_loop():
+    records = _records()
+    ref = _ref_vectors(records)
+    vectors, id_map, _ = bf.build_vectors(records)
+    dense = vectors.toarray()
+    assert dense.shape == (len(ref), id_map["dim"])
+    assert dense.tolist() == ref  # bit-identical, norms included
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_dumps_match_json_and_numpy(tmp_path, pretty):
+    records = _records()
+    ref = _ref_vectors(records)
+    vectors, _, _ = bf.build_vectors(records)
+
+    bf.save_vectors_json(vectors, tmp_path / "v.json", pretty=pretty)
+    expected = json.dumps(ref, ensure_ascii=False, indent=2 if pretty else None)
+    assert (tmp_path / "v.json").read_text(encoding="utf-8") == expected
+
+    bf.save_vectors_npy(vectors, tmp_path / "v.npy")
+    np.testing.assert_array_equal(np.load(tmp_path / "v.npy"), np.asarray(ref, dtype=np.float32))
+
+    csr = bf.save_vectors_csr(vectors, tmp_path / "v.npz")
+    np.testing.assert_array_equal(csr.toarray(), np.asarray(ref, dtype=np.float32))
+    assert not np.any(csr.data == 0)
+
+
+def test_empty_dump(tmp_path):
+    vectors, _, _ = bf.build_vectors([])
+    bf.save_vectors_json(vectors, tmp_path / "v.json")
+    assert json.loads((tmp_path / "v.json").read_text()) == []
+
+
+def _build(catalog, outdir, *extra):
+    import subprocess, sys
+    return subprocess.run([sys.executable, str(ROOT / "scripts" / "build_features.py"), "--in", str(catalog),
+                           "--outdir", str(outdir), "--neighbors-k", "10", *extra],
+                          check=True, capture_output=True, text=True).stdout
+
+
+def _artifacts(outdir):
+    out = {}
+    for p in sorted(outdir.iterdir()):
+        if p.suffix == ".npz":
+            with np.load(p) as z:
+                out[p.name] = {k: z[k].tolist() for k in sorted(z.files)}
+        else:
+            out[p.name] = p.read_bytes()
+    return out
+
+
+def test_incremental_build_equals_full(tmp_path):
+    catalog = json.loads((ROOT / "data" / "curated" / "drinks_catalog.json").read_text(encoding="utf-8"))
+    old = copy.deepcopy(catalog[::6])
+    (tmp_path / "old.json").write_text(json.dumps(old), encoding="utf-8")
+    _build(tmp_path / "old.json", tmp_path / "inc")
+
+    new = copy.deepcopy(old)
+    del new[7], new[40]
+    new[3]["ingredients"] = new[3]["ingredients"][1:] + ["grenadine"]   # vector + search change
+    new[10]["name"] = "Zzyzx Sunrise"                                    # search-only change
+    new[11]["taste_profile"] = {**(new[11].get("taste_profile") or {}), "sour": 0.9}
+    added = copy.deepcopy(catalog[1])
+    added.update(id="99999", name="Quuxberry Fizz")                      # new record, new token
+    new.insert(20, added)
+    (tmp_path / "new.json").write_text(json.dumps(new), encoding="utf-8")
+
+    assert "Incremental build" in _build(tmp_path / "new.json", tmp_path / "inc")
+    assert "Full build" in _build(tmp_path / "new.json", tmp_path / "full", "--full")
+    inc, full = _artifacts(tmp_path / "inc"), _artifacts(tmp_path / "full")
+    assert inc.keys() == full.keys()
+    for name in full:
+        assert inc[name] == full[name], name
@@ -0,0 +1,76 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT
+from record_io import iter_records
+
+SCRIPTS = ROOT / "scripts"
+SNAPSHOT = ROOT / "data" / "raw" / "cocktails_20250815.json"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _counts(stdout):
+    """(requests fetched, requests served from cache) from the collector's summary line."""
+    m = re.search(r"\(([\d,]+) requests fetched, ([\d,]+) from cache\)", stdout)
+    return tuple(int(g.replace(",", "")) for g in m.groups())
+
+
+def _collect(base_url, out, cache_dir):
+    env = {**os.environ, "NO_PROXY": "127.0.0.1", "no_proxy": "127.0.0.1"}
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS / "collect_cocktails.py"), "--base-url", base_url, "--rate", "0",
+         "--retries", "1", "--timeout", "5", "--cache-dir", str(cache_dir), "--out-json", str(out),
+         "--max-ingredients", "5"],
+        check=True, capture_output=True, text=True, env=env, timeout=120).stdout
+
+
+@pytest.fixture
+def stub(tmp_path):
+    records = list(iter_records(SNAPSHOT))
+    snap = tmp_path / "snapshot.json"
+    snap.write_text(json.dumps(records[::10]), encoding="utf-8")
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, str(SCRIPTS / "stub_cocktaildb.py"), "--snapshot", str(snap),
+                             "--port", str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                pytest.fail("stub_cocktaildb.py did not start")
+            time.sleep(0.05)
+    yield proc, f"http://127.0.0.1:{port}/api/json/v1/1"
+    proc.kill()
+    proc.wait()
+
+
+def test_second_run_replays_from_cache(stub, tmp_path):
+    proc, base_url = stub
+    cache = tmp_path / "http_cache"
+    first = _collect(base_url, tmp_path / "first.json", cache)
+    fetched, cached = _counts(first)
+    assert fetched > 0 and cached == 0
+
+    proc.kill()   # from here on any network request would fail
+    proc.wait()
+    second = _collect(base_url, tmp_path / "second.json", cache)
+    fetched, cached = _counts(second)
+    assert fetched == 0 and cached > 0
+    a = json.loads((tmp_path / "first.json").read_text(encoding="utf-8"))
+    b = json.loads((tmp_path / "second.json").read_text(encoding="utf-8"))
+    assert a == b and len(a) > 0
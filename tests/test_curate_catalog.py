@@ -0,0 +1,22 @@
+import random
+
+import bench_curate
+import curate_catalog as cc
+from record_io import iter_records
+
+
+def _records(n=600):
+    raw = list(iter_records(cc.latest_raw_path()))
+    return raw[:200] + bench_curate.synthetic(raw, n, random.Random(7))
+
+
+def test_compiled_matchers_match_naive():
+    records = _records()
+    assert cc.curate_chunk(records) == bench_curate.run_naive(records)
+
+
+def test_parallel_equals_serial():
+    records = _records()
+    serial = list(cc.curate_stream(records, workers=1))
+    assert len(serial) == len(records)
+    assert list(cc.curate_stream(iter(records), workers=4, chunk_size=37)) == serial
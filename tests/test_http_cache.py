@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.api import routes
+from backend.main import app
+from backend.services import result_cache
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/facets", "/drinks?spirit=gin", "/drinks/{id}", "/similar/{id}?k=5",
+                                  "/search?q=lime&rank=bm25"])
+def test_if_none_match_gets_304(client, path):
+    path = path.format(id=routes.LIVE.current.ids[0])
+    r = client.get(path)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    for inm in (etag, f"W/{etag}", f'"nope", {etag}', "*"):
+        r2 = client.get(path, headers={"If-None-Match": inm})
+        assert r2.status_code == 304 and r2.content == b"" and r2.headers["etag"] == etag
+    assert client.get(path, headers={"If-None-Match": '"nope"'}).status_code == 200
+
+
+def test_version_bump_changes_etag(client, monkeypatch):
+    reg = routes.LIVE.current
+    path = f"/drinks/{reg.ids[0]}"
+    etag = client.get(path).headers["etag"]
+    assert client.get(path).headers["etag"] == etag  # stable while nothing changes
+    monkeypatch.setattr(reg, "version", reg.version + "-next")
+    r = client.get(path, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_new_rating_changes_recs_cache_key(client, scratch_ratings, monkeypatch):
+    reg = scratch_ratings
+    recs = result_cache.cache_for(reg, "recs")
+    keys = []
+    put = recs.put
+    monkeypatch.setattr(recs, "put", lambda key, value, tag=None: (keys.append(key), put(key, value, tag))[1])
+    body = {"user_id": "cache-key-test", "k": 10}
+
+    def rate(drink):
+        r = client.post("/ratings", json={"user_id": "cache-key-test", "drink_id": drink, "rating": 5})
+        assert r.status_code == 200
+
+    rate(reg.ids[0])
+    first = client.post("/recs", json=body).json()["items"]
+    assert client.post("/recs", json=body).json()["items"] == first and len(keys) == 1  # second call is a hit
+
+    rate(reg.ids[1])
+    second = client.post("/recs", json=body).json()["items"]
+    assert len(keys) == 2 and keys[1] != keys[0]
+    assert keys[0][:2] == keys[1][:2]                        # same build and query ...
+    assert keys[0][2][0] == keys[1][2][0] == "cache-key-test"
+    assert keys[1][2][1] != keys[0][2][1]                    # ... new user version
+    assert second != first
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from backend.services import metrics
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    metrics.reset()
+    yield
+    metrics.configure({})
+    metrics.reset()
+
+
+def test_disabled_by_default():
+    cfg = json.loads((ROOT / "config/app.json").read_text())
+    metrics.configure(cfg)
+    assert not metrics.enabled()
+
+
+def test_disabled_is_a_no_op(tmp_path):
+    metrics.configure({"metrics": {"enabled": False, "server_timing": True, "profile_every": 1,
+                                   "profile_dir": str(tmp_path)}})
+    assert metrics.span("recs.score") is metrics.span("search.match")  # shared no-op context
+    with metrics.span("recs.score"):
+        pass
+    assert metrics.begin_request() is None
+    assert metrics.end_request(None, "GET", "/recs", 200, 0.01) is None
+    assert metrics.profiled(lambda: 1)() == 1 and not any(tmp_path.iterdir())
+    assert "stage=" not in metrics.render()
+
+
+def test_enabled_records_stages_and_server_timing():
+    metrics.configure({"metrics": {"enabled": True, "server_timing": True}})
+    token = metrics.begin_request()
+    with metrics.span("recs.score"):
+        pass
+    timing = metrics.end_request(token, "GET", "/recs", 200, 0.002)
+    assert timing.startswith("recs.score;dur=") and timing.endswith("total;dur=2.000")
+    text = metrics.render()
+    assert 'cocktail_stage_seconds_count{stage="recs.score"} 1' in text
+    assert 'cocktail_http_request_seconds_count{method="GET",route="/recs",status="200"} 1' in text
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from build_features import build_neighbors, neighbor_block, update_neighbors
+from backend.services.similarity import cosine_all, topk
+
+
+def _csr(n=300, d=48, seed=0):
+    rng = np.random.default_rng(seed)
+    V = (rng.random((n, d)) < 0.08) * rng.integers(1, 4, (n, d)).astype(np.float64)
+    V[:, 0] += 1.0
+    V[n - 10:] = V[:10]  # duplicates → tied scores
+    V /= np.linalg.norm(V, axis=1, keepdims=True)
+    return sp.csr_matrix(V.astype(np.float32))
+
+
+def _reference(csr, k):
+    """The API's live path, one row at a time."""
+    dense = csr.toarray()
+    return np.stack([topk(cosine_all(csr, dense[i]), k, exclude_idx=i)[0] for i in range(csr.shape[0])])
+
+
+@pytest.mark.parametrize("mem_bytes", [256 << 20, 1])
+def test_matches_live_scoring(mem_bytes):
+    csr = _csr()
+    idx, score = build_neighbors(csr, k=20, mem_bytes=mem_bytes)
+    np.testing.assert_array_equal(idx, _reference(csr, 20))
+    assert idx.dtype == np.int32 and score.dtype == np.float16
+    assert np.all(np.diff(score.astype(np.float32), axis=1) <= 0)
+
+
+def test_block_size_is_bounded_by_memory():
+    assert neighbor_block(1000) == 1024
+    assert neighbor_block(1_000_000) * 1_000_000 * 32 <= 256 << 20
+
+
+def test_subset_of_rows():
+    csr = _csr()
+    full, _ = build_neighbors(csr, k=10)
+    rows = np.array([5, 0, 299, 42])
+    part, _ = build_neighbors(csr, k=10, rows=rows)
+    np.testing.assert_array_equal(part, full[rows])
+
+
+def test_incremental_update_equals_rebuild():
+    old = _csr(seed=1)
+    prev_idx, prev_score = build_neighbors(old, k=15)
+
+    # new catalog: drop rows 3 and 100, change row 7, add two rows (one a copy of row 20), reorder
+    new_rows = [r for r in range(old.shape[0]) if r not in (3, 100)]
+    dense = old.toarray()[new_rows]
+    changed = dense[7].copy(); changed[5] += 2.0; dense[7] = changed / np.linalg.norm(changed)
+    extra = _csr(n=2, seed=9).toarray()
+    extra[0] = old.toarray()[20]
+    new = sp.csr_matrix(np.vstack([extra[:1], dense, extra[1:]]).astype(np.float32))
+    old_row = np.array([-1] + [r if i != 7 else -1 for i, r in enumerate(new_rows)] + [-1])
+
+    idx, score, redone = update_neighbors(new, 15, prev_idx, prev_score, old_row)
+    full_idx, full_score = build_neighbors(new, k=15)
+    np.testing.assert_array_equal(idx, full_idx)
+    np.testing.assert_array_equal(score, full_score)
+    assert 3 <= redone < new.shape[0]
+
+
+def test_similar_rejects_non_positive_k():
+    from fastapi.testclient import TestClient
+    from backend.api import routes
+    from backend.main import app
+    from backend.services import recommender_service
+
+    reg = routes.LIVE.current
+    drink = reg.ids[0]
+    for k in (0, -3):
+        assert recommender_service.similar(reg, drink, k=k) == []
+    assert len(recommender_service.similar(reg, drink, k=5)) == 5
+    client = TestClient(app)
+    assert client.get(f"/similar/{drink}", params={"k": -3}).status_code == 422
+    assert client.get(f"/similar/{drink}", params={"k": 0}).status_code == 422
+    assert len(client.get(f"/similar/{drink}", params={"k": 3}).json()["items"]) == 3
@@ -0,0 +1,94 @@
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.services import profile_service, ratings_service
+from backend.services.profile_service import ProfileCache, load_profiles
+
+
+@pytest.fixture
+def reg(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratings_service, "_STORES", {})
+    ids = [f"d{i}" for i in range(8)]
+    return SimpleNamespace(
+        dim=8, ids=ids, index_by_id={d: i for i, d in enumerate(ids)}, vectors=np.eye(8, dtype=np.float32),
+        ratings_backend="jsonl", ratings_path=tmp_path / "ratings.jsonl", ratings_dir=tmp_path / "ratings",
+        ratings_shards=4, sqlite_path=tmp_path / "app.db", profile_path=tmp_path / "profiles.json",
+        now_iso=lambda: datetime.now(timezone.utc).isoformat(), build_id="b", generation=0)
+
+
+@pytest.fixture
+def cache(reg):
+    c = ProfileCache(reg, flush_delay=60, max_users=1)
+    yield c
+    c._closed = True
+    c._wake.set()
+
+
+def _rate(reg, user, drink, rating=5):
+    return ratings_service.append_rating(reg, user, drink, rating)
+
+
+def test_jsonl_events_since_reads_only_new_lines(reg):
+    _rate(reg, "a", "d0"); _rate(reg, "b", "d1"); _rate(reg, "a", "d2")
+    events, cur = ratings_service.user_ratings_since(reg, "a")
+    assert [e["drink_id"] for e in events] == ["d0", "d2"]
+    assert ratings_service.user_ratings_since(reg, "a", cur) == ([], cur)
+    _rate(reg, "a", "d3")
+    events, _ = ratings_service.user_ratings_since(reg, "a", cur)
+    assert [e["drink_id"] for e in events] == ["d3"]
+
+
+def test_eviction_keeps_current_user_and_flushes_dirty(reg, cache):
+    cache.add_rating(_rate(reg, "a", "d0"))
+    assert "a" in cache.dirty
+    e = cache.add_rating(_rate(reg, "b", "d1"))  # over capacity: "a" goes, "b" (the one just created) stays
+    assert list(cache.users) == ["b"] and cache.users["b"] is e and e.taste is not None
+    saved = load_profiles(reg.profile_path)
+    assert saved["a"]["ratings_count"] == 1 and saved["a"]["has_taste"]
+
+
+def test_store_reads_do_not_hold_the_cache_lock(reg, cache, monkeypatch):
+    cache.max_users = 10
+    entered, release = threading.Event(), threading.Event()
+    real = ratings_service.user_ratings_since
+
+    def slow(reg_, user_id, cursor=None):
+        if user_id == "slow":
+            entered.set()
+            release.wait(5)
+        return real(reg_, user_id, cursor)
+
+    monkeypatch.setattr(profile_service.ratings_service, "user_ratings_since", slow)
+    _rate(reg, "fast", "d0")
+    t = threading.Thread(target=cache.get, args=("slow",))
+    t.start()
+    assert entered.wait(5)
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (cache.get("fast"), done.set())).start()
+        assert done.wait(2), "a slow store read for one user blocked another user's request"
+    finally:
+        release.set()
+        t.join(5)
+    assert cache.users["fast"].count == 1
+
+
+def test_reads_do_not_write_profiles(reg, cache):
+    cache.max_users = 10
+    _rate(reg, "rated", "d0")
+    for uid in ("nobody_x", "rated"):  # unseen user; user whose history is loaded on first access
+        e = cache.get(uid)
+        assert uid not in cache.dirty and e.updated_at is None
+    assert cache.users["rated"].taste is not None
+    cache.flush()
+    assert not reg.profile_path.exists()
+
+    _rate(reg, "rated", "d1")  # written by another worker: a real change, persisted
+    cache.get("rated")
+    cache.flush()
+    assert set(load_profiles(reg.profile_path)) == {"rated"}
+    assert load_profiles(reg.profile_path)["rated"]["ratings_count"] == 2
@@ -0,0 +1,144 @@
+import json
+import multiprocessing as mp
+import random
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.services import ratings_service
+from backend.services.profile_service import ProfileCache
+from backend.services.ratings_service import JsonlRatingsStore, ShardedRatingsStore
+
+
+def _evt(user, i):
+    return {"user_id": user, "drink_id": f"d{i}", "rating": 4.0, "tried": False, "ts": i}
+
+
+def _writer(root, user, n):
+    store = ShardedRatingsStore(root, shards=2)
+    other = ShardedRatingsStore(root, shards=2)
+    for i in range(n):
+        store.append(_evt(user, i))
+        other.events_since(user)  # a second instance indexing while writers are mid-append
+
+
+def test_concurrent_writers_index_each_event_once(tmp_path):
+    users = [f"u{i}" for i in range(4)]
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(tmp_path, u, 40)) for u in users]
+    for p in procs: p.start()
+    for p in procs: p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+
+    store = ShardedRatingsStore(tmp_path, shards=2)
+    for u in users:
+        events = store.user_events(u)
+        assert [e["drink_id"] for e in events] == [f"d{i}" for i in range(40)]
+    assert sum(1 for _ in store.iter_events()) == 160
+
+
+def test_unindexed_tail_is_indexed_once(tmp_path):
+    a = ShardedRatingsStore(tmp_path, shards=1)
+    a.append(_evt("u", 0))
+    with a.shard_path(0).open("ab") as f:  # crash between the shard and sidecar writes
+        f.write((json.dumps(_evt("u", 1)) + "\n").encode("utf-8"))
+    b = ShardedRatingsStore(tmp_path, shards=1)
+    assert len(b.user_events("u")) == 2
+    a.append(_evt("u", 2))
+    for store in (a, b, ShardedRatingsStore(tmp_path, shards=1)):
+        assert [e["drink_id"] for e in store.user_events("u")] == ["d0", "d1", "d2"]
+
+
+def test_duplicate_sidecar_entries_are_ignored(tmp_path):
+    a = ShardedRatingsStore(tmp_path, shards=1)
+    a.append(_evt("u", 0))
+    idx = a.index_path(0)
+    idx.write_bytes(idx.read_bytes() * 2)
+    assert len(ShardedRatingsStore(tmp_path, shards=1).user_events("u")) == 1
+
+
+def _reg(tmp_path, backend):
+    return SimpleNamespace(ratings_backend=backend, ratings_path=tmp_path / "ratings.jsonl",
+                           ratings_dir=tmp_path / "ratings", ratings_shards=4, sqlite_path=tmp_path / "app.db")
+
+
+@pytest.mark.parametrize("backend", ["sharded", "sqlite"])
+def test_unmigrated_legacy_ratings_fail_loudly(tmp_path, backend, monkeypatch):
+    monkeypatch.setattr(ratings_service, "_STORES", {})
+    JsonlRatingsStore(tmp_path / "ratings.jsonl").append(_evt("u", 0))
+    with pytest.raises(RuntimeError, match="migrate-ratings"):
+        ratings_service.store_for(_reg(tmp_path, backend))
+
+    # once migrated the legacy file may stay behind
+    target = ShardedRatingsStore(tmp_path / "ratings", 4) if backend == "sharded" else \
+        ratings_service.SqliteRatingsStore(ratings_service.db_for(tmp_path / "app.db"))
+    ratings_service.migrate_jsonl(tmp_path / "ratings.jsonl", target)
+    assert len(ratings_service.store_for(_reg(tmp_path, backend)).user_events("u")) == 1
+
+
+def test_migrate_script_refuses_second_copy(tmp_path, monkeypatch):
+    import migrate_ratings
+    monkeypatch.chdir(tmp_path)
+    JsonlRatingsStore(tmp_path / "ratings.jsonl").append(_evt("u", 0))
+    (tmp_path / "app.json").write_text(json.dumps({"paths": {"ratings": "ratings.jsonl"},
+                                                   "storage": {"backend": "jsonl", "sqlite_path": "app.db"}}))
+    argv = ["migrate_ratings.py", "--config", "app.json"]
+
+    monkeypatch.setattr("sys.argv", argv)
+    with pytest.raises(SystemExit):  # default backend is jsonl: nothing to migrate into
+        migrate_ratings.main()
+
+    monkeypatch.setattr("sys.argv", argv + ["--to", "sqlite"])
+    migrate_ratings.main()
+    with pytest.raises(SystemExit):
+        migrate_ratings.main()
+    db = ratings_service.SqliteRatingsStore(ratings_service.db_for(tmp_path / "app.db"))
+    assert len(db.user_events("u")) == 1
+
+
+def test_migration_round_trip_across_backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratings_service, "_STORES", {})
+    rng = random.Random(5)
+    users = [f"u{i}" for i in range(6)]
+    legacy = JsonlRatingsStore(tmp_path / "ratings.jsonl")
+    for ts in range(1, 200):  # interleaved users, re-rated drinks, tried flags, half ratings
+        legacy.append({"user_id": rng.choice(users), "drink_id": f"d{rng.randrange(12)}",
+                       "rating": rng.choice([1.0, 2.5, 3.0, 4.0, 5.0]), "tried": rng.random() < 0.3, "ts": ts})
+    ratings_service.migrate_jsonl(tmp_path / "ratings.jsonl", ShardedRatingsStore(tmp_path / "ratings", 4))
+    ratings_service.migrate_jsonl(tmp_path / "ratings.jsonl",
+                                  ratings_service.SqliteRatingsStore(ratings_service.db_for(tmp_path / "app.db")))
+
+    ids = [f"d{i}" for i in range(12)]
+    vectors = np.random.default_rng(0).random((12, 8)).astype(np.float32)
+
+    def reg(backend):
+        r = _reg(tmp_path, backend)
+        r.__dict__.update(dim=8, ids=ids, index_by_id={d: i for i, d in enumerate(ids)}, vectors=vectors,
+                          profile_path=tmp_path / f"profiles_{backend}.json", build_id="b", generation=0,
+                          now_iso=lambda: datetime.now(timezone.utc).isoformat())
+        return r
+
+    regs = {b: reg(b) for b in ("jsonl", "sharded", "sqlite")}
+    caches = {b: ProfileCache(r, flush_delay=60) for b, r in regs.items()}
+    try:
+        for u in users:
+            streams = {b: ratings_service.user_ratings_since(r, u)[0] for b, r in regs.items()}
+            assert streams["jsonl"] and streams["sharded"] == streams["jsonl"] == streams["sqlite"]
+            entries = {b: c.get(u) for b, c in caches.items()}
+            ref = entries["jsonl"]
+            for e in entries.values():
+                assert e.count == ref.count
+                np.testing.assert_array_equal(e.taste, ref.taste)
+
+        # after the migration every backend continues the stream from its own cursor
+        cursors = {b: ratings_service.user_ratings_since(r, "u0")[1] for b, r in regs.items()}
+        for b, r in regs.items():
+            ratings_service.append_rating(r, "u0", "d3", 5, ts=1000)
+            events, _ = ratings_service.user_ratings_since(r, "u0", cursors[b])
+            assert [(e["drink_id"], e["ts"]) for e in events] == [("d3", 1000)]
+    finally:
+        for c in caches.values():
+            c._closed = True
+            c._wake.set()
@@ -0,0 +1,77 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import recommender_service as rs
+
+
+def _greedy_reference(reg, ids, scores, penalty, k, key):
+    """The loop diversify replaced: re-score and re-sort the whole remaining pool per pick."""
+    k = k or len(ids)
+    chosen, counts, rem = [], {}, list(ids)
+    attr = {i: rs._attr_of(reg, i, key) for i in ids}
+    while rem and len(chosen) < k:
+        adjusted = [(i, float(scores.get(i, 0.0)) - penalty * counts.get(attr[i], 0)) for i in rem]
+        adjusted.sort(key=lambda x: -x[1])  # stable: ties keep candidate order
+        pick = adjusted[0][0]
+        chosen.append(pick)
+        counts[attr[pick]] = counts.get(attr[pick], 0) + 1
+        rem = [i for i in rem if i != pick]
+    return chosen
+
+
+def _catalog(rng, n):
+    spirits = ["gin", "Rum", "vodka", None, "tequila"]
+    out = {}
+    for j in range(n):
+        rec = {"primary_spirit": rng.choice(spirits), "tags": rng.sample(["sour", "sweet", "bitter"], rng.randrange(3))}
+        if rng.random() < 0.05:
+            rec = {}  # no attributes at all → "unknown"
+        out[f"d{j}"] = rec
+    return SimpleNamespace(get=out.get)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_diversify_matches_greedy_loop(seed):
+    rng = random.Random(seed)
+    n = rng.randrange(1, 150)
+    reg = _catalog(rng, n)
+    ids = [f"d{j}" for j in rng.sample(range(n), rng.randrange(1, n + 1))] + ["missing"]
+    # coarse scores and a matching penalty make many exact ties after penalisation
+    step = rng.choice([0.0, 0.01, 0.12, 0.25])
+    scores = {i: rng.randrange(8) * 0.25 for i in ids if rng.random() < 0.95}
+    for key in ("primary_spirit", "tags"):
+        for k in (None, 1, rng.randrange(1, len(ids) + 1), len(ids) + 5):
+            assert rs.diversify(reg, ids, scores, penalty=step, k=k, key=key) == \
+                _greedy_reference(reg, ids, scores, step, k, key)
+
+
+def _query(rng, reg):
+    vocab = reg.id_map["vocab"]
+    pick = lambda xs: rng.sample(xs, rng.randrange(min(3, len(xs)) + 1))
+    return {"likes": {"spirit": pick(vocab["spirit"]), "tags": pick(vocab["tags"]), "season": pick(vocab["season"])},
+            "dislikes": {"tags": pick(vocab["tags"]), "season": pick(vocab["season"])},
+            "seed_ids": rng.sample(reg.ids, rng.randrange(3)), "k": rng.choice([None, 1, 5, 12, 48])}
+
+
+def test_recommend_batch_matches_recommend(scratch_ratings, monkeypatch):
+    from backend.services import profile_service, ratings_service, result_cache
+    reg = scratch_ratings
+    monkeypatch.setattr(result_cache.cache_for(reg, "recs"), "max_entries", 0)  # score every call
+    rng = random.Random(11)
+    for u in ("rated-a", "rated-b"):
+        for d in rng.sample(reg.ids, 6):
+            profile_service.record_rating(reg, ratings_service.append_rating(reg, u, d, rng.choice([1, 2, 4, 5])))
+
+    queries = []
+    for j in range(40):
+        q = _query(rng, reg)
+        if j % 10 == 0:
+            q = {"k": q["k"]}  # nothing but the user
+        q["user_id"] = rng.choice(["rated-a", "rated-b", "anon-1", None])
+        queries.append(q)
+    expected = [rs.recommend(reg, q.get("likes"), q.get("dislikes"), q.get("seed_ids"), q.get("k") or 48,
+                             user_id=q.get("user_id") or "local") for q in queries]
+    assert rs.recommend_batch(reg, queries) == expected
+    assert rs.recommend_batch(reg, queries, chunk=7) == expected  # chunk boundaries mix users
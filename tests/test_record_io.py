@@ -0,0 +1,59 @@
+import json
+import random
+
+import pytest
+
+import curate_catalog as cc
+import record_io
+from record_io import RecordSpill, iter_records, write_records
+
+
+def _records(n=60, seed=3):
+    rng = random.Random(seed)
+    return [{"id": str(rng.randrange(20)), "name": f"Drink “{i}”", "abv": rng.choice([0, 12.5, 1e-7, -3]),
+             "tags": [rng.choice("abc") * rng.randrange(1, 40) for _ in range(rng.randrange(4))],
+             "nested": {"ok": rng.random() < 0.5, "none": None}} for i in range(n)]
+
+
+@pytest.mark.parametrize("name,pretty,key", [("r.json", False, None), ("r.json", True, None),
+                                             ("r.json", True, "name"), ("r.ndjson", False, None)])
+def test_written_and_streamed_records_match_json_module(tmp_path, monkeypatch, name, pretty, key):
+    monkeypatch.setattr(record_io, "READ_CHUNK", 7)  # values and numbers straddle buffer refills
+    records = _records()
+    path = tmp_path / name
+    assert write_records(records, path, pretty=pretty, key=key) == len(records)
+    text = path.read_text(encoding="utf-8")
+    if name.endswith(".ndjson"):
+        assert text == "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    else:
+        doc = {r[key]: r for r in records} if key else records
+        assert text == json.dumps(doc, ensure_ascii=False, indent=2 if pretty else None)
+    assert list(iter_records(path)) == records
+
+
+def test_spill_equals_sorted_list():
+    records = _records()
+    key = lambda r: (r["id"], len(r["tags"]))  # duplicate keys: the sort must stay stable
+    with RecordSpill(iter(records), key=key) as spill:
+        expected = sorted(records, key=key)
+        assert len(spill) == len(expected)
+        assert list(spill) == expected and list(spill) == expected  # re-iterable
+        assert spill[-1] == expected[-1] and spill[5:9] == expected[5:9]
+    with RecordSpill(records) as spill:
+        assert list(spill) == records
+
+
+def test_streamed_curation_equals_in_memory(tmp_path):
+    raw_path = cc.latest_raw_path()
+    raw = json.loads(raw_path.read_text(encoding="utf-8"))
+    raw = list(raw.values()) if isinstance(raw, dict) else raw
+    curated = [c for c in cc.curate_chunk(raw) if c["name"]]
+    expected = sorted(curated, key=lambda x: (x["primary_spirit"] or "zzz", x["name"].lower()))
+
+    ndjson = tmp_path / "raw.ndjson"
+    write_records(raw, ndjson)
+    for src, out in ((raw_path, tmp_path / "a.json"), (ndjson, tmp_path / "b.ndjson")):
+        cc.main(src, out, workers=1)
+        assert list(iter_records(out)) == expected
+    cc.main(raw_path, tmp_path / "c.json", workers=1, pretty=True)
+    assert (tmp_path / "c.json").read_text(encoding="utf-8") == json.dumps(expected, ensure_ascii=False, indent=2)
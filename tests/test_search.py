@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from backend.api import routes
+from backend.loaders.search_index import Bm25Index, PostingIndex, _within_one_edit
+from backend.services import search_service
+
+
+def _index(tf_rows, seed=0):
+    """Bm25Index over a one-field corpus; tf_rows[t] = {row: tf}. Name rank is a fixed shuffle."""
+    n = 1 + max(r for d in tf_rows for r in d)
+    rank_of_row = np.random.default_rng(seed).permutation(n).astype(np.int32)
+    ptr, rows, tf = [0], [], []
+    for d in tf_rows:
+        for r in sorted(d):
+            rows.append(r); tf.append([d[r]])
+        ptr.append(len(rows))
+    arrays = {"term_ptr": ptr, "post_row": rows, "tf": tf, "doc_len": np.full((n, 1), 5.0)}
+    return Bm25Index(arrays, [f"t{i}" for i in range(len(tf_rows))], rank_of_row, ["name"]), rank_of_row
+
+
+def _reference(idx, groups, filters, n):
+    """Score every drink in the intersection, order by (score desc, name rank)."""
+    ranks = groups[0][2]
+    for g in groups[1:]:
+        ranks = np.intersect1d(ranks, g[2])
+    for f in filters:
+        ranks = np.intersect1d(ranks, f)
+    score = np.zeros(len(ranks), dtype=np.float32)
+    for _, _, r, v in groups:
+        score += v[np.searchsorted(r, ranks)]
+    return ranks[np.lexsort((ranks, -score))][:n]
+
+
+@pytest.mark.parametrize("n", [1, 24, 500])
+def test_top_matches_exhaustive_scoring(n):
+    rng = np.random.default_rng(3)
+    n_docs = 2000
+    flat = {r: 1 for r in range(n_docs) if r % 5}                       # a common, flat-impact token
+    varied = {int(r): int(rng.integers(1, 4)) for r in rng.choice(n_docs, 700, replace=False)}
+    rare = {int(r): 1 for r in rng.choice(n_docs, 40, replace=False)}
+    idx, _ = _index([flat, varied, rare])
+    odd = np.arange(1, n_docs, 2, dtype=np.int32)
+    for terms, filters in [(["t0"], []), (["t0"], [odd]), (["t1"], []), (["t0", "t1"], []),
+                           (["t1", "t2"], [odd]), (["t0", "t1", "t2"], [])]:
+        groups = [idx.term_lists([t]) for t in terms]
+        np.testing.assert_array_equal(idx.top(groups, filters, n), _reference(idx, groups, filters, n))
+
+
+def test_bm25_page_total_without_match_ranks(monkeypatch):
+    reg = routes.LIVE.current
+    if reg.bm25 is None:
+        pytest.skip("no BM25 index built")
+    queries = ["glass", "juice", "glass juice", "lim", "vodak"]
+    expected = {q: len(search_service.match_ranks(reg, q)) for q in queries}
+    expected_sp = len(search_service.match_ranks(reg, "glass", spirit="gin"))
+
+    def boom(*a, **kw):
+        raise AssertionError("bm25 pages must not materialise every match")
+    monkeypatch.setattr(search_service, "match_ranks", boom)
+    for q in queries:
+        items, total = search_service.search_page(reg, q, page=2, page_size=10, rank="bm25")
+        assert total == expected[q]
+        want = search_service.bm25_ranks(reg, q, n=20)[10:20]
+        assert [d["id"] for d in items] == [reg.postings.id_of_rank[r] for r in want]
+    assert search_service.search_page(reg, "glass", spirit="gin", rank="bm25")[1] == expected_sp
+
+
+def _postings(words):
+    ids = [f"d{i}" for i in range(len(words))]
+    index = {"tok2ids": {w: [d] for w, d in zip(words, ids)}}
+    return PostingIndex(index, ids, {d: {"name": w} for w, d in zip(words, ids)})
+
+
+def _osa(a, b):
+    """Reference optimal-string-alignment distance (full DP)."""
+    d = [[i + j if not i * j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def test_within_one_edit_matches_osa():
+    rng = np.random.default_rng(0)
+    for _ in range(20000):
+        a, b = ("".join(rng.choice(list("abc"), rng.integers(0, 6))) for _ in range(2))
+        assert _within_one_edit(a, b) == (_osa(a, b) <= 1), (a, b)
+
+
+def test_fuzzy_tokens_one_edit_only():
+    px = _postings(["mojito", "abbey", "margarita", "lime"])
+    assert px.fuzzy_tokens("mojto") == ["mojito"]        # deletion
+    assert px.fuzzy_tokens("mojiito") == ["mojito"]      # insertion
+    assert px.fuzzy_tokens("mojjto") == ["mojito"]       # substitution
+    assert px.fuzzy_tokens("mojtio") == ["mojito"]       # adjacent swap
+    # "abeqy" and "abbey" share the deletion "abey" but are two edits apart
+    assert px.fuzzy_tokens("abeqy") == []
+    assert px.fuzzy_tokens("mrgaritq") == []
+    assert px.resolve("abeqy").size == 0
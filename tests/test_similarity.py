@@ -0,0 +1,86 @@
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend.services.similarity import cosine_all, cosine_many, topk
+from backend.services.recommender_service import similar
+
+TOL = 1e-6  # float32 gemv vs float64-accumulated sparse scores
+
+
+def _vectors(n=400, d=64, density=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    V = (rng.random((n, d)) < density) * rng.random((n, d))
+    V[:, 0] += 0.1                    # no all-zero rows
+    V[n // 2:n // 2 + 20] = V[:20]    # duplicate rows → tied scores
+    V /= np.linalg.norm(V, axis=1, keepdims=True)
+    return V.astype(np.float32)
+
+
+def _reg(matrix, V):
+    ids = [f"d{i}" for i in range(V.shape[0])]
+    return SimpleNamespace(score_matrix=matrix, vectors=V, ids=ids, index_by_id={d: i for i, d in enumerate(ids)},
+                           neighbors_idx=None, neighbors_k=0)
+
+
+def _assert_same_ranking(scores, a, b):
+    """Same ranking up to reordering of items whose scores are within TOL of each other."""
+    assert len(a) == len(b)
+    np.testing.assert_allclose(scores[a], scores[b], rtol=0, atol=TOL)
+
+
+@pytest.fixture
+def both():
+    V = _vectors()
+    return V, sp.csr_matrix(V)
+
+
+def test_cosine_all_dense_and_csr_agree(both):
+    V, C = both
+    for q in (V[3], V[250] + 0.5 * V[7], np.random.default_rng(1).random(V.shape[1]).astype(np.float32)):
+        dense, sparse = cosine_all(V, q), cosine_all(C, q)
+        assert dense.dtype == sparse.dtype == np.float32
+        np.testing.assert_allclose(dense, sparse, rtol=0, atol=TOL)
+        for k in (1, 10, 48):
+            di, ds = topk(dense, k, exclude_idx=3)
+            si, ss = topk(sparse, k, exclude_idx=3)
+            _assert_same_ranking(sparse, di, si)
+            np.testing.assert_allclose(ds, ss, rtol=0, atol=TOL)
+
+
+def test_cosine_many_matches_cosine_all(both):
+    V, C = both
+    Q = np.stack([V[0], V[11], np.zeros(V.shape[1], dtype=np.float32)])
+    for M in (V, C):
+        S = cosine_many(M, Q)
+        assert S.shape == (V.shape[0], 3) and S.dtype == np.float32
+        np.testing.assert_allclose(S[:, 0], cosine_all(M, Q[0]), rtol=0, atol=TOL)
+        assert not S[:, 2].any()
+    np.testing.assert_allclose(cosine_many(V, Q), cosine_many(C, Q), rtol=0, atol=TOL)
+
+
+def test_similar_rankings_match(both):
+    V, C = both
+    dense, sparse = _reg(V, V), _reg(C, V)
+    for did in ("d0", "d5", "d210", "d399"):
+        ix = int(did[1:])
+        scores = cosine_all(C, V[ix])
+        a = [int(x[1:]) for x in similar(dense, did, k=20)]
+        b = [int(x[1:]) for x in similar(sparse, did, k=20)]
+        _assert_same_ranking(scores, a, b)
+    assert similar(dense, "d0", k=1) == ["d200"]  # exact duplicate wins; the query itself is excluded
+
+
+def test_dense_scoring_does_not_upcast_the_matrix(tmp_path):
+    V = np.random.default_rng(0).random((20000, 64)).astype(np.float32)
+    np.save(tmp_path / "v.npy", V)
+    mm = np.load(tmp_path / "v.npy", mmap_mode="r")
+    tracemalloc.start()
+    cosine_all(mm, V[0])
+    cosine_many(mm, V[:4])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < V.nbytes // 4  # a float64 copy would be 2x V.nbytes
@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from train_als import ALSArtifacts, ALSParams, ALSPipeline
+
+
+def _write_ratings(path, events):
+    with path.open("a", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e) + "\n")
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    n_items = 60
+    (tmp_path / "config").mkdir()
+    paths = {k: f"data/{k}" for k in ("catalog", "vectors", "search_index", "profile", "als_active")}
+    paths.update(id_map="data/id_map.json", ratings="storage/ratings.jsonl")
+    (tmp_path / "config/app.json").write_text(json.dumps({"paths": paths, "storage": {"backend": "jsonl"}}))
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data/id_map.json").write_text(json.dumps({"ids": [f"d{i}" for i in range(n_items)]}))
+    (tmp_path / "storage").mkdir()
+    rng = np.random.default_rng(1)
+    # items 50..59 are never rated before the incremental run
+    _write_ratings(tmp_path / "storage/ratings.jsonl",
+                   [{"user_id": f"u{u}", "drink_id": f"d{int(d)}", "rating": 5, "ts": 100 + u * 10 + j}
+                    for u in range(40) for j, d in enumerate(rng.choice(50, 8, replace=False))])
+    return tmp_path
+
+
+def _pipeline(root, **kw):
+    params = ALSParams(rank=4, iters=4, inc_iters=2, min_users=1, min_interactions=1, backend="native",
+                       threads=1, tolerance=1.0, **kw)
+    pipe = ALSPipeline(root / "config/app.json", params)
+    pipe.artifacts = ALSArtifacts(root / "models/als")
+    return pipe
+
+
+def _active(root):
+    path = Path(json.loads((root / "models/als/active.json").read_text())["path"])
+    return path, np.load(path / "item_factors.npy"), json.loads((path / "meta.json").read_text())
+
+
+def test_incremental_publishes_factors_for_held_out_items(workspace):
+    _pipeline(workspace).run()
+    base, _, _ = _active(workspace)
+
+    # each affected user's newest positive is one of the never-seen items: exactly what split_last holds out
+    _write_ratings(workspace / "storage/ratings.jsonl",
+                   [{"user_id": f"u{u}", "drink_id": f"d{50 + u}", "rating": 5, "ts": 5000} for u in range(10)])
+    _pipeline(workspace, incremental=True).run()
+    path, factors, meta = _active(workspace)
+
+    assert path != base and (base / "item_factors.npy").exists()
+    assert meta["mode"] == "incremental" and meta["last_ts"] == 5000
+    assert np.all(np.linalg.norm(factors[50:60], axis=1) > 0)
+
+
+def test_version_dirs_are_unique(tmp_path):
+    art = ALSArtifacts(tmp_path / "als")
+    dirs = {art.version_dir() for _ in range(5)}
+    assert len(dirs) == 5 and all(d.is_dir() for d in dirs)
+    art.version_dir("v1")
+    with pytest.raises(FileExistsError):
+        art.version_dir("v1")